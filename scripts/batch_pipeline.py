@@ -0,0 +1,272 @@
+"""
+python scripts/batch_pipeline.py \
+    --raw-data='data/zip/student-*.csv' \
+    --results-to='results/' \
+    --n-jobs=4
+"""
+
+import click
+import contextlib
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+sys.path.append(os.path.dirname(__file__))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.file_cache import read_csv_cached
+from src.instrumentation import Tracer, instrumentation_options
+
+
+def _load_stages():
+    """Import the stage scripts; heavy imports (sklearn, pandera, plotting) happen once per process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import validate
+    import split_preprocess
+    import fit_model
+    import evaluate_model
+    validate.student_data_schema()
+    return [
+        ("validate", validate.main),
+        ("split", split_preprocess.main),
+        ("fit", fit_model.main),
+        ("evaluate", evaluate_model.main),
+    ]
+
+
+_STAGES = None
+
+
+def _init_worker():
+    global _STAGES
+    if _STAGES is None:
+        _STAGES = _load_stages()
+
+
+def stage_arguments(raw_data: str, out_dir: str, seed: int) -> dict:
+    """
+    Command line arguments of each stage for one dataset, mirroring the Makefile layout.
+
+    Parameters
+    ----------
+    raw_data : str
+        Path to the raw dataset.
+    out_dir : str
+        Directory holding every output of the dataset, e.g. results/student-mat/.
+    seed : int
+        Random seed of the model fit.
+
+    Returns
+    -------
+    dict
+        Argument list per stage name.
+    """
+    processed = os.path.join(out_dir, "processed", "")
+    models = os.path.join(out_dir, "models", "")
+    return {
+        "validate": [f"--raw-data={raw_data}", f"--plot-to={os.path.join(out_dir, 'figures', 'validate', '')}"],
+        "split": [f"--raw-data={raw_data}", f"--data-to={processed}", f"--preprocessor-to={models}"],
+        "fit": [
+            f"--training-data={os.path.join(processed, 'train_df.csv')}",
+            f"--pipeline-to={models}",
+            f"--model-to={models}",
+            f"--test-data-to={os.path.join(processed, 'test', '')}",
+            f"--plot-to={os.path.join(out_dir, 'plots', '')}",
+            f"--seed={seed}",
+        ],
+        "evaluate": [
+            f"--y-test={os.path.join(processed, 'y_test.csv')}",
+            f"--X-test={os.path.join(processed, 'X_test.csv')}",
+            f"--best-model={os.path.join(models, 'best_model.pkl')}",
+            f"--metrics-to={os.path.join(out_dir, 'table', 'metrics', '')}",
+            f"--coefs-to={os.path.join(out_dir, 'table', 'coefficients', '')}",
+            f"--plot-to={os.path.join(out_dir, 'figures', '')}",
+        ],
+    }
+
+
+def run_dataset(name: str, raw_data: str, results_to: str, seed: int,
+                cohort_column: str = None, cohort_value=None) -> dict:
+    """
+    Run validate, split, fit and evaluate for one dataset in the current process.
+
+    The output of the stages is written to `<results_to>/<name>/pipeline.log`.
+
+    Parameters
+    ----------
+    name : str
+        Dataset name, used as the output directory.
+    raw_data : str
+        Path to the raw dataset (semicolon separated CSV).
+    results_to : str
+        Root directory of the namespaced outputs.
+    seed : int
+        Random seed of the model fit.
+    cohort_column : str, optional
+        If given, only the rows where this column equals `cohort_value` are used.
+    cohort_value : optional
+        Value of `cohort_column` selecting the cohort.
+
+    Returns
+    -------
+    dict
+        Dataset name, status, wall time per stage and the evaluation metrics.
+    """
+    _init_worker()
+    import matplotlib.pyplot as plt
+    from sklearn import config_context
+
+    out_dir = os.path.join(results_to, name)
+    os.makedirs(out_dir, exist_ok=True)
+    if cohort_column is not None:
+        raw = read_csv_cached(raw_data, delimiter=";")
+        raw_data = os.path.join(out_dir, f"{name}.csv")
+        raw[raw[cohort_column] == cohort_value].to_csv(raw_data, sep=";", index=False)
+
+    arguments = stage_arguments(raw_data, out_dir, seed)
+    row = {"dataset": name, "status": "ok"}
+    with open(os.path.join(out_dir, "pipeline.log"), "w") as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        for stage, command in _STAGES:
+            start = time.perf_counter()
+            try:
+                # Each stage gets sklearn's default config, as when run as a separate process
+                with config_context():
+                    command.main(args=arguments[stage], standalone_mode=False)
+            except Exception as e:
+                row["status"] = f"{stage} failed: {e}"
+                break
+            finally:
+                row[f"{stage}_s"] = round(time.perf_counter() - start, 3)
+                plt.close("all")
+
+    metrics_path = os.path.join(out_dir, "table", "metrics", "evaluation_metrics.csv")
+    if row["status"] == "ok":
+        metrics = pd.read_csv(metrics_path)
+        row.update(zip(metrics["Metric"], metrics["Value"]))
+    return row
+
+
+def expand_datasets(raw_data: tuple, cohort_column: str = None) -> list:
+    """
+    Expand paths and glob patterns into named batch tasks.
+
+    Parameters
+    ----------
+    raw_data : tuple
+        Paths or glob patterns of raw datasets.
+    cohort_column : str, optional
+        If given, every dataset is split into one task per value of this column.
+
+    Returns
+    -------
+    list
+        Tuples of (name, path, cohort value); names are file stems, with the
+        cohort value appended when `cohort_column` is given.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a pattern matches no file.
+    """
+    paths = []
+    for pattern in raw_data:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"No raw data matches '{pattern}'.")
+        paths.extend(path for path in matches if path not in paths)
+
+    tasks = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if cohort_column is None:
+            tasks.append((stem, path, None))
+        else:
+            values = read_csv_cached(path, delimiter=";")[cohort_column].unique()
+            tasks.extend((f"{stem}-{value}", path, value) for value in sorted(values))
+    return tasks
+
+
+@click.command()
+@click.option("--raw-data", type=str, multiple=True, required=True,
+              help="Raw dataset path or glob pattern; can be given several times")
+@click.option("--results-to", type=str, default="results", help="Root directory of the per-dataset outputs")
+@click.option("--cohort-column", type=str, default=None,
+              help="Run every dataset once per value of this column, e.g. school")
+@click.option("--n-jobs", type=int, default=None, help="Number of worker processes (default: all cores)")
+@click.option("--seed", type=int, default=17, help="Random seed of the model fit")
+@instrumentation_options
+def main(raw_data, results_to, cohort_column, n_jobs, seed, profile, metrics_out):
+    """
+    Runs validate, split, fit and evaluate for several raw datasets in parallel.
+
+    Each dataset runs in a worker process that imports the stage scripts once,
+    builds the validation schema once and parses each raw file once for all
+    its stages. Outputs of a dataset are written under `<results-to>/<dataset>/`
+    with the layout of the Makefile targets, and the evaluation metrics of all
+    datasets are collected in `<results-to>/batch_metrics.csv`.
+
+    Parameters
+    ----------
+    raw_data : tuple
+        Paths or glob patterns of the raw datasets (semicolon separated CSV).
+    results_to : str
+        Root directory of the per-dataset outputs.
+    cohort_column : str
+        If given, each dataset is run once per value of this column, e.g. once per school.
+    n_jobs : int
+        Number of worker processes. Defaults to the number of cores; 1 runs
+        every dataset in the current process.
+    seed : int
+        Random seed of the model fit. Defaults to 17.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
+
+    Returns
+    -------
+    None
+        The function writes the outputs of every dataset and the consolidated metrics table.
+
+    Examples
+    --------
+    To run the script via the command line:
+    ```bash
+    python scripts/batch_pipeline.py \
+        --raw-data='data/zip/student-*.csv' \
+        --cohort-column=school \
+        --results-to='results/'
+    ```
+    """
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    tasks = expand_datasets(raw_data, cohort_column)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    print(f"Running {len(tasks)} datasets on {n_jobs} worker(s)...")
+
+    with tracer.span("batch", rows=len(tasks)):
+        arguments = [(name, path, results_to, seed, cohort_column, value) for name, path, value in tasks]
+        if n_jobs == 1:
+            rows = [run_dataset(*args) for args in arguments]
+        else:
+            # Workers are forked after the stages are imported here, or import them once on start
+            _init_worker()
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker) as executor:
+                rows = list(executor.map(run_dataset, *zip(*arguments)))
+    for row in rows:
+        tracer.record(f"dataset {row['dataset']}", sum(value for key, value in row.items() if key.endswith("_s")))
+
+    summary = pd.DataFrame(rows)
+    os.makedirs(results_to, exist_ok=True)
+    summary_path = os.path.join(results_to, "batch_metrics.csv")
+    summary.to_csv(summary_path, index=False)
+    print(summary.to_string(index=False))
+    print(f"Consolidated metrics saved to {summary_path}")
+
+    tracer.report(metrics_out)
+
+
+if __name__ == "__main__":
+    main()
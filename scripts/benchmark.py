@@ -0,0 +1,755 @@
+"""
+python scripts/benchmark.py preprocess --n-rows=1000000
+"""
+
+import click
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.inspection import permutation_importance as sklearn_permutation_importance
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.bootstrap import bootstrap_metrics
+from src.category_encoding import CategoryCodeEncoder
+from src.conformal import calibrate
+from src.drift import FeatureHistograms, drift_report
+from src.feature_config import load_feature_set
+from src.permutation_importance import permutation_importance
+from src.preprocessor import create_preprocessor, create_wide_preprocessor, transform_to_dataframe
+from src.slice_metrics import SLICE_COLUMNS, grouping_sets, slice_metrics
+from src.seed_stability import ridge_seed_stability
+from src.split_data import split_train_test, split_indices
+from src.split_store import write_split_store, read_xy
+from src.shared_cv import encode_once, SharedFoldData
+from src.packed_records import read_packed, write_packed
+from src.merge_subjects import MERGE_KEYS, SUBJECT_SUFFIXES, merge_subjects, merge_subject_chunks
+from src.student_csv import read_student_csv
+from src.student_schema import COLUMNS
+from src.streaming_metrics import RegressionMetrics
+from src.synthetic_data import (
+    fit_student_profile,
+    profile_from_schema,
+    generate_student_data,
+    write_student_csv,
+    write_student_packed,
+)
+
+RAW_DATA = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'student-mat.csv')
+
+
+def load_profile(raw_data):
+    """Learn a synthetic data profile from `raw_data`, or use the schema bounds if it is missing."""
+    if raw_data and os.path.isfile(raw_data):
+        return fit_student_profile(pd.read_csv(raw_data, delimiter=";"))
+    return profile_from_schema()
+
+
+def measure(func, *args, **kwargs):
+    """
+    Run `func` and measure its wall time and peak traced memory.
+
+    The function runs twice: once untraced for the wall time, since tracemalloc
+    slows down allocation-heavy Python code, and once traced for the peak memory.
+
+    Returns
+    -------
+    tuple
+        The function result, the wall time in seconds and the peak memory in MB.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+@click.group()
+def cli():
+    """Benchmarks for the pipeline building blocks, run on synthetic student data."""
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def preprocess(n_rows, raw_data, seed):
+    """
+    Compares peak memory and time of the preprocessor output options.
+
+    All 32 attributes are used as features so that every categorical column
+    (`Mjob`, `Fjob`, `reason`, `guardian`, ...) is one-hot encoded.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)
+    X, y = data.drop(columns=["G3"]), data["G3"]
+
+    rows = []
+    for dtype in (np.float64, np.float32):
+        for sparse in (False, True):
+            preprocessor = create_preprocessor(X, dtype=dtype, sparse=sparse)
+            transformed, transform_time, transform_peak = measure(preprocessor.fit_transform, X)
+            _, frame_time, frame_peak = measure(transform_to_dataframe, preprocessor, X, transformed)
+            _, ridge_time, ridge_peak = measure(Ridge(alpha=1.0).fit, transformed, y)
+            if sparse:
+                output_bytes = sum(a.nbytes for a in (transformed.data, transformed.indices, transformed.indptr))
+            else:
+                output_bytes = transformed.nbytes
+            rows.append({
+                "dtype": np.dtype(dtype).name,
+                "sparse": sparse,
+                "output_mb": round(output_bytes / 1e6, 1),
+                "transform_peak_mb": round(transform_peak, 1),
+                "to_frame_peak_mb": round(frame_peak, 1),
+                "ridge_peak_mb": round(ridge_peak, 1),
+                "total_s": round(transform_time + frame_time + ridge_time, 2),
+            })
+            del transformed
+    print(f"Preprocess + Ridge fit on {n_rows} rows, {X.shape[1]} input columns")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=5_000_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def split(n_rows, raw_data, seed):
+    """
+    Compares the copying train/test split with the index-only split.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)[COLUMNS]
+
+    def copy_split():
+        X_train, X_test, y_train, y_test = split_train_test(data, "G3")
+        return pd.concat([X_train, y_train], axis=1), pd.concat([X_test, y_test], axis=1)
+
+    rows = []
+    for name, func in [
+        ("split_train_test + concat", copy_split),
+        ("split_indices", lambda: split_indices(data)),
+        ("split_indices stratified on G3", lambda: split_indices(data, stratify_column="G3")),
+        ("split_indices grouped by age", lambda: split_indices(data, group_column="age")),
+    ]:
+        _, elapsed, peak = measure(func)
+        rows.append({"method": name, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2)})
+    print(f"Train/test split of {n_rows} rows ({data.memory_usage(deep=True).sum() / 1e6:.0f} MB in memory)")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def directory_size_mb(path):
+    """Total size in MB of the files under `path`."""
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ) / 1e6
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=2_000_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def store(n_rows, raw_data, seed):
+    """
+    Compares the six-CSV split layout of split_preprocess.py with the split store.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)[COLUMNS]
+    workdir = tempfile.mkdtemp()
+    try:
+        csv_dir, store_dir = os.path.join(workdir, "csv"), os.path.join(workdir, "store")
+        os.makedirs(csv_dir)
+
+        def write_csv():
+            X_train, X_test, y_train, y_test = split_train_test(data, "G3")
+            for name, frame in [("X_train", X_train), ("y_train", y_train), ("X_test", X_test),
+                                ("y_test", y_test), ("train_df", pd.concat([X_train, y_train], axis=1)),
+                                ("test_df", pd.concat([X_test, y_test], axis=1))]:
+                frame.to_csv(os.path.join(csv_dir, f"{name}.csv"), index=False)
+
+        def write_store():
+            train_idx, test_idx = split_indices(data)
+            write_split_store(store_dir, data, train_idx, test_idx)
+
+        def read_csv():
+            return pd.read_csv(os.path.join(csv_dir, "X_train.csv")), pd.read_csv(os.path.join(csv_dir, "y_train.csv"))
+
+        def read_store():
+            X, y = read_xy(store_dir, "train")
+            # Touch every value so the memory-mapped pages are actually read
+            return X.select_dtypes("number").sum().sum() + y.sum()
+
+        _, csv_write, _ = measure(write_csv)
+        _, store_write, _ = measure(write_store)
+        _, csv_read, _ = measure(read_csv)
+        _, store_read, _ = measure(read_store)
+        rows = [
+            {"layout": "six CSV files", "write_s": round(csv_write, 2), "read_train_s": round(csv_read, 3),
+             "disk_mb": round(directory_size_mb(csv_dir), 1)},
+            {"layout": "split store", "write_s": round(store_write, 2), "read_train_s": round(store_read, 3),
+             "disk_mb": round(directory_size_mb(store_dir), 1)},
+        ]
+    finally:
+        shutil.rmtree(workdir)
+    print(f"Split layouts for {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=2_000_000, help="Number of synthetic rows per subject")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def merge(n_rows, raw_data, seed):
+    """
+    Compares pandas.merge on the 13 key columns with the hashed sort-merge join.
+
+    The Portuguese side is deduplicated on the keys so that the join output
+    stays at most as large as the math side.
+    """
+    profile = load_profile(raw_data)
+    mat = generate_student_data(profile, n_rows, seed=seed)
+    por = generate_student_data(profile, n_rows, seed=seed + 1).drop_duplicates(MERGE_KEYS)
+
+    rows = []
+    for name, func in [
+        ("pandas.merge", lambda: mat.merge(por, on=MERGE_KEYS, suffixes=SUBJECT_SUFFIXES)),
+        ("merge_subjects", lambda: merge_subjects(mat, por)),
+        ("merge_subject_chunks (250k rows)", lambda: pd.concat(
+            merge_subject_chunks((mat[i:i + 250_000] for i in range(0, n_rows, 250_000)), por),
+            ignore_index=True,
+        )),
+    ]:
+        merged, elapsed, peak = measure(func)
+        rows.append({"method": name, "rows_out": len(merged), "peak_mb": round(peak, 1),
+                     "time_s": round(elapsed, 2)})
+    print(f"Join of {n_rows} math rows with {len(por)} unique Portuguese students")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+@click.option("--n-jobs", type=int, multiple=True, default=(1, 2), help="Worker counts to compare")
+def cv(n_rows, raw_data, seed, n_jobs):
+    """
+    Compares the Ridge grid search of fit_model.py on the joblib path with shared fold data.
+
+    Parallel efficiency is the single-worker time divided by n_jobs times the
+    time with n_jobs workers.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)
+    X, y = data.drop(columns=["G3"]), data["G3"]
+    preprocessor = create_preprocessor(X, verbose_feature_names_out=False)
+    param_grid = {"ridge__alpha": [0.1, 1, 10, 100]}
+    n_tasks = 5 * len(param_grid["ridge__alpha"])
+
+    def joblib_search(jobs):
+        search = GridSearchCV(make_pipeline(preprocessor, Ridge()), param_grid, cv=5,
+                              scoring="neg_mean_squared_error", n_jobs=jobs)
+        return search.fit(X, y).cv_results_
+
+    def shared_search(jobs):
+        matrix, fold_preprocessor, _ = encode_once(preprocessor, X)
+        with SharedFoldData(matrix, y, cv=5) as fold_data:
+            del matrix
+            return fold_data.grid_search(make_pipeline(fold_preprocessor, Ridge()), param_grid,
+                                         scoring="neg_mean_squared_error", n_jobs=jobs).cv_results_
+
+    rows = []
+    for name, func, pickled in [
+        ("GridSearchCV (joblib)", joblib_search, len(pickle.dumps((X, y)))),
+        ("SharedFoldData", shared_search, 0),
+    ]:
+        times = {}
+        for jobs in n_jobs:
+            start = time.perf_counter()
+            func(jobs)
+            times[jobs] = time.perf_counter() - start
+            rows.append({
+                "method": name, "n_jobs": jobs, "time_s": round(times[jobs], 2),
+                "efficiency": round(times[min(n_jobs)] * min(n_jobs) / (times[jobs] * jobs), 2),
+                "data_pickled_mb": round(pickled * n_tasks / 1e6 if jobs > 1 else 0, 1),
+            })
+    print(f"Grid search of 4 alphas x 5 folds on {n_rows} rows, {X.shape[1]} features, {os.cpu_count()} cores")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of test rows")
+@click.option("--n-resamples", type=int, default=200, help="Number of bootstrap resamples")
+@click.option("--seed", type=int, default=123, help="Random seed")
+@click.option("--n-jobs", type=int, multiple=True, default=(1, 2), help="Worker counts to compare")
+def bootstrap(n_rows, n_resamples, seed, n_jobs):
+    """
+    Compares a per-resample loop over the sklearn metrics with the chunked bootstrap of evaluate_model.py.
+    """
+    rng = np.random.default_rng(seed)
+    y_true = rng.integers(0, 21, n_rows).astype(float)
+    y_pred = y_true + rng.normal(0, 4, n_rows)
+
+    def loop():
+        samples = []
+        for _ in range(n_resamples):
+            idx = rng.integers(0, n_rows, n_rows)
+            mse = mean_squared_error(y_true[idx], y_pred[idx])
+            samples.append([mse, np.sqrt(mse), mean_absolute_error(y_true[idx], y_pred[idx])])
+        return np.quantile(samples, [0.025, 0.975], axis=0)
+
+    rows = []
+    _, elapsed, peak = measure(loop)
+    rows.append({"method": "sklearn metrics loop", "n_jobs": 1, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2)})
+    for jobs in n_jobs:
+        _, elapsed, peak = measure(bootstrap_metrics, y_true, y_pred, n_resamples=n_resamples,
+                                   random_state=seed, n_jobs=jobs)
+        rows.append({"method": "bootstrap_metrics", "n_jobs": jobs, "peak_mb": round(peak, 1),
+                     "time_s": round(elapsed, 2)})
+    print(f"{n_resamples} bootstrap resamples of {n_rows} test rows, {os.cpu_count()} cores")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=200_000, help="Number of synthetic test rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--n-repeats", type=int, default=2, help="Number of permutations per column")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def importance(n_rows, raw_data, n_repeats, seed):
+    """
+    Compares sklearn's per-column permutation importance with the batched one of evaluate_model.py.
+
+    The pipeline is fitted on 10,000 rows with all 32 attributes as features
+    and the importance is computed on `n_rows` other rows.
+    """
+    profile = load_profile(raw_data)
+    train = generate_student_data(profile, 10_000, seed=seed)
+    data = generate_student_data(profile, n_rows, seed=seed + 1)
+    pipeline = make_pipeline(create_preprocessor(train.drop(columns=["G3"])), Ridge())
+    pipeline.fit(train.drop(columns=["G3"]), train["G3"])
+    X, y = data.drop(columns=["G3"]), data["G3"]
+
+    rows = []
+    for name, func in [
+        ("sklearn permutation_importance", lambda: sklearn_permutation_importance(
+            pipeline, X, y, scoring="neg_mean_squared_error", n_repeats=n_repeats, random_state=seed)),
+        ("batched permutation_importance", lambda: permutation_importance(
+            pipeline, X, y, n_repeats=n_repeats, random_state=seed)),
+    ]:
+        _, elapsed, peak = measure(func)
+        rows.append({"method": name, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2)})
+    print(f"Permutation importance of {X.shape[1]} columns x {n_repeats} repeats on {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=50_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+@click.option("--max-dense-mb", type=float, default=1000,
+              help="Skip densifying the wide features when the dense matrix would be larger")
+def wide(n_rows, raw_data, seed, max_dense_mb):
+    """
+    Compares the time and peak memory of preprocessing and a Ridge fit on the default and wide feature sets.
+
+    The wide features are fitted with Ridge's sparse solvers and, if the
+    matrix fits `max_dense_mb`, densified with the default dense solver.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)
+    rows = []
+
+    def fit(preprocessor, X, y, solver, densify=False):
+        transformed = preprocessor.fit_transform(X)
+        if densify:
+            transformed = transformed.toarray()
+        return Ridge(alpha=1.0, solver=solver).fit(transformed, y), transformed.shape
+
+    for name in ("default", "wide"):
+        feature_set = load_feature_set(name)
+        X, y = data[feature_set["features"]], data[feature_set["target"]]
+        if feature_set["interactions"]:
+            preprocessor = create_wide_preprocessor(X, feature_set["interactions"],
+                                                    min_frequency=feature_set["min_frequency"])
+            n_columns = preprocessor.fit(X.head(10_000)).transform(X.head(1)).shape[1]
+            variants = [("sparse_cg", False), ("lsqr", False)]
+            if n_rows * n_columns * 8 / 1e6 <= max_dense_mb:
+                variants.append(("auto", True))
+        else:
+            preprocessor = create_preprocessor(X)
+            variants = [("auto", False)]
+        for solver, densify in variants:
+            (_, shape), elapsed, peak = measure(fit, preprocessor, X, y, solver, densify)
+            rows.append({"features": name, "columns": shape[1], "layout": "dense" if densify or
+                         not feature_set["interactions"] else "sparse", "solver": solver,
+                         "peak_mb": round(peak, 1), "time_s": round(elapsed, 2)})
+    print(f"Preprocess + Ridge fit on {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=500_000, help="Number of rows")
+@click.option("--n-columns", type=int, default=20, help="Number of categorical columns")
+@click.option("--cardinality", type=int, default=1000, help="Number of categories per column")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def encoding(n_rows, n_columns, cardinality, seed):
+    """
+    Compares the transform throughput of OneHotEncoder and CategoryCodeEncoder on wide, high-cardinality data.
+
+    Values are drawn from a Zipf-like distribution over string labels. The
+    encoders are fitted once and both give sparse output.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, cardinality + 1)
+    labels = np.array([f"category_{k:05d}" for k in range(cardinality)], dtype=object)
+    X = pd.DataFrame({f"col{j}": labels[rng.choice(cardinality, n_rows, p=weights / weights.sum())]
+                      for j in range(n_columns)})
+    X_category = X.astype("category")
+
+    one_hot = OneHotEncoder(drop="if_binary").fit(X)
+    codes = CategoryCodeEncoder(drop="if_binary").fit(X)
+    assert (one_hot.transform(X.head(10_000)) != codes.transform(X.head(10_000))).nnz == 0
+
+    rows = []
+    for name, encoder, data in [
+        ("OneHotEncoder, object columns", one_hot, X),
+        ("CategoryCodeEncoder, object columns", codes, X),
+        ("CategoryCodeEncoder, category columns", codes, X_category),
+    ]:
+        _, elapsed, peak = measure(encoder.transform, data)
+        rows.append({"method": name, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2),
+                     "rows_per_s": int(n_rows / elapsed)})
+    print(f"One-hot transform of {n_rows} rows, {n_columns} columns of {cardinality} categories")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic test rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--chunksize", type=int, multiple=True, default=(10_000, 100_000), help="Chunk sizes to compare")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def metrics(n_rows, raw_data, chunksize, seed):
+    """
+    Compares evaluating a test set from CSV in memory with the chunked evaluation of evaluate_model.py.
+
+    The pipeline is fitted on 10,000 rows of the default features; the
+    metrics of both evaluations must have the same bits.
+    """
+    profile = load_profile(raw_data)
+    features = load_feature_set("default")["features"]
+    train = generate_student_data(profile, 10_000, seed=seed)
+    pipeline = make_pipeline(create_preprocessor(train[features]), Ridge()).fit(train[features], train["G3"])
+    test = generate_student_data(profile, n_rows, seed=seed + 1)
+
+    def in_memory(X_path, y_path):
+        X, y = pd.read_csv(X_path), pd.read_csv(y_path)
+        y_pred = pipeline.predict(X)
+        mse = mean_squared_error(y, y_pred)
+        return mse, np.sqrt(mse), mean_absolute_error(y, y_pred)
+
+    def exact(X_path, y_path):
+        metrics = RegressionMetrics().update(pd.read_csv(y_path).to_numpy(), pipeline.predict(pd.read_csv(X_path)))
+        return metrics.mse, metrics.rmse, metrics.mae
+
+    def chunked(X_path, y_path, size):
+        metrics = RegressionMetrics()
+        for X, y in zip(pd.read_csv(X_path, chunksize=size), pd.read_csv(y_path, chunksize=size)):
+            metrics.update(y.to_numpy(), pipeline.predict(X))
+        return metrics.mse, metrics.rmse, metrics.mae
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        X_path, y_path = os.path.join(tmp_dir, "X_test.csv"), os.path.join(tmp_dir, "y_test.csv")
+        test[features].to_csv(X_path, index=False)
+        test[["G3"]].to_csv(y_path, index=False)
+        del test
+
+        reference, _, _ = measure(exact, X_path, y_path)
+        rows = []
+        for name, func, args in [("sklearn, in memory", in_memory, ()), ("exact sums, in memory", exact, ())] + [
+            (f"exact sums, chunks of {size}", chunked, (size,)) for size in chunksize
+        ]:
+            result, elapsed, peak = measure(func, X_path, y_path, *args)
+            rows.append({"method": name, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2),
+                         "mse": repr(float(result[0])), "same_bits": tuple(map(float, result)) == reference})
+    finally:
+        shutil.rmtree(tmp_dir)
+    print(f"Evaluation of {n_rows} test rows read from CSV")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=2_000_000, help="Number of synthetic test rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def slices(n_rows, raw_data, seed):
+    """
+    Compares the slice metrics of evaluate_model.py with a pandas groupby per grouping set.
+
+    Slices are every combination of the default slicing columns; the
+    predictions are the target plus Gaussian noise.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)
+    y_true = data["G3"].to_numpy(dtype=np.float64)
+    y_pred = y_true + np.random.default_rng(seed).normal(0, 3, size=n_rows)
+    sets = grouping_sets(SLICE_COLUMNS)
+
+    def groupby():
+        errors = data[SLICE_COLUMNS].assign(squared=(y_pred - y_true) ** 2, absolute=np.abs(y_pred - y_true),
+                                            bias=y_pred - y_true)
+        return [errors.groupby(list(grouping), observed=True)[["squared", "absolute", "bias"]].agg(["mean", "count"])
+                for grouping in sets]
+
+    rows = []
+    for name, func in [("pandas groupby per set", groupby),
+                       ("slice_metrics (bincount)", lambda: slice_metrics(data, y_true, y_pred, sets=sets))]:
+        result, elapsed, peak = measure(func)
+        n_slices = sum(len(frame) for frame in result) if isinstance(result, list) else len(result) - 1
+        rows.append({"method": name, "slices": n_slices, "peak_mb": round(peak, 1), "time_s": round(elapsed, 2)})
+    print(f"Metrics of {len(sets)} grouping sets on {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic rows to score")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def conformal(n_rows, raw_data, seed):
+    """
+    Measures the cost of attaching conformal intervals to the predictions of score.py.
+
+    The Ridge pipeline is fitted and calibrated on 10,000 rows of the default
+    features; the empirical coverage on the scored rows is reported as well.
+    """
+    profile = load_profile(raw_data)
+    features = load_feature_set("default")["features"]
+    train = generate_student_data(profile, 10_000, seed=seed)
+    data = generate_student_data(profile, n_rows, seed=seed + 1)
+    pipeline = make_pipeline(create_preprocessor(train[features]), Ridge())
+    calibration = calibrate(pipeline, train[features], train["G3"])
+    pipeline.fit(train[features], train["G3"])
+    X, y = data[features], data["G3"].to_numpy()
+    coverages = (0.8, 0.9, 0.95)
+
+    y_pred, predict_time, _ = measure(pipeline.predict, X)
+    scored, interval_time, _ = measure(calibration.interval_frame, y_pred, coverages)
+    rows = [{"step": "predict", "time_s": round(predict_time, 3), "us_per_row": round(1e6 * predict_time / n_rows, 3)},
+            {"step": f"{len(coverages)} intervals", "time_s": round(interval_time, 3),
+             "us_per_row": round(1e6 * interval_time / n_rows, 3)}]
+    print(f"Scoring {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+    for coverage in coverages:
+        covered = (scored[f"lower_{coverage * 100:g}"] <= y) & (y <= scored[f"upper_{coverage * 100:g}"])
+        print(f"coverage {coverage:g}: empirical {covered.mean():.4f}")
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic rows to score")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--chunksize", type=int, default=100_000, help="Rows per scoring chunk")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def drift(n_rows, raw_data, chunksize, seed):
+    """
+    Compares the time of the drift histograms and report of score.py with the prediction time.
+
+    The reference histograms come from 10,000 training rows; the batch is
+    scored in chunks of `chunksize` rows as score.py does.
+    """
+    profile = load_profile(raw_data)
+    features = load_feature_set("default")["features"]
+    train = generate_student_data(profile, 10_000, seed=seed)[features]
+    pipeline = make_pipeline(create_preprocessor(train), Ridge()).fit(train, np.zeros(len(train)))
+    reference = FeatureHistograms.for_columns(features).update(train)
+    batch = generate_student_data(profile, n_rows, seed=seed + 1)[features]
+    chunks = [batch.iloc[start:start + chunksize] for start in range(0, n_rows, chunksize)]
+
+    def predict():
+        return [pipeline.predict(chunk) for chunk in chunks]
+
+    def monitor():
+        current = FeatureHistograms(reference.domains)
+        for chunk in chunks:
+            current.update(chunk)
+        return drift_report(reference, current)
+
+    _, predict_time, _ = measure(predict)
+    report, monitor_time, peak = measure(monitor)
+    print(f"Scoring {n_rows} rows of {len(features)} features in chunks of {chunksize}")
+    print(pd.DataFrame([
+        {"step": "predict", "time_s": round(predict_time, 3)},
+        {"step": "drift histograms + report", "time_s": round(monitor_time, 3),
+         "share_of_predict": round(monitor_time / predict_time, 3), "peak_mb": round(peak, 1)},
+    ]).to_string(index=False))
+    print(report.to_string(index=False))
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=10_000, help="Number of synthetic rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--n-seeds", type=int, default=20, help="Number of split seeds")
+@click.option("--seed", type=int, default=123, help="First split seed")
+def seeds(n_rows, raw_data, n_seeds, seed):
+    """
+    Compares a GridSearchCV per split seed with the batched solve of fit_model.py --seeds.
+
+    Both grid-search the Ridge alpha of fit_model.py with 5 folds on the
+    training split of each seed and score the refitted model on its test split.
+    """
+    data = generate_student_data(load_profile(raw_data), n_rows, seed=seed)
+    features = load_feature_set("default")["features"]
+    X, y = data[features], data["G3"]
+    alphas = [0.1, 1, 10, 100]
+
+    def per_seed():
+        results = []
+        for split_seed in range(seed, seed + n_seeds):
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=split_seed)
+            search = GridSearchCV(make_pipeline(create_preprocessor(X_train), Ridge()), {"ridge__alpha": alphas},
+                                  cv=5, scoring="neg_mean_squared_error").fit(X_train, y_train)
+            results.append(mean_squared_error(y_test, search.predict(X_test)))
+        return np.array(results)
+
+    def batched():
+        preprocessor = create_preprocessor(X)
+        matrix, _, n_numeric = encode_once(preprocessor, X)
+        return ridge_seed_stability(matrix, y, n_numeric, alphas,
+                                    range(seed, seed + n_seeds))["test_mse"].to_numpy()
+
+    rows = []
+    for name, func in [("GridSearchCV per seed", per_seed), ("batched moments", batched)]:
+        result, elapsed, peak = measure(func)
+        rows.append({"method": name, "peak_mb": round(peak, 1), "time_s": round(elapsed, 3),
+                     "mean_test_mse": result.mean()})
+    print(f"Ridge grid search of {len(alphas)} alphas x 5 folds on {n_seeds} split seeds, {n_rows} rows")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+def _packed_group_means(records, layout, by, target, chunk_rows=10_000_000):
+    """Mean of `target` per combination of the `by` fields, counted on the packed records chunk by chunk."""
+    sizes = [1 << layout.bits[column] for column in by]
+    n_cells = int(np.prod(sizes))
+    counts, sums = np.zeros(n_cells), np.zeros(n_cells)
+    for start in range(0, len(records), chunk_rows):
+        chunk = records[start:start + chunk_rows]
+        key = np.zeros(len(chunk), dtype=np.int64)
+        for column, size in zip(by, sizes):
+            key = key * size + layout.codes(chunk, column)
+        counts += np.bincount(key, minlength=n_cells)
+        sums += np.bincount(key, weights=layout.codes(chunk, target), minlength=n_cells)
+    return sums[counts > 0] / counts[counts > 0] + layout.domains[target][0]
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=100_000_000, help="Number of synthetic rows of the packed dataset")
+@click.option("--baseline-rows", type=int, default=10_000_000,
+              help="Number of rows of the CSV and int64 baselines, extrapolated to --n-rows")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def packed(n_rows, baseline_rows, raw_data, seed):
+    """
+    Compares packed records with CSV and int64 columns for storing, loading and aggregating the student columns.
+
+    The packed dataset of `n_rows` rows is written and aggregated (mean G3 by
+    sex and failures) through its memory map. The CSV and in-memory int64
+    baselines are measured on `baseline_rows` rows, as they would not fit in
+    memory at 100M rows, and scaled linearly to `n_rows`.
+    """
+    profile = load_profile(raw_data)
+    if raw_data and os.path.isfile(raw_data):
+        # Only the packed columns, so that generation does not draw the other raw columns
+        profile = fit_student_profile(pd.read_csv(raw_data, delimiter=";")[COLUMNS])
+    by, target = ["sex", "failures"], "G3"
+    scale = n_rows / baseline_rows
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        write_student_packed(profile, os.path.join(directory, "packed"), n_rows, seed=seed)
+        generate_time = time.perf_counter() - start
+        packed_mb = os.path.getsize(os.path.join(directory, "packed", "records.npy")) / 1e6
+        records, layout = read_packed(os.path.join(directory, "packed"))
+        means, aggregate_time, aggregate_peak = measure(_packed_group_means, records, layout, by, target)
+        del records
+
+        frame = generate_student_data(profile, baseline_rows, seed=seed)[COLUMNS]
+        csv_path = os.path.join(directory, "baseline.csv")
+        frame.to_csv(csv_path, index=False)
+        csv_mb = os.path.getsize(csv_path) / 1e6
+        _, read_csv_time, read_csv_peak = measure(pd.read_csv, csv_path)
+        int64_mb = frame.memory_usage(index=False, deep=True).sum() / 1e6
+        _, groupby_time, _ = measure(lambda: frame.groupby(by)[target].mean())
+        encoded, encode_time, _ = measure(layout.encode, frame)
+        _, decode_time, decode_peak = measure(layout.decode, encoded)
+        write_packed(os.path.join(directory, "baseline"), frame, layout)
+        _, load_time, _ = measure(lambda: read_packed(os.path.join(directory, "baseline"), mmap=False))
+        baseline_means = frame.groupby(by)[target].mean().to_numpy()
+    finally:
+        shutil.rmtree(directory)
+
+    print(f"Packed layout: {layout.total_bits} bits per row in {layout.dtype}, fields {layout.bits}")
+    print(f"Generated and wrote {n_rows} packed rows in {generate_time:.1f}s")
+    print(pd.DataFrame([
+        {"format": "CSV", "mb_per_1m_rows": round(csv_mb / baseline_rows * 1e6, 1),
+         "size_mb": round(csv_mb * scale), "load_s": round(read_csv_time * scale, 1),
+         "load_peak_mb": round(read_csv_peak * scale), "group_mean_s": round(groupby_time * scale, 2)},
+        {"format": "int64 columns (pd.read_csv)", "mb_per_1m_rows": round(int64_mb / baseline_rows * 1e6, 1),
+         "size_mb": round(int64_mb * scale), "group_mean_s": round(groupby_time * scale, 2)},
+        {"format": f"packed {layout.dtype}", "mb_per_1m_rows": round(packed_mb / n_rows * 1e6, 1),
+         "size_mb": round(packed_mb), "load_s": round(load_time * scale, 2),
+         "group_mean_s": round(aggregate_time, 2), "group_mean_peak_mb": round(aggregate_peak)},
+    ]).to_string(index=False))
+    print(f"CSV and int64 rows measured on {baseline_rows} rows and scaled by {scale:g}; packed rows measured on "
+          f"{n_rows} rows (load_s reads the whole file, aggregation streams the memory map)")
+    print(f"Encode {baseline_rows / encode_time / 1e6:.0f}M rows/s, decode {baseline_rows / decode_time / 1e6:.0f}M "
+          f"rows/s (decode peak {decode_peak:.0f} MB)")
+    print(f"Mean {target} by {', '.join(by)} on {n_rows} packed rows: {np.round(means, 3)}; "
+          f"on the {baseline_rows} baseline rows: {np.round(baseline_means, 3)}")
+
+
+@cli.command()
+@click.option("--n-rows", type=int, default=1_000_000, help="Number of synthetic rows of the raw CSV file")
+@click.option("--raw-data", type=str, default=RAW_DATA, help="Raw data to learn the synthetic profile from")
+@click.option("--seed", type=int, default=123, help="Random seed")
+def read(n_rows, raw_data, seed):
+    """
+    Compares reading the analysis columns of a raw CSV file with pd.read_csv and with the pyarrow CSV engine.
+
+    The file has all raw columns, quoted as in data/raw. "pd.read_csv" is the
+    former path of validate.py and load_valid_data: parse everything, then
+    select the columns.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "raw.csv")
+        write_student_csv(load_profile(raw_data), path, n_rows, seed=seed)
+        size_mb = os.path.getsize(path) / 1e6
+        readers = [
+            ("pd.read_csv, then select", lambda: pd.read_csv(path, delimiter=";")[COLUMNS]),
+            ("pd.read_csv usecols", lambda: pd.read_csv(path, delimiter=";", usecols=COLUMNS)[COLUMNS]),
+            ("pyarrow, 1 thread", lambda: read_student_csv(path, columns=COLUMNS, use_threads=False)),
+            (f"pyarrow, threads on {os.cpu_count()} cores", lambda: read_student_csv(path, columns=COLUMNS)),
+        ]
+        rows, reference = [], None
+        for name, func in readers:
+            func()  # warm the page cache
+            start = time.perf_counter()
+            data = func()
+            elapsed = time.perf_counter() - start
+            reference = data.astype(object) if reference is None else reference
+            rows.append({"reader": name, "time_s": round(elapsed, 3), "mb_per_s": round(size_mb / elapsed),
+                         "frame_mb": round(data.memory_usage(index=False, deep=True).sum() / 1e6, 1),
+                         "same_values": data.astype(object).equals(reference)})
+    finally:
+        shutil.rmtree(directory)
+    print(f"Reading {len(COLUMNS)} of the raw columns of {n_rows} rows ({size_mb:.0f} MB)")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    cli()
@@ -2,16 +2,19 @@
 python scripts/download_data.py \
     --url='https://archive.ics.uci.edu/static/public/320/student+performance.zip' \
     --out-dir='data/raw' \
-    --raw-filename='student-mat.csv'
+    --raw-filename='student-mat.csv' \
+    --in-memory
 """
 
-import requests
 from pathlib import Path
 import os
 import sys
 import zipfile
 import shutil
 import click
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import Tracer, instrumentation_options
+from src.download_utils import download_file, download_bytes, read_nested_member
 
 # url = "https://archive.ics.uci.edu/static/public/320/student+performance.zip"
 
@@ -23,7 +26,13 @@ import click
 )
 @click.option("--raw-filename", type=str, help="The raw data file name")
 @click.option('--force', is_flag=True, help='Download the data forcefully without checking if file exists')
-def download_uci_data(url, out_dir, raw_filename, force):
+@click.option("--sha256", type=str, default=None, help="Expected SHA-256 of the downloaded archive")
+@click.option(
+    "--in-memory", is_flag=True,
+    help="Extract the raw file from the nested archives in memory instead of unpacking them to data/zip",
+)
+@instrumentation_options
+def download_uci_data(url, out_dir, raw_filename, force, sha256, in_memory, profile, metrics_out):
     
     """
     Downloads and extracts a dataset from a given URL, saving the raw data file to a specified directory.
@@ -38,6 +47,17 @@ def download_uci_data(url, out_dir, raw_filename, force):
         The name of the raw data file to be extracted and saved.
     force : bool
         If True, forces a download and overwrite even if the file already exists.
+    sha256 : str
+        Expected hex SHA-256 of the downloaded archive. The download fails if it
+        doesn't match; the computed checksum is printed so it can be pinned.
+    in_memory : bool
+        If True, the archive is downloaded into memory, the inner `student.zip`
+        is opened in memory and only `raw_filename` is written, to `out_dir`.
+        Otherwise the archive is saved to data/zip and both archives are unpacked there.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
 
     Returns
     -------
@@ -65,23 +85,44 @@ def download_uci_data(url, out_dir, raw_filename, force):
         print("File already existed, exitting script...")
         sys.exit()
     
-    response = requests.get(url, stream=True)
-    print(os.getcwd())
-    with open(zip1, "wb") as file:
-        for chunk in response.iter_content(chunk_size=8192):
-            file.write(chunk)
-        print(f"File downloaded successfully.")
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    if in_memory:
+        with tracer.span("download") as span:
+            archive, checksum = download_bytes(url, expected_sha256=sha256)
+            span.rows = len(archive)
+        print(f"File downloaded successfully (SHA-256 {checksum}).")
+
+        with tracer.span("extract"):
+            content = read_nested_member(archive, raw_filename)
+
+        with tracer.span("save"):
+            os.makedirs(dest_path, exist_ok=True)
+            with open(os.path.join(dest_path, raw_filename), "wb") as file:
+                file.write(content)
+        tracer.report(metrics_out)
+        return
+
+    # Interrupted downloads resume from student_performance.zip.part
+    with tracer.span("download"):
+        os.makedirs(zip_dir, exist_ok=True)
+        checksum = download_file(url, zip1, expected_sha256=sha256)
+        print(f"File downloaded successfully (SHA-256 {checksum}).")
     
     # Extract the outer zip file (student_performance.zip)
-    with zipfile.ZipFile(zip1, "r") as zip_ref:
-        zip_ref.extractall(zip_dir)
+    with tracer.span("extract outer zip"):
+        with zipfile.ZipFile(zip1, "r") as zip_ref:
+            zip_ref.extractall(zip_dir)
     # Extract the inner zip file (student.zip)
-    with zipfile.ZipFile(zip2, "r") as zip_ref:
-        zip_ref.extractall(zip_dir)
+    with tracer.span("extract inner zip"):
+        with zipfile.ZipFile(zip2, "r") as zip_ref:
+            zip_ref.extractall(zip_dir)
     
     # copy the file to data/raw
-    file_path = os.path.join(zip_dir, raw_filename)
-    shutil.copy(file_path, dest_path)
+    with tracer.span("save"):
+        file_path = os.path.join(zip_dir, raw_filename)
+        shutil.copy(file_path, dest_path)
+
+    tracer.report(metrics_out)
 
 if __name__ == "__main__":
     download_uci_data()
\ No newline at end of file
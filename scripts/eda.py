@@ -15,12 +15,17 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import src.plot_utils as eda 
+from src.instrumentation import Tracer, instrumentation_options
+from src.split_store import read_split_store
 
 
 @click.command()
 @click.option("--train-df-path", type=str, help="relative path of the train DataFrame")
+@click.option("--store", type=str, default=None,
+              help="Split store to read the training split from instead of --train-df-path")
 @click.option("--outdir", type=str, help="relative path of to save the EDA figures")
-def plot_eda(train_df_path, outdir):
+@instrumentation_options
+def plot_eda(train_df_path, store, outdir, profile, metrics_out):
 
     """
     Generates and saves exploratory data analysis (EDA) figures, including a target distribution plot, 
@@ -30,8 +35,15 @@ def plot_eda(train_df_path, outdir):
     ----------
     train_df_path : str
         Relative path to the training DataFrame CSV file.
+    store : str
+        Path to a split store written by `split_preprocess.py --split-mode=store`.
+        If given, the training split is memory-mapped from it instead.
     outdir : str
         Relative path to the directory where the EDA figures will be saved.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
 
     Returns
     -------
@@ -51,7 +63,13 @@ def plot_eda(train_df_path, outdir):
     ```
     """
 
-    train_df = pd.read_csv(train_df_path)
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    with tracer.span("load") as span:
+        if store:
+            train_df = read_split_store(store, split="train")
+        else:
+            train_df = pd.read_csv(train_df_path)
+        span.rows = len(train_df)
     os.makedirs(outdir, exist_ok=True)
 
     # distribution histogram
@@ -64,16 +82,18 @@ def plot_eda(train_df_path, outdir):
         "width": 400,
         "height": 200
     }
-    dist_plot = eda.distribution_plot(train_df=train_df,xy_enc=xy_enc, **props)
-    saved_path = Path(outdir, "g3_dist.png")
-    dist_plot.save(saved_path)
+    with tracer.span("render g3_dist.png", rows=len(train_df)):
+        dist_plot = eda.distribution_plot(train_df=train_df,xy_enc=xy_enc, **props)
+        saved_path = Path(outdir, "g3_dist.png")
+        dist_plot.save(saved_path)
     print(f"Saved figure to {saved_path}")
 
     # variables density plots
     props = {"nrows": 3, "ncols": 3, "figsize": (8, 8), "sharey": False, "sharex": False}
-    fig, axes = eda.density_plots(train_df=train_df, **props)
-    saved_path =Path(outdir, "density_plots.png")
-    fig.savefig(saved_path)
+    with tracer.span("render density_plots.png", rows=len(train_df)):
+        fig, axes = eda.density_plots(train_df=train_df, **props)
+        saved_path =Path(outdir, "density_plots.png")
+        fig.savefig(saved_path)
     print(f"Saved figure to {saved_path}")
 
     # correlation matrix plot
@@ -82,11 +102,13 @@ def plot_eda(train_df_path, outdir):
         "height": 250,
         "title": "Pairwise correlations between variables (including target)"
     }
-    corr_mat_chart = eda.pearson_corr_plot(train_df=train_df, **props)
-    saved_path = Path(outdir, "corr_mat.png")
-    corr_mat_chart.save(saved_path)
+    with tracer.span("render corr_mat.png", rows=len(train_df)):
+        corr_mat_chart = eda.pearson_corr_plot(train_df=train_df, **props)
+        saved_path = Path(outdir, "corr_mat.png")
+        corr_mat_chart.save(saved_path)
     print(f"Saved figure to {saved_path}")
 
+    tracer.report(metrics_out)
     return (dist_plot, fig, corr_mat_chart)
 
 if __name__ == "__main__":
@@ -12,22 +12,65 @@ python scripts/evaluate_model.py \
 
 import click
 import os
+import sys
 import pickle
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.metrics import mean_squared_error, mean_absolute_error
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.bootstrap import bootstrap_metrics
+from src.conformal import IntervalCoverage
+from src.artifact_writer import ArtifactWriter
+from src.instrumentation import Tracer, instrumentation_options
+from src.model_search import MODEL_FAMILIES
+from src.permutation_importance import permutation_importance
+from src.slice_metrics import SLICE_COLUMNS, grouping_sets, slice_metrics
+from src.split_store import read_xy
+from src.streaming_metrics import RegressionMetrics
+
+# Wide feature sets have thousands of coefficients; only the largest are plotted
+MAX_PLOTTED_COEFFICIENTS = 30
+
+
+def _test_chunks(X_test, y_test, store, chunksize):
+    """Yield (X, y) chunks of the test split, holding one chunk of the CSVs in memory at a time."""
+    if store:
+        # Memory-mapped columns are only paged in as each slice is predicted
+        X, y = read_xy(store, split="test")
+        for start in range(0, len(X), chunksize):
+            yield X.iloc[start:start + chunksize], y.iloc[start:start + chunksize]
+        return
+    X_reader = pd.read_csv(X_test, chunksize=chunksize)
+    y_reader = pd.read_csv(y_test, chunksize=chunksize)
+    for X_chunk, y_chunk in zip(X_reader, y_reader):
+        if len(X_chunk) != len(y_chunk):
+            raise ValueError(f"{X_test} and {y_test} have different numbers of rows.")
+        yield X_chunk, y_chunk
 
 
 @click.command()
-@click.option('--y-test', type=str, required=True, help="Path to y test data")
-@click.option('--X-test', 'X_test',type=str, required=True, help="Path to X test data")
+@click.option('--y-test', type=str, help="Path to y test data")
+@click.option('--X-test', 'X_test',type=str, help="Path to X test data")
+@click.option('--store', type=str, default=None, help="Split store to read the test split from instead of --X-test/--y-test")
 @click.option('--best-model', type=str, required=True, help="Path to best model (pickle file)")
 @click.option('--metrics-to', type=str, required=True, help="Path to directory where metrics will be saved")
 @click.option('--coefs-to', type=str, required=True, help="Path to directory where coefficients will be saved")
 @click.option('--plot-to', type=str, required=True, help="Path to directory where plots will be saved")
-   
-def main(y_test, X_test, best_model, metrics_to, coefs_to, plot_to):
+@click.option('--n-bootstrap', type=int, default=1000, help="Number of bootstrap resamples of the metrics; 0 disables the intervals")
+@click.option('--confidence', type=float, default=0.95, help="Confidence level of the bootstrap intervals")
+@click.option('--importance-repeats', type=int, default=5, help="Number of permutations per column for the permutation importance; 0 disables it")
+@click.option('--n-jobs', type=int, default=1, help="Number of worker processes for the bootstrap and the permutation importance")
+@click.option('--seed', type=int, default=123, help="Random seed of the bootstrap")
+@click.option('--chunksize', type=int, default=None, help="Evaluate the test set in chunks of this many rows without keeping the predictions")
+@click.option('--slice-by', type=str, multiple=True, default=SLICE_COLUMNS, help="Columns the metrics are broken down by, alone and in combinations (default: sex, age, failures, studytime)")
+@click.option('--max-slice-order', type=int, default=len(SLICE_COLUMNS), help="Largest number of columns combined in a slice; 0 disables the slices")
+@click.option('--slice-min-count', type=int, default=30, help="Smallest slice tested against the other rows")
+@click.option('--calibration', type=str, default=None, help="Conformal calibration of the model (default: conformal_calibration.pkl next to --best-model, if any)")
+@click.option('--coverage', 'coverages', type=float, multiple=True, default=(0.8, 0.9, 0.95), help="Nominal coverage of the prediction intervals to validate; repeat for several")
+@click.option('--residual-bins', type=int, default=0, help="Number of bins of the residual histogram; 0 disables it")
+@instrumentation_options
+def main(y_test, X_test, store, best_model, metrics_to, coefs_to, plot_to, n_bootstrap, confidence,
+         importance_repeats, n_jobs, seed, chunksize, slice_by, max_slice_order, slice_min_count, calibration, coverages, residual_bins, profile, metrics_out):
     """
     Evaluates the performance predictor on the test data 
     and saves the evaluation results, including metrics table, coefficients table, and coefficients bar plot.
@@ -38,6 +81,9 @@ def main(y_test, X_test, best_model, metrics_to, coefs_to, plot_to):
 		Path to the y test dataset.
 	X_test: str
 		Path to the X test dataset.
+	store: str
+		Path to a split store written by `split_preprocess.py --split-mode=store`.
+		If given, the test split is memory-mapped from it instead of reading `X_test` and `y_test`.
 	best_model: str
 		Path to the best model object.
 	Metrics_to: str
@@ -46,14 +92,60 @@ def main(y_test, X_test, best_model, metrics_to, coefs_to, plot_to):
 		Path where the coefficients table will be saved.
 	Plot_to: str
 		Path where the bar plot of coefficients will be saved.
+	n_bootstrap: int
+		Number of bootstrap resamples of the test set used for the confidence intervals
+		of the metrics. Defaults to 1000; 0 leaves the intervals empty.
+	confidence: float
+		Confidence level of the intervals. Defaults to 0.95.
+	importance_repeats: int
+		Number of permutations of each input column for the permutation importance
+		on the test set. Defaults to 5; 0 skips the permutation importance.
+	n_jobs: int
+		Number of worker processes for the bootstrap and the permutation importance. Defaults to 1.
+	seed: int
+		Random seed of the bootstrap and the permutation importance. Defaults to 123.
+	chunksize: int
+		If given, the test set is read, predicted and scored this many rows at a time, and
+		only running sums are kept, so memory does not grow with the test set. The metrics
+		are the same as without chunks; the bootstrap intervals, slice metrics and
+		permutation importance need all predictions and are skipped.
+	slice_by: tuple
+		Columns of the test set the metrics are broken down by. Defaults to sex, age, failures and studytime.
+	max_slice_order: int
+		Slices are the values of every combination of up to this many `slice_by` columns.
+		Defaults to all of them; 0 skips the slice metrics.
+	slice_min_count: int
+		Slices with at least this many rows are tested for a larger MSE than the other rows,
+		with a false discovery rate of 1 - `confidence`. Defaults to 30.
+	calibration: str
+		Path to the conformal calibration written by `fit_model.py`. Defaults to
+		`conformal_calibration.pkl` in the directory of `best_model`; without one,
+		the prediction intervals are not validated.
+	coverages: tuple
+		Nominal coverage levels of the prediction intervals whose empirical coverage
+		on the test set is reported. Defaults to 0.8, 0.9 and 0.95.
+	residual_bins: int
+		Number of bins of a histogram of the residuals over [-20, 20], with open outer bins.
+		Defaults to 0, no histogram.
+	profile: bool
+		If True, prints per-stage timings and cProfile stats of the slowest stage.
+	metrics_out: str
+		Path of a JSON file where per-stage timings are written (Chrome trace format).
 		
 	Returns
 	-------
 	 None
     	The function does not return any values but saves the following outputs to the specified paths:
-	    - A CSV file containing evaluation metrics (saved to the path specified by `metrics_to`).
+	    - A CSV file containing evaluation metrics and their bootstrap confidence intervals (saved to the path specified by `metrics_to`).
+	    - A CSV file with summary statistics of the residuals and, if `residual_bins` is set,
+	      a CSV file with their histogram (saved to the path specified by `metrics_to`).
+	    - A CSV file with the nominal and empirical coverage of the conformal prediction intervals,
+	      if the model is calibrated (saved to the path specified by `metrics_to`).
+	    - A CSV file with the metrics of each slice of the test set (saved to the path specified by `metrics_to`).
 	    - A CSV file containing the coefficients table (saved to the path specified by `coefs_to`).
 	    - A bar plot of coefficients in PNG format (saved to the path specified by `plot_to`).
+	    - A CSV file with the permutation importance of the input columns (saved next to the coefficients table)
+	      and its bar plot (saved to the path specified by `plot_to`).
 	
 	Examples
 	--------
@@ -74,53 +166,167 @@ def main(y_test, X_test, best_model, metrics_to, coefs_to, plot_to):
     os.makedirs(coefs_to, exist_ok=True)
     os.makedirs(plot_to, exist_ok=True)
     
-    # Load test data
-    y_test = pd.read_csv(y_test)
-    X_test = pd.read_csv(X_test)
+    if store is None and (X_test is None or y_test is None):
+        raise click.UsageError("Pass either --store or both --X-test and --y-test.")
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    # Tables and plots are written in the background while the evaluation goes on
+    with ArtifactWriter() as writer:
+        if chunksize is not None and chunksize < 1:
+            raise click.UsageError("--chunksize must be a positive number of rows.")
+        metrics = RegressionMetrics(histogram_bins=residual_bins)
 
-    # Load the best model
-    with open(best_model, 'rb') as f:
-        best_model = pickle.load(f)
-    
-    # Make predictions
-    y_pred = best_model.predict(X_test)
-
-    # Calculate performance metrics
-    mse = mean_squared_error(y_true=y_test, y_pred=y_pred)
-    rmse = np.sqrt(mse)
-    mae = mean_absolute_error(y_true=y_test,y_pred=y_pred)
-
-    # Save metrics
-    metrics_df = pd.DataFrame({
-        "Metric": ["Mean Squared Error (MSE)", 
-                   "Root Mean Squared Error (RMSE)", 
-                   "Mean Absolute Error (MAE)"],
-        "Value": [mse, rmse, mae]
-    })
-    metrics_path = os.path.join(metrics_to, "evaluation_metrics.csv")
-    metrics_df.to_csv(metrics_path, index=False)
-    print(f"Metrics saved to {metrics_path}")
-    
-    # Extract and save coefficients
-    coefs = best_model.named_steps['ridge'].coef_
-    feature_names = best_model.named_steps['columntransformer'].get_feature_names_out().tolist()
-
-    coefs_df = pd.DataFrame({"features": feature_names, "coefs": coefs})
-    coefs_path = os.path.join(coefs_to, "ridge_coefficients.csv")
-    coefs_df.to_csv(coefs_path, index=False)
-    print(f"Coefficients saved to {coefs_path}")
+        # Load the best model and the calibration of its prediction intervals
+        if calibration is None:
+            calibration = os.path.join(os.path.dirname(best_model), "conformal_calibration.pkl")
+            calibration = calibration if os.path.exists(calibration) else None
+        with tracer.span("load model"):
+            with open(best_model, 'rb') as f:
+                best_model = pickle.load(f)
+            if calibration:
+                with open(calibration, 'rb') as f:
+                    calibration = pickle.load(f)
+        coverage = IntervalCoverage(calibration, coverages) if calibration else None
+
+        if chunksize:
+            # Predict and score chunk by chunk; only the running sums are kept
+            with tracer.span("chunked metrics") as span:
+                for X_chunk, y_chunk in _test_chunks(X_test, y_test, store, chunksize):
+                    chunk_pred = best_model.predict(X_chunk)
+                    metrics.update(y_chunk.to_numpy(), chunk_pred)
+                    if coverage:
+                        coverage.update(y_chunk.to_numpy(), chunk_pred)
+                span.rows = metrics.count
+            if n_bootstrap > 0 or importance_repeats > 0 or max_slice_order > 0:
+                print("Chunked evaluation keeps no predictions; skipping the bootstrap intervals, "
+                      "slice metrics and permutation importance")
+            n_bootstrap = importance_repeats = max_slice_order = 0
+        else:
+            # Load test data
+            with tracer.span("load") as span:
+                if store:
+                    X_test, y_test = read_xy(store, split="test")
+                else:
+                    y_test = pd.read_csv(y_test)
+                    X_test = pd.read_csv(X_test)
+                span.rows = len(X_test)
+
+            # Make predictions
+            with tracer.span("predict", rows=len(X_test)):
+                y_pred = best_model.predict(X_test)
+
+            # Calculate performance metrics, summed exactly as in the chunked evaluation
+            with tracer.span("metrics", rows=len(X_test)):
+                metrics.update(np.asarray(y_test), y_pred)
+                if coverage:
+                    coverage.update(np.asarray(y_test), y_pred)
+        mse, rmse, mae = metrics.mse, metrics.rmse, metrics.mae
+
+        # Bootstrap confidence intervals of the metrics
+        with tracer.span("bootstrap", rows=metrics.count):
+            if n_bootstrap > 0:
+                intervals = bootstrap_metrics(np.asarray(y_test), y_pred, n_resamples=n_bootstrap,
+                                              confidence=confidence, random_state=seed, n_jobs=n_jobs)
+            else:
+                intervals = pd.DataFrame({"lower": np.nan, "upper": np.nan}, index=["MSE", "RMSE", "MAE"])
+
+        # Save metrics
+        metrics_df = pd.DataFrame({
+            "Metric": ["Mean Squared Error (MSE)", 
+                       "Root Mean Squared Error (RMSE)", 
+                       "Mean Absolute Error (MAE)"],
+            "Value": [mse, rmse, mae],
+            "Lower": intervals["lower"].to_numpy(),
+            "Upper": intervals["upper"].to_numpy(),
+        })
+        metrics_path = os.path.join(metrics_to, "evaluation_metrics.csv")
+        with tracer.span("save metrics"):
+            writer.to_csv(metrics_df, metrics_path, index=False)
+        print(f"Metrics saved to {metrics_path}")
+
+        residuals_path = os.path.join(metrics_to, "residual_summary.csv")
+        writer.to_csv(metrics.residual_summary(), residuals_path, index=False)
+        print(f"Residual summary saved to {residuals_path}")
+        if residual_bins > 0:
+            histogram_path = os.path.join(metrics_to, "residual_histogram.csv")
+            writer.to_csv(metrics.residual_histogram(), histogram_path, index=False)
+            print(f"Residual histogram saved to {histogram_path}")
     
-    # Save bar plot of coefficients
-    plt.figure(figsize=(10, 6))
-    plt.bar(feature_names, coefs)
-    plt.xlabel("Features")
-    plt.ylabel("Coefficient Value")
-    plt.title("Ridge Regression Coefficients")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plot_path = os.path.join(plot_to, "coefficients_plot.png")
-    plt.savefig(plot_path)
-    print(f"Coefficient plot saved to {plot_path}")
+        # Empirical coverage of the conformal prediction intervals
+        if coverage:
+            coverage_df = coverage.to_frame()
+            coverage_path = os.path.join(metrics_to, "interval_coverage.csv")
+            writer.to_csv(coverage_df, coverage_path, index=False)
+            print("Coverage of the prediction intervals on the test set:")
+            print(coverage_df.to_string(index=False))
+
+        # Metrics of each slice of the test set, flagging slices worse than the other rows
+        if max_slice_order > 0:
+            with tracer.span("slice metrics", rows=metrics.count):
+                slices_df = slice_metrics(X_test, y_test, y_pred, sets=grouping_sets(list(slice_by), max_slice_order),
+                                          alpha=1 - confidence, min_count=slice_min_count)
+            slices_path = os.path.join(metrics_to, "slice_metrics.csv")
+            writer.to_csv(slices_df, slices_path, index=False)
+            print(f"Metrics of {len(slices_df) - 1} slices saved to {slices_path}; "
+                  f"{int(slices_df['worse'].sum())} significantly worse than the other rows")
+
+        # Extract and save coefficients, if the model is linear
+        model_name, model = best_model.steps[-1]
+        if hasattr(model, "coef_"):
+            coefs = model.coef_
+            feature_names = best_model.named_steps['columntransformer'].get_feature_names_out().tolist()
+
+            coefs_df = pd.DataFrame({"features": feature_names, "coefs": coefs})
+            coefs_path = os.path.join(coefs_to, f"{model_name}_coefficients.csv")
+            with tracer.span("save coefficients"):
+                writer.to_csv(coefs_df, coefs_path, index=False)
+            print(f"Coefficients saved to {coefs_path}")
+
+            # Save bar plot of coefficients
+            with tracer.span("render coefficients_plot.png"):
+                title = f"{MODEL_FAMILIES.get(model_name, (type(model).__name__,))[0]} Coefficients"
+                plotted = np.arange(len(coefs))
+                if len(coefs) > MAX_PLOTTED_COEFFICIENTS:
+                    plotted = np.sort(np.argsort(np.abs(coefs))[-MAX_PLOTTED_COEFFICIENTS:])
+                    title += f" ({MAX_PLOTTED_COEFFICIENTS} largest of {len(coefs)})"
+                fig = plt.figure(figsize=(10, 6))
+                plt.bar(np.asarray(feature_names)[plotted], coefs[plotted])
+                plt.xlabel("Features")
+                plt.ylabel("Coefficient Value")
+                plt.title(title)
+                plt.xticks(rotation=45)
+                plt.tight_layout()
+                plot_path = os.path.join(plot_to, "coefficients_plot.png")
+                writer.savefig(fig, plot_path)
+            print(f"Coefficient plot saved to {plot_path}")
+        else:
+            print(f"{type(model).__name__} has no coefficients to save")
+
+        # Permutation importance of the original input columns
+        if importance_repeats > 0:
+            with tracer.span("permutation importance", rows=len(X_test)):
+                importance_df = permutation_importance(best_model, X_test, y_test, n_repeats=importance_repeats,
+                                                       random_state=seed, n_jobs=n_jobs)
+            importance_path = os.path.join(coefs_to, "permutation_importance.csv")
+            writer.to_csv(importance_df, importance_path, index=False)
+            print(f"Permutation importance saved to {importance_path}")
+
+            with tracer.span("render permutation_importance_plot.png"):
+                fig = plt.figure(figsize=(10, 6))
+                plt.bar(importance_df["feature"], importance_df["importance_mean"],
+                        yerr=importance_df["importance_std"])
+                plt.xlabel("Features")
+                plt.ylabel("Increase in MSE")
+                plt.title("Permutation Importance on the Test Set")
+                plt.xticks(rotation=45)
+                plt.tight_layout()
+                importance_plot_path = os.path.join(plot_to, "permutation_importance_plot.png")
+                writer.savefig(fig, importance_plot_path)
+            print(f"Permutation importance plot saved to {importance_plot_path}")
+
+        with tracer.span("flush writes"):
+            writer.flush()
+
+    tracer.report(metrics_out)
 
 
 if __name__ == '__main__':
@@ -4,28 +4,66 @@ import click
 import os
 import numpy as np
 import pandas as pd
-import pickle
 from sklearn.dummy import DummyRegressor
 from sklearn.linear_model import Ridge
-from sklearn.compose import make_column_transformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.pipeline import make_pipeline
 from sklearn.model_selection import GridSearchCV, cross_validate, train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error
 import matplotlib.pyplot as plt
+import sys
 import warnings
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.artifact_writer import ArtifactWriter
+from src.conformal import calibrate
+from src.instrumentation import Tracer, instrumentation_options
+from src.model_search import MODEL_FAMILIES, make_candidates, successive_halving_search
+from src.preprocessor import create_preprocessor, create_wide_preprocessor
+from src.feature_config import feature_set_names, load_feature_set
+from src.split_store import read_xy
+from src.split_data import save_split_indices
+from src.seed_stability import ridge_seed_stability, summarize_stability
+from src.shared_cv import encode_once, SharedFoldData
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+# Wide feature sets have thousands of coefficients; only the largest are plotted
+MAX_PLOTTED_COEFFICIENTS = 30
+
 
 @click.command()
 @click.option('--training-data', type=str, help="Path to training data")
+@click.option('--store', type=str, default=None, help="Split store to read the training split from instead of --training-data")
 @click.option('--pipeline-to', type=str, help="Path to directory where the pipeline object will be written to")
 @click.option('--model-to', type=str, help="Path to directory where the best model will be saved")
 @click.option('--test-data-to', type=str, help="Path to directory where test data (X_test, y_test) will be saved")
 @click.option('--plot-to', type=str, help="Path to directory where the plots and tables will be written")
 @click.option('--seed', type=int, help="Random seed", default=123)
-def main(training_data, pipeline_to, model_to, test_data_to, plot_to, seed):
+@click.option('--dtype', type=click.Choice(["float64", "float32"]), default="float64",
+              help="Floating point dtype of the preprocessed features")
+@click.option('--sparse', is_flag=True, help="Keep one-hot encoded features sparse")
+@click.option('--n-jobs', type=int, default=1, help="Number of parallel cross-validation workers")
+@click.option('--shared-cv', is_flag=True,
+              help="Encode the training data once and share it with the cross-validation workers")
+@click.option('--search', type=click.Choice(["grid", "halving"]), default="grid",
+              help="Grid-search Ridge, or search several model families with successive halving")
+@click.option('--model', 'models', type=click.Choice(list(MODEL_FAMILIES)), multiple=True,
+              help="Model family of the halving search; repeat for several (default is all)")
+@click.option('--halving-factor', type=int, default=3,
+              help="Factor by which the halving search grows the rows and cuts the candidates")
+@click.option('--time-budget', type=float, default=None,
+              help="Seconds after which the halving search starts no new fit")
+@click.option('--feature-set', type=click.Choice(feature_set_names()), default="default",
+              help="Feature set of config/features.json to train on")
+@click.option('--encoding', type=click.Choice(["onehot", "codes"]), default="onehot",
+              help="Encode categorical columns with OneHotEncoder or through category codes")
+@click.option('--conformal/--no-conformal', default=True,
+              help="Calibrate conformal prediction intervals on the out-of-fold predictions of the best model")
+@click.option('--seeds', type=int, default=0,
+              help="Also grid-search and test Ridge on this many split seeds from --seed on, in one batched solve")
+@instrumentation_options
+def main(training_data, store, pipeline_to, model_to, test_data_to, plot_to, seed, dtype, sparse,
+         n_jobs, shared_cv, search, models, halving_factor, time_budget, feature_set, encoding,
+         conformal, seeds, profile, metrics_out):
     """
     Fits a student performance regression model to the training data, tunes its hyperparameters, and saves the results.
 
@@ -40,6 +78,12 @@ def main(training_data, pipeline_to, model_to, test_data_to, plot_to, seed):
     ----------
     training_data : str
         Path to the CSV file containing the training data.
+    store : str
+        Path to a split store written by `split_preprocess.py --split-mode=store`.
+        If given, the training split is memory-mapped from it and the held-out
+        rows are saved as positional indices (`store_train_split.npz`) instead of
+        CSV files. These are positions within the store's "train" split, unlike
+        the raw-file row indices of `split_preprocess.py`'s `split_indices.npz`.
     pipeline_to : str
         Path to the directory where the trained pipeline object will be saved.
     model_to : str
@@ -50,6 +94,60 @@ def main(training_data, pipeline_to, model_to, test_data_to, plot_to, seed):
         Path to the directory where the plots and tables will be saved.
     seed : int
         Random seed for reproducibility. Defaults to 123.
+    dtype : str
+        Floating point dtype of the preprocessed features, "float64" or "float32".
+        Defaults to "float64".
+    sparse : bool
+        If True, one-hot encoded features stay sparse through Ridge fitting.
+    n_jobs : int
+        Number of worker processes for the baseline cross-validation and the
+        grid search. Defaults to 1.
+    shared_cv : bool
+        If True, the categorical features are one-hot encoded once and the
+        training matrix is memory-mapped by the workers instead of being
+        pickled to them; only the numeric scaling is refitted per fold. The
+        results have the same layout as with `GridSearchCV`. Requires dense
+        features.
+    search : str
+        "grid" (default) grid-searches the Ridge alpha. "halving" searches the
+        model families of `src.model_search.MODEL_FAMILIES` on the same
+        preprocessing with successive halving over the number of training
+        rows; the leaderboard of all candidates is written in place of the
+        grid search results and the overall winner is saved as the best model.
+    models : tuple
+        Model families of the halving search (default is all of them).
+    halving_factor : int
+        At each halving round, the rows grow and the candidates shrink by this
+        factor. Defaults to 3.
+    time_budget : float
+        Seconds after which the halving search starts no new fit; candidates
+        are then ranked on the last round they completed. Defaults to no limit.
+    feature_set : str
+        Feature set of `config/features.json` to train on. A set with
+        interactions, such as "wide", is encoded into thousands of sparse
+        columns by `create_wide_preprocessor`. Defaults to "default".
+    encoding : str
+        "onehot" (default) or "codes", the `encoding` of `create_preprocessor`.
+        With "codes", text columns of the training CSV are read as pandas
+        categoricals, so that each fold is encoded by integer indexing.
+    conformal : bool
+        If True (default), the best model is refitted on the 5 folds of the search,
+        and the sorted absolute residuals of its out-of-fold predictions are saved
+        as `conformal_calibration.pkl` next to the best model, for the prediction
+        intervals of `evaluate_model.py` and `score.py`.
+    seeds : int
+        If positive, the train/test split and the Ridge grid search are repeated
+        for the seeds `seed` to `seed + seeds - 1`, each as a run with that
+        `--seed` would do, and the chosen alpha and test scores of each seed
+        are written to `seed_stability.csv` with their distribution in
+        `seed_stability_summary.csv`. The data are encoded once and all seeds,
+        folds and alphas are solved together from per-fold moments, so this
+        takes a fraction of the time of one grid search. Needs dense features
+        without interactions. Defaults to 0, off.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
 
     Returns
     -------
@@ -70,117 +168,255 @@ def main(training_data, pipeline_to, model_to, test_data_to, plot_to, seed):
         --seed=42
     ```
     """
+    features = load_feature_set(feature_set)
+    wide = bool(features["interactions"])
+    if shared_cv and (sparse or wide):
+        raise click.UsageError("--shared-cv needs dense features; drop --sparse or use a feature set without interactions.")
+    if shared_cv and search == "halving":
+        raise click.UsageError("--shared-cv only applies to --search=grid.")
+    if seeds and (sparse or wide):
+        raise click.UsageError("--seeds needs dense features; drop --sparse or use a feature set without interactions.")
     np.random.seed(seed)
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    # Artifacts are written in the background while the search goes on
+    with ArtifactWriter() as writer:
+        # Read in data
+        with tracer.span("load") as span:
+            if store:
+                X, y = read_xy(store, split="train")
+            else:
+                student_train = pd.read_csv(training_data)
+                X = student_train.drop(columns=[features["target"]])
+                y = student_train[features["target"]]
+            X = X[features["features"]]
+            if encoding == "codes":
+                # Strings are hashed once here instead of in every fold's fit and transform
+                X = X.astype({column: "category" for column in X.select_dtypes(include="object").columns})
+            span.rows = len(X)
+
+        # Split into training and test sets
+        with tracer.span("split", rows=len(X)):
+            if store:
+                # Same permutation as splitting X directly, but only positions are materialized
+                train_pos, test_pos = train_test_split(np.arange(len(X)), test_size=0.2, random_state=seed)
+                X_train, X_test = X.take(train_pos), X.take(test_pos)
+                y_train, y_test = y.take(train_pos), y.take(test_pos)
+            else:
+                X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
+
+        # Save test data for evaluation
+        with tracer.span("save test data", rows=len(X_test)):
+            os.makedirs(test_data_to, exist_ok=True)
+            if store:
+                # Positions within the store's train split, not rows of the raw file
+                save_split_indices(os.path.join(test_data_to, "store_train_split.npz"), train_pos, test_pos)
+            else:
+                writer.to_csv(X_test, os.path.join(test_data_to, "X_test.csv"), index=False)
+                writer.to_csv(y_test, os.path.join(test_data_to, "y_test.csv"), index=False)
+        print(f"Test data saved to {test_data_to}")
+
+        # Preprocessing pipeline
+        if wide:
+            preprocessor = create_wide_preprocessor(
+                X_train, features["interactions"], dtype=np.dtype(dtype), min_frequency=features["min_frequency"],
+                verbose_feature_names_out=False,
+            )
+        else:
+            preprocessor = create_preprocessor(
+                X_train, dtype=np.dtype(dtype), sparse=sparse, verbose_feature_names_out=False, encoding=encoding
+            )
+        # Sparse features are fitted iteratively instead of densifying the normal equations
+        ridge_params = {"solver": "lsqr"} if sparse or wide else {}
+
+        fold_data = None
+        if shared_cv:
+            # Place the encoded training matrix and the folds once for all workers
+            with tracer.span("share fold data", rows=len(X_train)):
+                matrix, fold_preprocessor, _ = encode_once(preprocessor, X_train)
+                fold_data = SharedFoldData(matrix, y_train, cv=5)
+                del matrix
+
+        # Baseline model (Dummy Regressor)
+        with tracer.span("baseline cv", rows=len(X_train)) as span:
+            dr = DummyRegressor(strategy="mean")
+            if fold_data is not None:
+                dummy_cv = fold_data.cross_validate(dr, return_train_score=True, n_jobs=n_jobs)
+            else:
+                dummy_cv = cross_validate(dr, X_train, y_train, return_train_score=True, cv=5, n_jobs=n_jobs)
+            # Lay the folds out back to back from the start of the span
+            offset = span.start
+            for fold, (fit_time, score_time) in enumerate(zip(dummy_cv["fit_time"], dummy_cv["score_time"])):
+                tracer.record(f"fit fold {fold}", fit_time, start=offset, score_time=score_time)
+                offset += fit_time + score_time
+        dummy_results = pd.DataFrame(dummy_cv).agg(['mean']).T
+        print("Baseline Model Performance (Dummy Regressor):")
+        print(dummy_results)
+
+        # Save baseline results to a CSV file
+        os.makedirs(plot_to, exist_ok=True)
+        baseline_results_path = os.path.join(plot_to, "baseline_results.csv")
+        with tracer.span("save baseline results"):
+            writer.to_csv(dummy_results, baseline_results_path)
+        print(f"Baseline results saved to {baseline_results_path}")
+
+        # Ridge regression model
+        pipe_lr = make_pipeline(preprocessor, Ridge(random_state=seed, **ridge_params))
+
+        # Hyperparameter tuning grid
+        param_grid = {
+            'ridge__alpha': [0.1, 1, 10, 100]
+        }
+
+        with tracer.span(f"{search} search", rows=len(X_train)) as span:
+            if search == "halving":
+                candidates = make_candidates(preprocessor, models or None, random_state=seed,
+                                             estimator_params={"ridge": ridge_params})
+                grid_search = successive_halving_search(
+                    candidates, X_train, y_train, cv=5, factor=halving_factor, time_budget=time_budget,
+                    random_state=seed, n_jobs=n_jobs,
+                )
+                if grid_search.timed_out_:
+                    print(f"Time budget of {time_budget}s reached after {len(grid_search.n_resources_)} halving round(s)")
+            elif fold_data is not None:
+                # Folds see the shared matrix; the best model is refitted on the raw features
+                with fold_data:
+                    grid_search = fold_data.grid_search(
+                        make_pipeline(fold_preprocessor, Ridge(random_state=seed)),
+                        param_grid=param_grid,
+                        scoring="neg_mean_squared_error",
+                        return_train_score=True,
+                        n_jobs=n_jobs,
+                    )
+                grid_search.refit(pipe_lr, X_train, y_train)
+            else:
+                grid_search = GridSearchCV(
+                    pipe_lr,
+                    param_grid=param_grid,
+                    scoring="neg_mean_squared_error",
+                    cv=5,
+                    return_train_score=True,
+                    n_jobs=n_jobs,
+                )
+                grid_search.fit(X_train, y_train)
+            # GridSearchCV only keeps per-candidate means, so record one span per candidate
+            cv_results = grid_search.cv_results_
+            offset = span.start
+            for params, fit_time, score_time in zip(
+                cv_results["params"], cv_results["mean_fit_time"], cv_results["mean_score_time"]
+            ):
+                tracer.record(
+                    f"fit {params}", fit_time * grid_search.n_splits_, start=offset,
+                    folds=grid_search.n_splits_, mean_fit_time=fit_time,
+                )
+                offset += (fit_time + score_time) * grid_search.n_splits_
+
+        # Save best model
+        with tracer.span("save models"):
+            os.makedirs(model_to, exist_ok=True)
+            best_model_path = os.path.join(model_to, "best_model.pkl")
+            writer.pickle(grid_search.best_estimator_, best_model_path)
+            print(f"Best model saved to {best_model_path}")
+
+            # Save pipeline
+            os.makedirs(pipeline_to, exist_ok=True)
+            pipeline_path = os.path.join(pipeline_to, "student_pipeline.pkl")
+            writer.pickle(grid_search, pipeline_path)
+            print(f"Pipeline saved to {pipeline_path}")
+
+        # Residuals of the best model on the folds of the search calibrate its prediction intervals:
+        # the unshuffled 5 folds of the grid search, or the permuted folds of the halving search
+        if conformal:
+            with tracer.span("conformal calibration", rows=len(X_train)):
+                folds = grid_search.folds_ if search == "halving" else 5
+                calibration = calibrate(grid_search.best_estimator_, X_train, y_train, cv=folds, n_jobs=n_jobs)
+            calibration_path = os.path.join(model_to, "conformal_calibration.pkl")
+            writer.pickle(calibration, calibration_path)
+            print(f"Conformal calibration of {calibration.n_calibration} out-of-fold residuals saved to {calibration_path}")
+
+        # Grid search results, or the leaderboard of all model families
+        if search == "halving":
+            grid_results = grid_search.leaderboard()
+        else:
+            grid_results = pd.DataFrame(grid_search.cv_results_)[
+                [
+                    "mean_test_score",
+                    "param_ridge__alpha",
+                    "mean_fit_time",
+                    "rank_test_score",
+                ]
+            ].set_index("rank_test_score").sort_index()
+        print("Hyperparameter Tuning Results:")
+        print(grid_results)
+
+        # Save grid search results to a CSV file
+        grid_results_path = os.path.join(plot_to, "grid_search_results.csv")
+        with tracer.span("save grid search results"):
+            writer.to_csv(grid_results, grid_results_path)
+        print(f"Grid search results saved to {grid_results_path}")
+
+        # Coefficients of the best model, if it is linear
+        model_name, model = grid_search.best_estimator_.steps[-1]
+        if hasattr(model, "coef_"):
+            feature_names = grid_search.best_estimator_.named_steps['columntransformer'].get_feature_names_out()
+            coefs_df = pd.DataFrame({"Features": feature_names, "Coefficients": model.coef_}).sort_values(by="Coefficients")
+
+            # Save coefficients to a CSV file, named after the model family
+            coefficients_path = os.path.join(plot_to, f"{model_name}_coefficients.csv")
+            with tracer.span("save coefficients"):
+                writer.to_csv(coefs_df, coefficients_path, index=False)
+            print(f"Coefficients saved to {coefficients_path}")
+
+            # Bar plot of coefficients
+            with tracer.span(f"render {model_name}_coefficients.png"):
+                title = f"{MODEL_FAMILIES[model_name][0]} Coefficients"
+                plotted = coefs_df
+                if len(coefs_df) > MAX_PLOTTED_COEFFICIENTS:
+                    largest = coefs_df["Coefficients"].abs().nlargest(MAX_PLOTTED_COEFFICIENTS).index
+                    plotted = coefs_df.loc[largest].sort_values(by="Coefficients")
+                    title += f" ({MAX_PLOTTED_COEFFICIENTS} largest of {len(coefs_df)})"
+                fig = plt.figure(figsize=(10, 6))
+                plt.bar(plotted["Features"], plotted["Coefficients"])
+                plt.xlabel("Features")
+                plt.ylabel("Coefficient Value")
+                plt.title(title)
+                plt.xticks(rotation=45, ha="right")
+                plt.tight_layout()
+                coefficients_plot_path = os.path.join(plot_to, f"{model_name}_coefficients.png")
+                writer.savefig(fig, coefficients_plot_path)
+            print(f"Coefficient plot saved to {coefficients_plot_path}")
+        else:
+            print(f"The best model, {type(model).__name__}, has no coefficients to save")
+
+        # Split variance: the same grid search and test on many split seeds, solved together
+        if seeds > 0:
+            with tracer.span("seed stability", rows=len(X) * seeds):
+                matrix, _, n_numeric = encode_once(preprocessor, X)
+                stability = ridge_seed_stability(matrix, y, n_numeric=n_numeric,
+                                                 alphas=param_grid["ridge__alpha"], seeds=range(seed, seed + seeds))
+                del matrix
+                summary = summarize_stability(stability)
+            stability_path = os.path.join(plot_to, "seed_stability.csv")
+            writer.to_csv(stability, stability_path, index=False)
+            writer.to_csv(summary, os.path.join(plot_to, "seed_stability_summary.csv"))
+            print(f"Ridge over {seeds} split seeds:")
+            print(summary)
+            print(f"Seed stability results saved to {stability_path}")
+
+            with tracer.span("render seed_stability.png"):
+                fig = plt.figure(figsize=(8, 5))
+                plt.hist(stability["test_mse"], bins=min(30, max(5, seeds // 5)))
+                plt.axvline(stability["test_mse"].median(), color="black", linestyle="--", label="median")
+                plt.xlabel("Test MSE")
+                plt.ylabel("Number of seeds")
+                plt.title(f"Test MSE of Ridge over {seeds} Train/Test Split Seeds")
+                plt.legend()
+                plt.tight_layout()
+                writer.savefig(fig, os.path.join(plot_to, "seed_stability.png"))
+
+        with tracer.span("flush writes"):
+            writer.flush()
 
-    # Read in data
-    student_train = pd.read_csv(training_data)
-    X = student_train.drop(columns=["G3"])
-    y = student_train["G3"]
-
-    # Split into training and test sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=seed)
-
-    # Save test data for evaluation
-    os.makedirs(test_data_to, exist_ok=True)
-    X_test.to_csv(os.path.join(test_data_to, "X_test.csv"), index=False)
-    y_test.to_csv(os.path.join(test_data_to, "y_test.csv"), index=False)
-    print(f"Test data saved to {test_data_to}")
-
-    # Baseline model (Dummy Regressor)
-    dr = DummyRegressor(strategy="mean")
-    dummy_cv = cross_validate(dr, X_train, y_train, return_train_score=True, cv=5)
-    dummy_results = pd.DataFrame(dummy_cv).agg(['mean']).T
-    print("Baseline Model Performance (Dummy Regressor):")
-    print(dummy_results)
-
-    # Save baseline results to a CSV file
-    os.makedirs(plot_to, exist_ok=True)
-    baseline_results_path = os.path.join(plot_to, "baseline_results.csv")
-    dummy_results.to_csv(baseline_results_path)
-    print(f"Baseline results saved to {baseline_results_path}")
-
-    # Preprocessing pipeline
-    categorical_feats = X_train.select_dtypes(include=['object']).columns
-    numeric_feats = X_train.select_dtypes(include=['int64', 'float64']).columns
-
-    preprocessor = make_column_transformer(
-        (StandardScaler(), numeric_feats),
-        (OneHotEncoder(drop="if_binary", sparse_output=False), categorical_feats),
-        verbose_feature_names_out=False
-    )
-
-    # Ridge regression model
-    pipe_lr = make_pipeline(preprocessor, Ridge(random_state=seed))
-
-    # Hyperparameter tuning grid
-    param_grid = {
-        'ridge__alpha': [0.1, 1, 10, 100]
-    }
-
-    grid_search = GridSearchCV(
-        pipe_lr,
-        param_grid=param_grid,
-        scoring="neg_mean_squared_error",
-        cv=5,
-        return_train_score=True
-    )
-
-    grid_search.fit(X_train, y_train)
-
-    # Save best model
-    os.makedirs(model_to, exist_ok=True)
-    best_model_path = os.path.join(model_to, "best_model.pkl")
-    with open(best_model_path, 'wb') as f:
-        pickle.dump(grid_search.best_estimator_, f)
-    print(f"Best model saved to {best_model_path}")
-
-    # Save pipeline
-    os.makedirs(pipeline_to, exist_ok=True)
-    pipeline_path = os.path.join(pipeline_to, "student_pipeline.pkl")
-    with open(pipeline_path, 'wb') as f:
-        pickle.dump(grid_search, f)
-    print(f"Pipeline saved to {pipeline_path}")
-
-    # Grid search results
-    grid_results = pd.DataFrame(grid_search.cv_results_)[
-        [
-            "mean_test_score",
-            "param_ridge__alpha",
-            "mean_fit_time",
-            "rank_test_score",
-        ]
-    ].set_index("rank_test_score").sort_index()
-    print("Hyperparameter Tuning Results:")
-    print(grid_results)
-
-    # Save grid search results to a CSV file
-    grid_results_path = os.path.join(plot_to, "grid_search_results.csv")
-    grid_results.to_csv(grid_results_path)
-    print(f"Grid search results saved to {grid_results_path}")
-
-    # Ridge regression coefficients
-    feature_names = grid_search.best_estimator_.named_steps['columntransformer'].get_feature_names_out()
-    coefficients = grid_search.best_estimator_.named_steps['ridge'].coef_
-
-    coefs_df = pd.DataFrame({"Features": feature_names, "Coefficients": coefficients}).sort_values(by="Coefficients")
-
-    # Save coefficients to a CSV file
-    coefficients_path = os.path.join(plot_to, "ridge_coefficients.csv")
-    coefs_df.to_csv(coefficients_path, index=False)
-    print(f"Coefficients saved to {coefficients_path}")
-
-    # Bar plot of coefficients
-    plt.figure(figsize=(10, 6))
-    plt.bar(coefs_df["Features"], coefs_df["Coefficients"])
-    plt.xlabel("Features")
-    plt.ylabel("Coefficient Value")
-    plt.title("Ridge Regression Coefficients")
-    plt.xticks(rotation=45, ha="right")
-    plt.tight_layout()
-    coefficients_plot_path = os.path.join(plot_to, "ridge_coefficients.png")
-    plt.savefig(coefficients_plot_path)
-    plt.close()
-    print(f"Coefficient plot saved to {coefficients_plot_path}")
+    tracer.report(metrics_out)
 
 
 if __name__ == '__main__':
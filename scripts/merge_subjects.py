@@ -0,0 +1,79 @@
+"""
+python scripts/merge_subjects.py \
+    --mat-data='data/zip/student-mat.csv' \
+    --por-data='data/zip/student-por.csv' \
+    --out='data/raw/student-merged.csv'
+"""
+
+import click
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.merge_subjects import merge_subject_files
+from src.instrumentation import Tracer, instrumentation_options
+
+
+@click.command()
+@click.option("--mat-data", type=str, help="Path to the math course data")
+@click.option("--por-data", type=str, help="Path to the Portuguese course data")
+@click.option("--out", type=str, help="Path of the merged CSV file to write")
+@click.option("--chunksize", type=int, default=None,
+              help="Join the math data in chunks of this many rows")
+@instrumentation_options
+def main(mat_data, por_data, out, chunksize, profile, metrics_out):
+    """
+    Merges the math and Portuguese datasets into one row per student taking both courses.
+
+    Students are matched on the 13 identifying attributes of `data/zip/student-merge.R`.
+    The other attributes and the grades get a `_mat` or `_por` suffix, so
+    `load_valid_data(out, subject="mat")` loads one subject from the merged file.
+
+    Parameters
+    ----------
+    mat_data : str
+        Path to the math course data (semicolon separated CSV).
+    por_data : str
+        Path to the Portuguese course data (semicolon separated CSV).
+    out : str
+        Path of the merged semicolon separated CSV file.
+    chunksize : int
+        If given, the math data is read and joined in chunks of this many rows.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
+
+    Returns
+    -------
+    None
+        The function writes the merged dataset to `out`.
+
+    Examples
+    --------
+    To run the script via the command line:
+    ```bash
+    python scripts/merge_subjects.py \
+        --mat-data='data/zip/student-mat.csv' \
+        --por-data='data/zip/student-por.csv' \
+        --out='data/raw/student-merged.csv'
+    ```
+    """
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+
+    with tracer.span("merge") as span:
+        merged = merge_subject_files(mat_data, por_data, chunksize=chunksize)
+        span.rows = len(merged)
+    print(f"{len(merged)} students found in both datasets.")
+
+    with tracer.span("save", rows=len(merged)):
+        directory = os.path.dirname(out)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        merged.to_csv(out, sep=";", index=False)
+    print(f"Merged data saved to {out}")
+
+    tracer.report(metrics_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# score.py
+
+"""
+python scripts/score.py \
+    --data=data/processed/X_test.csv \
+    --best-model=results/models/best_model.pkl \
+    --output=results/predictions.csv
+
+python scripts/score.py \
+    --data=data/synthetic/student-mat-packed \
+    --best-model=results/models/best_model.pkl \
+    --output=results/predictions.csv
+"""
+
+import click
+import os
+import sys
+import pickle
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.drift import FeatureHistograms, drift_report
+from src.instrumentation import Tracer, instrumentation_options
+from src.packed_records import is_packed, read_packed
+
+
+def _read_chunks(data, chunksize, columns):
+    """Chunks of the input, with their packed records and layout if the input is a packed dataset."""
+    if not is_packed(data):
+        for chunk in pd.read_csv(data, chunksize=chunksize):
+            yield chunk, None, None
+        return
+    records, layout = read_packed(data)
+    missing = [column for column in columns if column not in layout.columns]
+    if missing:
+        raise click.UsageError(f"Columns of the model not in the packed dataset: {missing}")
+    for start in range(0, len(records), chunksize):
+        packed = records[start:start + chunksize]
+        yield layout.decode(packed, columns=columns), packed, layout
+
+
+@click.command()
+@click.option('--data', type=str, required=True, help="Path to a CSV file, or a packed dataset directory, with the features to score")
+@click.option('--best-model', type=str, required=True, help="Path to best model (pickle file)")
+@click.option('--calibration', type=str, default=None, help="Conformal calibration of the model (default: conformal_calibration.pkl next to --best-model)")
+@click.option('--coverage', 'coverages', type=float, multiple=True, default=(0.8, 0.9, 0.95), help="Coverage of the prediction intervals; repeat for several")
+@click.option('--output', type=str, required=True, help="Path of the CSV file the predictions are written to")
+@click.option('--chunksize', type=int, default=100_000, help="Number of rows read, predicted and written at a time")
+@click.option('--drift-report', 'drift_report_to', type=str, default=None, help="Path of a CSV file for the drift of the features against the training data")
+@click.option('--reference-histograms', type=str, default=None, help="Feature histograms of the training data (default: feature_histograms.json next to --best-model)")
+@instrumentation_options
+def main(data, best_model, calibration, coverages, output, chunksize, drift_report_to, reference_histograms,
+         profile, metrics_out):
+    """
+    Predicts the final grade of each row of a CSV file, with conformal prediction intervals.
+
+    Parameters
+    ----------
+    data: str
+        Path to a CSV file with the feature columns of the model, e.g. `X_test.csv`,
+        or to a packed dataset directory (see `src/packed_records.py`), which is
+        memory-mapped; only the columns of the model are decoded, and the drift
+        histograms are counted on the packed records.
+    best_model: str
+        Path to the best model object written by `fit_model.py`.
+    calibration: str
+        Path to the conformal calibration written by `fit_model.py`. Defaults to
+        `conformal_calibration.pkl` in the directory of `best_model`.
+    coverages: tuple
+        Coverage levels of the intervals. Defaults to 0.8, 0.9 and 0.95.
+    output: str
+        Path of the CSV file written, with the columns "prediction" and, for each
+        level, e.g. 0.9, "lower_90" and "upper_90", one row per input row.
+    chunksize: int
+        The input is scored this many rows at a time, so memory does not grow
+        with the input. Defaults to 100,000.
+    drift_report_to: str
+        If given, the value counts of the features are accumulated while scoring and
+        compared with those of the training data; the PSI, chi-square and
+        Kolmogorov-Smirnov statistics and status of each feature are written to this CSV file.
+    reference_histograms: str
+        Path to the feature histograms written by `split_preprocess.py`. Defaults to
+        `feature_histograms.json` in the directory of `best_model`.
+    profile: bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out: str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
+
+    Returns
+    -------
+    None
+        The function does not return any values but writes the predictions to `output`
+        and, if requested, the drift report to `drift_report_to`.
+
+    Examples
+    --------
+    ```bash
+    python scripts/score.py \
+    --data=data/processed/X_test.csv \
+    --best-model=results/models/best_model.pkl \
+    --coverage=0.9 \
+    --output=results/predictions.csv
+    ```
+    """
+    if chunksize < 1:
+        raise click.UsageError("--chunksize must be a positive number of rows.")
+    if calibration is None:
+        calibration = os.path.join(os.path.dirname(best_model), "conformal_calibration.pkl")
+    if not os.path.exists(calibration):
+        raise click.UsageError(f"No conformal calibration at {calibration}; run fit_model.py with --conformal.")
+    if reference_histograms is None:
+        reference_histograms = os.path.join(os.path.dirname(best_model), "feature_histograms.json")
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+
+    with tracer.span("load model"):
+        with open(best_model, 'rb') as f:
+            best_model = pickle.load(f)
+        with open(calibration, 'rb') as f:
+            calibration = pickle.load(f)
+        # Checks the levels before any row is scored
+        calibration.half_width(list(coverages))
+        current = None
+        if drift_report_to:
+            reference = FeatureHistograms.load(reference_histograms)
+            current = FeatureHistograms(reference.domains)
+
+    output_dir = os.path.dirname(output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    # Written next to the output and moved into place once complete
+    tmp_path = f"{output}.tmp"
+    n_rows = 0
+    try:
+        with open(tmp_path, "w", newline="") as f:
+            for chunk, packed, layout in _read_chunks(data, chunksize, list(best_model.feature_names_in_)):
+                with tracer.span("predict", rows=len(chunk)):
+                    scored = calibration.interval_frame(best_model.predict(chunk), coverages)
+                if current is not None:
+                    with tracer.span("feature histograms", rows=len(chunk)):
+                        if packed is None:
+                            current.update(chunk)
+                        else:
+                            current.update_packed(packed, layout)
+                with tracer.span("write", rows=len(chunk)):
+                    scored.to_csv(f, header=n_rows == 0, index=False)
+                n_rows += len(chunk)
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Predictions of {n_rows} rows with intervals at coverage {', '.join(f'{c:g}' for c in coverages)} "
+          f"saved to {output}")
+
+    if current is not None:
+        with tracer.span("drift report"):
+            report = drift_report(reference, current)
+            report.to_csv(drift_report_to, index=False)
+        flagged = report[report["status"] != "stable"]
+        print(f"Drift report saved to {drift_report_to}; "
+              + (", ".join(f"{row.feature} ({row.status}, PSI {row.psi:.3f})" for row in flagged.itertuples())
+                 if len(flagged) else "all features stable"))
+
+    tracer.report(metrics_out)
+
+
+if __name__ == '__main__':
+    main()
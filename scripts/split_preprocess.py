@@ -7,15 +7,20 @@ import os
 import sys
 import numpy as np
 import pandas as pd
-import pickle
 from sklearn import set_config
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.compose import make_column_transformer, make_column_selector
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.preprocessor import create_preprocessor, transform_to_dataframe
-from src.split_data import split_train_test
+from src.preprocessor import create_preprocessor, create_wide_preprocessor, transform_to_dataframe
+from src.feature_config import feature_set_names, load_feature_set
+from src.split_data import split_train_test, split_indices, take_rows, save_split_indices
+from src.split_store import write_split_store
+from src.file_cache import read_student_csv_cached
+from src.artifact_writer import ArtifactWriter
+from src.drift import FeatureHistograms
+from src.instrumentation import Tracer, instrumentation_options
 
 @click.command()
 @click.option("--raw-data", type=str, help="Path to validated data")
@@ -29,7 +34,24 @@ from src.split_data import split_train_test
     type=str,
     help="Path to directory where the preprocessor object will be written to",
 )
-def main(raw_data, data_to, preprocessor_to):
+@click.option("--dtype", type=click.Choice(["float64", "float32"]), default="float64",
+              help="Floating point dtype of the preprocessor output")
+@click.option("--sparse", is_flag=True, help="Make the preprocessor output sparse")
+@click.option(
+    "--split-mode", type=click.Choice(["copy", "indices", "store"]), default="copy",
+    help="Write the split as CSV copies, as train/test index arrays or as a split store",
+)
+@click.option("--stratify-column", type=str, default=None,
+              help="Column to stratify the index split on (binned if numeric), e.g. G3")
+@click.option("--group-column", type=str, default=None,
+              help="Column whose groups are kept together in the index split, e.g. school")
+@click.option("--feature-set", type=click.Choice(feature_set_names()), default="default",
+              help="Feature set of config/features.json to split and preprocess")
+@click.option("--encoding", type=click.Choice(["onehot", "codes"]), default="onehot",
+              help="Encode categorical columns with OneHotEncoder or through category codes")
+@instrumentation_options
+def main(raw_data, data_to, preprocessor_to, dtype, sparse, split_mode, stratify_column,
+         group_column, feature_set, encoding, profile, metrics_out):
     """
     Splits raw data into train and test sets, preprocesses the data, and saves the results for further use.
 
@@ -38,6 +60,7 @@ def main(raw_data, data_to, preprocessor_to):
     2. Splits the data into training and testing subsets.
     3. Saves the train/test splits as CSV files for exploratory data analysis.
     4. Creates and saves a preprocessing pipeline for use in downstream model training.
+    5. Saves the value counts of each training feature, the reference of the drift report of `score.py`.
 
     Parameters
     ----------
@@ -46,7 +69,37 @@ def main(raw_data, data_to, preprocessor_to):
     data_to : str
         Directory path where the processed train and test datasets will be saved.
     preprocessor_to : str
-        Directory path where the preprocessor object (pickle file) will be saved.
+        Directory path where the preprocessor object (pickle file) and the feature
+        histograms of the training data (`feature_histograms.json`) will be saved.
+    dtype : str
+        Floating point dtype of the preprocessor output, "float64" or "float32".
+    sparse : bool
+        If True, the preprocessor one-hot encodes into a sparse matrix. Sparse
+        output cannot be combined with `set_config(transform_output="pandas")`,
+        so transform it with `transform_to_dataframe` instead.
+    split_mode : str
+        "copy" (default) writes the X/y and train/test CSV files. "indices" only
+        writes the positional train/test row indices of the raw file to
+        `split_indices.npz`; rows are taken from the raw data on demand.
+        "store" writes the necessary columns once to the split store
+        `student_store/` that `eda.py`, `fit_model.py` and `evaluate_model.py`
+        read with `--store`.
+    stratify_column : str
+        Column to stratify the index split on; numeric columns are binned into quantiles.
+    group_column : str
+        Column whose groups are never split between train and test.
+    feature_set : str
+        Feature set of `config/features.json` whose features and target are
+        kept. A set with interactions, such as "wide", gets the sparse
+        preprocessor of `create_wide_preprocessor`. Defaults to "default".
+    encoding : str
+        "onehot" (default) or "codes", the `encoding` of `create_preprocessor`.
+        Both give the same output; "codes" uses a fixed category vocabulary
+        and integer indexing instead of comparing strings.
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
 
     Returns
     -------
@@ -65,38 +118,74 @@ def main(raw_data, data_to, preprocessor_to):
     """
 
     set_config(transform_output="pandas")
-
-    student_performance = pd.read_csv(raw_data, delimiter=";")
-
-    # Necessary columns
-    columns = ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc", "G3"]
-
-    subset_df = student_performance[columns]
-
-    # Split the dataset
-    X_train, X_test, y_train, y_test = split_train_test(subset_df, "G3")
-    print("Train-test split successful!")
-
-    train_df = pd.concat([X_train, y_train], axis=1)
-    test_df = pd.concat([X_test, y_test], axis=1)
-    
-    # saving X/y train/test to csv
-    X_train.to_csv(os.path.join(data_to, "X_train.csv"), index=False)
-    y_train.to_csv(os.path.join(data_to, "y_train.csv"), index=False)
-    X_test.to_csv(os.path.join(data_to, "X_test.csv"), index=False)
-    y_test.to_csv(os.path.join(data_to, "y_test.csv"), index=False)
-
-    # Store splits in csv files
-    os.makedirs(data_to, exist_ok=True)
-    train_df.to_csv(os.path.join(data_to, "train_df.csv"), index=False)
-    test_df.to_csv(os.path.join(data_to, "test_df.csv"), index=False)
-
-    preprocessor = create_preprocessor(X_train=X_train)
-
-    os.makedirs(preprocessor_to, exist_ok=True)
-    pickle.dump(
-        preprocessor, open(os.path.join(preprocessor_to, "preprocessor.pickle"), "wb")
-    )
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    # CSV files and pickles are written in the background while the script goes on
+    with ArtifactWriter() as writer:
+        # Necessary columns
+        features = load_feature_set(feature_set)
+        columns = features["columns"]
+
+        with tracer.span("load") as span:
+            # Only these columns are parsed, as validate.py does, so a batch run parses the file once
+            student_performance = read_student_csv_cached(raw_data, columns=columns, delimiter=";")
+            span.rows = len(student_performance)
+
+        subset_df = student_performance[columns]
+
+        if split_mode in ("indices", "store"):
+            with tracer.span("split", rows=len(subset_df)):
+                train_idx, test_idx = split_indices(
+                    subset_df, stratify_column=stratify_column, group_column=group_column
+                )
+            with tracer.span("save"):
+                if split_mode == "indices":
+                    # Only the row indices are persisted; the data itself is never duplicated
+                    split_path = os.path.join(data_to, "split_indices.npz")
+                    save_split_indices(split_path, train_idx, test_idx)
+                else:
+                    split_path = os.path.join(data_to, "student_store")
+                    write_split_store(split_path, subset_df, train_idx, test_idx, target_column="G3")
+            print(f"Train-test split saved to {split_path}")
+            X_train = take_rows(student_performance, train_idx, columns=columns[:-1])
+        else:
+            # Split the dataset
+            with tracer.span("split", rows=len(subset_df)):
+                X_train, X_test, y_train, y_test = split_train_test(subset_df, "G3")
+            print("Train-test split successful!")
+
+            train_df = pd.concat([X_train, y_train], axis=1)
+            test_df = pd.concat([X_test, y_test], axis=1)
+
+            with tracer.span("save"):
+                os.makedirs(data_to, exist_ok=True)
+                # saving X/y train/test to csv
+                writer.to_csv(X_train, os.path.join(data_to, "X_train.csv"), index=False)
+                writer.to_csv(y_train, os.path.join(data_to, "y_train.csv"), index=False)
+                writer.to_csv(X_test, os.path.join(data_to, "X_test.csv"), index=False)
+                writer.to_csv(y_test, os.path.join(data_to, "y_test.csv"), index=False)
+
+                # Store splits in csv files
+                writer.to_csv(train_df, os.path.join(data_to, "train_df.csv"), index=False)
+                writer.to_csv(test_df, os.path.join(data_to, "test_df.csv"), index=False)
+
+        if features["interactions"]:
+            preprocessor = create_wide_preprocessor(X_train, features["interactions"], dtype=np.dtype(dtype),
+                                                    min_frequency=features["min_frequency"])
+        else:
+            preprocessor = create_preprocessor(X_train=X_train, dtype=np.dtype(dtype), sparse=sparse, encoding=encoding)
+
+        with tracer.span("save preprocessor"):
+            writer.pickle(preprocessor, os.path.join(preprocessor_to, "preprocessor.pickle"))
+
+        # Exact value counts of the training features, the reference for drift monitoring
+        with tracer.span("feature histograms", rows=len(X_train)):
+            histograms = FeatureHistograms.for_columns(features["features"]).update(X_train)
+            writer.submit(os.path.join(preprocessor_to, "feature_histograms.json"), histograms.save)
+
+        with tracer.span("flush writes"):
+            writer.flush()
+
+    tracer.report(metrics_out)
 
 if __name__ == "__main__":
     main()
@@ -2,16 +2,29 @@
 # usage: python scripts/validate.py --raw-data=data/raw/student-mat.csv --plot-to=results/figures/
 
 import click
+import functools
 import os
+import numpy as np
 import pandas as pd
 import pandera as pa
 import matplotlib.pyplot as plt
 import seaborn as sns
+import sys
 import warnings
-from scipy.stats import shapiro
+from scipy.stats import norm
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.student_schema import RAW_DOMAINS, is_categorical
+from src.feature_config import feature_set_names, load_feature_set
+from src.file_cache import read_student_csv_cached
+from src.check_scheduler import RENDER, CheckScheduler, write_report
+from src.incremental_validation import update_validation_state
+from src.normality import SHAPIRO_MAX_SAMPLES, dagostino_k2, normality_test
+from src.instrumentation import Tracer, instrumentation_options
 
+COLUMNS = load_feature_set("default")["columns"]
 
-def load_data(filepath: str) -> pd.DataFrame:
+
+def load_data(filepath: str, columns: list = COLUMNS) -> pd.DataFrame:
     """
     Check filepath and load the correct file.
 
@@ -19,11 +32,13 @@ def load_data(filepath: str) -> pd.DataFrame:
     ----------
     filepath : str
         Path to the file to load.
+    columns : list, optional
+        Columns to keep (default is the "default" feature set and the target).
 
     Returns
     -------
     pd.DataFrame
-        Loaded DataFrame.
+        Loaded DataFrame, with the dtypes of `src.student_csv.read_student_csv`.
 
     Raises
     ------
@@ -39,35 +54,40 @@ def load_data(filepath: str) -> pd.DataFrame:
     if not filepath.endswith(".csv"):
         raise ValueError(f"The file '{filepath}' is not a CSV file.")
 
-    student_performance = pd.read_csv(filepath, delimiter=";")
-    columns = ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc", "G3"]
-    
-    return student_performance[columns]
+    # Only the requested columns are parsed, into Arrow-backed columns
+    return read_student_csv_cached(filepath, columns=list(columns), delimiter=";")
 
 
-def validate_student_data(df: pd.DataFrame) -> None:
+@functools.lru_cache(maxsize=4)
+def student_data_schema(columns: tuple = tuple(COLUMNS)) -> pa.DataFrameSchema:
     """
-    Validate data against the predefined schema.
+    Build the schema of the validated student data once per process and set of columns.
+
+    Categorical columns must hold the labels of their domain and integer
+    columns must lie within their bounds, as listed in `RAW_DOMAINS`.
     """
-    print("Validating data schema...")
-    # Define the schema
-    schema = pa.DataFrameSchema(
-    {
-        "sex": pa.Column(str, pa.Check.isin(["M", "F"])),
-        "age": pa.Column(int, pa.Check.between(15, 22), nullable=False),
-        "studytime": pa.Column(int, pa.Check.between(1, 4), nullable=False), 
-        "failures": pa.Column(int, pa.Check.between(0, 4), nullable=False),
-        "goout": pa.Column(int, pa.Check.between(1, 5), nullable=False),
-        "Dalc": pa.Column(int, pa.Check.between(1, 5), nullable=False),
-        "Walc": pa.Column(int, pa.Check.between(1, 5), nullable=False),
-        "G3": pa.Column(int, pa.Check.between(0, 20), nullable=False)
-    },
+    checks = {}
+    for column in columns:
+        if is_categorical(column):
+            checks[column] = pa.Column(str, pa.Check.isin(RAW_DOMAINS[column]))
+        else:
+            checks[column] = pa.Column(int, pa.Check.between(*RAW_DOMAINS[column]), nullable=False)
+    return pa.DataFrameSchema(
+    checks,
     checks=[
         pa.Check(lambda df: ~df.duplicated().any(), error="Duplicate rows found."),
         pa.Check(lambda df: ~(df.isna().all(axis=1)).any(), error="Empty rows found.")
     ]
     )
 
+
+def validate_student_data(df: pd.DataFrame) -> None:
+    """
+    Validate data against the predefined schema.
+    """
+    print("Validating data schema...")
+    schema = student_data_schema(tuple(df.columns))
+
     initial_row_count = len(df)
     df = df.drop_duplicates()
     final_row_count = len(df)
@@ -126,10 +146,19 @@ def validate_missingness(
 
 
 def validate_target_distribution(
-    data: pd.DataFrame, target_column: str = "G3", save_path: str = None
-) -> None:
+    data: pd.DataFrame,
+    target_column: str = "G3",
+    save_path: str = None,
+    domain: tuple = None,
+    max_shapiro_samples: int = SHAPIRO_MAX_SAMPLES,
+) -> dict:
     """
-    Validate the distribution of the target variable by performing a Shapiro-Wilk test.
+    Validate the distribution of the target variable with a normality test.
+
+    Up to `max_shapiro_samples` values are tested with Shapiro-Wilk. Larger
+    data is tested with D'Agostino's K² test from the moments of the target,
+    and with an Anderson-Darling test on a stratified sample of it; the
+    histogram is then drawn from the bin counts instead of a KDE plot.
 
     Parameters
     ----------
@@ -139,27 +168,53 @@ def validate_target_distribution(
         The name of the target column whose distribution is to be validated.
     save_path : str
         The path to save the histogram plot. If None, the plot is not saved.
+    domain : tuple, optional
+        Smallest and largest value of an integer target, e.g. (0, 20) for G3.
+        If given, the histogram has one bin per value, counted with one `np.bincount`.
+    max_shapiro_samples : int, optional
+        Largest number of values tested with Shapiro-Wilk (default is 5000).
 
-    Raises
-    ------
-    ValueError
-        If the target variable does not follow a normal distribution.
+    Returns
+    -------
+    dict
+        The test used, the number of values it saw, its statistic and p-value,
+        and for large data the Anderson-Darling statistic, p-value and sample size.
     """
     print("Validating target distribution...")
 
-    stat, p = shapiro(data[target_column])
+    values = data[target_column].to_numpy()
+    result = normality_test(values, domain=domain, max_shapiro_samples=max_shapiro_samples)
+    p = result["p_value"]
+    test = f"{result['test']}, n={result['n_samples']}"
     if p > 0.05:
         print(
-            f"Target variable '{target_column}' follows a normal distribution (p={p:.4f})."
+            f"Target variable '{target_column}' follows a normal distribution (p={p:.4f}; {test})."
         )
     else:
         print(
-            f"Target variable '{target_column}' does not follow a normal distribution (p={p:.4f})."
+            f"Target variable '{target_column}' does not follow a normal distribution (p={p:.4f}; {test})."
+        )
+    if "anderson_statistic" in result:
+        print(
+            f"Anderson-Darling on a stratified sample of {result['anderson_samples']}: "
+            f"A2={result['anderson_statistic']:.4f}, p={result['anderson_p_value']:.4f}."
         )
 
     # Plot target distribution
     plt.figure(figsize=(10, 6))
-    sns.histplot(data[target_column], kde=True, bins=20)
+    if result["test"] == "Shapiro-Wilk":
+        sns.histplot(data[target_column], kde=True, bins=20)
+    else:
+        counts, edges = result["counts"], result["edges"]
+        plt.bar(edges[:-1], counts, width=np.diff(edges), align="edge", edgecolor="white")
+        # Normal density with the mean and standard deviation of the data, scaled to counts
+        centers = (edges[:-1] + edges[1:]) / 2
+        mean = np.average(centers, weights=counts)
+        std = np.sqrt(np.average((centers - mean) ** 2, weights=counts))
+        grid = np.linspace(edges[0], edges[-1], 200)
+        plt.plot(grid, counts.sum() * np.diff(edges).mean() * norm.pdf(grid, mean, std), color="black")
+        plt.xlabel(target_column)
+        plt.ylabel("Count")
     plt.title(f"Distribution of {target_column}")
 
     # Save  plot
@@ -169,6 +224,8 @@ def validate_target_distribution(
         plt.savefig(file_path, bbox_inches="tight")
         print(f"Target distribution histogram saved to {save_path}")
 
+    return {key: value for key, value in result.items() if key not in ("counts", "edges")}
+
 
 def validate_no_outliers(
     data: pd.DataFrame, numeric_columns: list, max_cols: int = 3, save_path: str = None
@@ -272,7 +329,34 @@ def validate_anomalous_correlations(
 
     # Compute the full correlation matrix
     correlation_matrix = numeric_data.corr()
+    return check_correlation_matrix(correlation_matrix, target_col, threshold, zero_tolerance)
+
+
+def check_correlation_matrix(
+    correlation_matrix: pd.DataFrame,
+    target_col: str,
+    threshold: float = 0.9,
+    zero_tolerance: float = 1e-5,
+):
+    """
+    Check a correlation matrix for anomalous and near-zero correlations.
+
+    Parameters
+    ----------
+    correlation_matrix : pd.DataFrame
+        Correlation matrix of the numeric columns, including the target.
+    target_col : str
+        The name of the target column.
+    threshold : float, optional
+        The correlation threshold above which correlations are flagged as anomalous (default is 0.9).
+    zero_tolerance : float, optional
+        The tolerance for detecting zero correlations (default is 1e-5).
 
+    Returns
+    -------
+    dict
+        "feature_to_target" and "feature_to_feature" correlation tables.
+    """
     # Step 1: Correlations between features and target
     target_correlations = correlation_matrix[target_col].drop(target_col)
 
@@ -291,9 +375,7 @@ def validate_anomalous_correlations(
         )
 
     # Step 2: Correlations among features
-    feature_correlations = correlation_matrix.loc[
-        numeric_data.columns, numeric_data.columns
-    ]
+    feature_correlations = correlation_matrix
 
     # Check for anomalous (high) correlations among features
     anomalous_feature_corrs = feature_correlations[
@@ -331,12 +413,89 @@ def validate_anomalous_correlations(
     }
 
 
+def validate_incremental(raw_data: str, state_path: str, threshold: float = 0.1, target_col: str = "G3",
+                         columns: list = COLUMNS):
+    """
+    Validate only the rows appended since the last run, checking the whole dataset from the stored state.
+
+    The schema is checked on the new rows; duplicates, missingness, the target
+    distribution and correlations are checked on the merged state of all rows.
+    The file is validated from the start on the first run or if the
+    previously validated rows changed.
+
+    Parameters
+    ----------
+    raw_data : str
+        Path to the append-only raw dataset (CSV format).
+    state_path : str
+        Path of the validation state.
+    threshold : float, optional
+        The maximum allowable fraction of missing values per column (default is 0.1).
+    target_col : str, optional
+        The name of the target column (default is "G3").
+    columns : list, optional
+        Validated columns (default is the "default" feature set and the target).
+
+    Raises
+    ------
+    ValueError
+        If any column has missing values exceeding the acceptable threshold.
+    """
+    state, new_rows, full = update_validation_state(raw_data, state_path, columns, check=validate_student_data)
+    mode = "Full validation" if full else "Incremental validation"
+    print(f"{mode}: {len(new_rows)} new rows, {state.rows} rows in total.")
+
+    if state.duplicate_rows:
+        print(f"Found {state.duplicate_rows} duplicate rows in the dataset.")
+    if state.empty_rows:
+        print(f"Found {state.empty_rows} empty rows in the dataset.")
+
+    print("Validating missingness...")
+    missing_percentage = pd.Series(state.null_counts / max(state.rows, 1), index=state.columns)
+    above_threshold = missing_percentage[missing_percentage > threshold]
+    if not above_threshold.empty:
+        raise ValueError(
+            f"Columns with missing values beyond threshold ({threshold}):\n{above_threshold}"
+        )
+    print("Missingness validation successful!")
+
+    numeric = pd.Index(state.numeric_columns)
+    if target_col in numeric:
+        i = numeric.get_loc(target_col)
+        moments = state.moments
+        print(
+            f"Target variable '{target_col}': mean={moments.mean[i]:.4f}, std={moments.variance[i] ** 0.5:.4f}, "
+            f"skewness={moments.skewness[i]:.4f}, excess kurtosis={moments.kurtosis[i]:.4f}."
+        )
+        if moments.count[i] >= 8:
+            statistic, p = dagostino_k2(moments.count[i], moments.skewness[i], moments.kurtosis[i])
+            normal = "follows" if p > 0.05 else "does not follow"
+            print(
+                f"Target variable '{target_col}' {normal} a normal distribution "
+                f"(p={p:.4f}; D'Agostino K², n={int(moments.count[i])})."
+            )
+        correlation_matrix = pd.DataFrame(state.comoments.correlation(), index=numeric, columns=numeric)
+        check_correlation_matrix(correlation_matrix, target_col=target_col, threshold=0.9)
+
+
 @click.command()
 @click.option("--raw-data", type=str, help="Path to raw data")
 @click.option(
     "--plot-to", type=str, help="Path to directory where the plot will be written to"
 )
-def main(raw_data, plot_to):
+@click.option(
+    "--state", "state_path", type=str, default=None,
+    help="Path of the incremental validation state; only rows appended since the last run are validated",
+)
+@click.option("--n-jobs", type=int, default=None, help="Number of threads and processes running checks (default: all cores)")
+@click.option(
+    "--report-to", type=str, default=None,
+    help="Path of the JSON validation report (default: validation_report.json in --plot-to)",
+)
+@click.option("--feature-set", type=click.Choice(feature_set_names()), default="default",
+              help="Feature set of config/features.json whose columns are validated")
+@instrumentation_options
+def main(raw_data, plot_to, state_path, n_jobs, report_to, feature_set, profile, metrics_out):
     """
     Validates the raw dataset and generates diagnostic plots for data quality and integrity checks.
 
@@ -348,12 +507,33 @@ def main(raw_data, plot_to):
     5. Identifies potential outliers in numeric columns and saves diagnostic plots.
     6. Checks for anomalous correlations with the target variable.
 
+    Steps 3 to 6 run concurrently once the schema is valid: checks that save
+    plots in worker processes and the others in threads. Their output and
+    warnings are printed in the order above and collected, with each check's
+    status, duration and result, in a JSON validation report.
+
     Parameters
     ----------
     raw_data : str
         Path to the raw dataset (CSV format).
     plot_to : str
         Directory path where validation diagnostic plots will be saved.
+    state_path : str
+        If given, validates incrementally with the state stored at this path:
+        the schema is checked on the rows appended since the last run, and the
+        whole-dataset checks use the stored state merged with the new rows.
+        Diagnostic plots are not drawn in this mode.
+    n_jobs : int
+        Number of threads and of worker processes running the checks. Defaults to the number of cores.
+    report_to : str
+        Path of the JSON validation report. Defaults to `validation_report.json` in `plot_to`.
+    feature_set : str
+        Feature set of `config/features.json` whose features and target are
+        validated. Defaults to "default".
+    profile : bool
+        If True, prints per-stage timings and cProfile stats of the slowest stage.
+    metrics_out : str
+        Path of a JSON file where per-stage timings are written (Chrome trace format).
 
     Returns
     -------
@@ -369,33 +549,61 @@ def main(raw_data, plot_to):
         --plot-to='results/figures/validate/'
     ```
     """
+    tracer = Tracer(enabled=metrics_out is not None, profile=profile)
+    columns = load_feature_set(feature_set)["columns"]
+    if state_path is not None:
+        try:
+            with tracer.span("validate incremental"):
+                validate_incremental(raw_data, state_path, threshold=0.1, target_col="G3", columns=columns)
+            print("\nAll validation checks passed...")
+        except ValueError as ve:
+            print(f"Validation error: {ve}")
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+        tracer.report(metrics_out)
+        return
+
+    # Load the dataset
     try:
-        # Load the dataset
-        subset_df = load_data(raw_data)
-        print(subset_df[subset_df.duplicated()])
-
-        # Validate the data schema
-        validate_student_data(subset_df)
-
-        # Validate missingness in the dataset
-        validate_missingness(subset_df, threshold=0.1, save_path=plot_to)
-
-        # Validate target distribution
-        validate_target_distribution(subset_df, target_column="G3", save_path=plot_to)
-
-        # Validate no outliers
-        numeric_columns = subset_df.select_dtypes(include="number").columns
-        validate_no_outliers(subset_df, numeric_columns, max_cols=3, save_path=plot_to)
-
-        # Validate anomalous correlations
-        validate_anomalous_correlations(subset_df, target_col="G3", threshold=0.9)
+        with tracer.span("load") as span:
+            subset_df = load_data(raw_data, columns)
+            span.rows = len(subset_df)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Validation error: {e}")
+        tracer.report(metrics_out)
+        return
+    print(subset_df[subset_df.duplicated()])
+
+    # The schema is checked first; the other checks are independent of each other.
+    # Checks that save plots run in worker processes, the others in threads.
+    numeric_columns = subset_df.select_dtypes(include="number").columns
+    scheduler = CheckScheduler(n_jobs=n_jobs)
+    scheduler.add("schema", validate_student_data, subset_df)
+    scheduler.add("missingness", validate_missingness, subset_df, threshold=0.1, save_path=plot_to,
+                  depends_on=["schema"], kind=RENDER)
+    scheduler.add("target distribution", validate_target_distribution, subset_df, target_column="G3",
+                  save_path=plot_to, domain=RAW_DOMAINS["G3"], depends_on=["schema"], kind=RENDER)
+    scheduler.add("outliers", validate_no_outliers, subset_df, numeric_columns, max_cols=3, save_path=plot_to,
+                  depends_on=["schema"], kind=RENDER)
+    scheduler.add("correlations", validate_anomalous_correlations, subset_df, target_col="G3", threshold=0.9,
+                  depends_on=["schema"])
+    with tracer.span("validate", rows=len(subset_df)):
+        results = scheduler.run()
+    for result in results:
+        tracer.record(f"validate {result['name']}", result["seconds"], rows=len(subset_df))
+
+    if all(result["status"] == "passed" for result in results):
         print("\nAll validation checks passed...")
-
-    except ValueError as ve:
-        print(f"Validation error: {ve}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-
+    else:
+        failed = [result["name"] for result in results if result["status"] != "passed"]
+        print(f"\nValidation error: checks did not pass: {failed}")
+
+    if report_to is None and plot_to:
+        report_to = os.path.join(plot_to, "validation_report.json")
+    if report_to:
+        write_report(results, report_to)
+        print(f"Validation report saved to {report_to}")
+    tracer.report(metrics_out)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+"""
+Background writer for pipeline artifacts.
+
+Serializing tables, models and figures and writing them to disk is queued on
+background threads, so the pipeline scripts can go on with the next step
+while the previous outputs are being written. Each artifact is written to a
+temporary file in its destination directory and renamed into place, so a
+reader never sees a partial file.
+
+Objects handed to the writer must not be modified until it is flushed.
+"""
+
+import os
+import pickle
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class ArtifactWriter:
+    """
+    Queue artifact writes on background threads.
+
+    Use as a context manager, or call `close` when done: both wait for every
+    write and raise the first write error, if any.
+
+    Parameters
+    ----------
+    n_threads : int, optional
+        Number of writer threads (default is 2).
+    max_pending : int, optional
+        Largest number of queued or running writes; further writes block
+        until one finishes, which bounds the memory held by queued objects
+        (default is 8).
+
+    Examples
+    --------
+    >>> with ArtifactWriter() as writer:
+    ...     writer.to_csv(results, "results/table/results.csv", index=False)
+    ...     writer.pickle(model, "results/models/model.pkl")
+    """
+
+    def __init__(self, n_threads: int = 2, max_pending: int = 8):
+        self._executor = ThreadPoolExecutor(max_workers=n_threads, thread_name_prefix="artifact-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+            else:
+                # Don't mask the original error, but still finish the writes
+                wait(self._futures)
+        finally:
+            self._executor.shutdown()
+
+    def _write(self, path, write, args, kwargs):
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            # The temporary name keeps the extension, from which formats and compression are inferred
+            tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex[:12]}-{os.path.basename(path)}")
+            try:
+                write(tmp_path, *args, **kwargs)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        finally:
+            self._slots.release()
+        return path
+
+    def submit(self, path: str, write, *args, **kwargs):
+        """
+        Queue a write of `path`.
+
+        Parameters
+        ----------
+        path : str
+            Destination path; parent directories are created.
+        write : callable
+            Called as `write(tmp_path, *args, **kwargs)` on a writer thread;
+            it must write the whole artifact to `tmp_path`.
+        *args, **kwargs
+            Arguments of `write`.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Resolves to `path` once it is in place.
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._write, path, write, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._futures.append(future)
+        return future
+
+    def to_csv(self, frame, path: str, **kwargs):
+        """Queue `frame.to_csv(path, **kwargs)`."""
+        return self.submit(path, lambda tmp_path: frame.to_csv(tmp_path, **kwargs))
+
+    def pickle(self, obj, path: str):
+        """Queue pickling `obj` to `path`."""
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                pickle.dump(obj, f)
+        return self.submit(path, write)
+
+    def savefig(self, figure, path: str, **kwargs):
+        """
+        Queue saving a matplotlib figure.
+
+        The figure is closed in pyplot right away, so later `plt` calls in the
+        calling thread don't touch it while it is being rendered.
+        """
+        import matplotlib.pyplot as plt
+        plt.close(figure)
+        kwargs.setdefault("format", os.path.splitext(path)[1].lstrip(".") or None)
+        return self.submit(path, lambda tmp_path: figure.savefig(tmp_path, **kwargs))
+
+    def flush(self) -> None:
+        """
+        Wait for every queued write.
+
+        Raises
+        ------
+        Exception
+            The first error raised by a write, in submission order.
+        """
+        futures, self._futures = self._futures, []
+        wait(futures)
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                raise error
+
+    def close(self) -> None:
+        """Flush the queued writes and stop the writer threads."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown()
@@ -0,0 +1,105 @@
+"""
+Bootstrap confidence intervals for regression metrics.
+
+Resamples are drawn as one index matrix per chunk of resamples and the
+metrics of the whole chunk are reduced at once. Every resample has its own
+random stream, so the intervals do not depend on the chunk size or on the
+number of worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+METRICS = ["MSE", "RMSE", "MAE"]
+
+# Per-row errors of the worker process, set by _init_worker
+_worker_errors = None
+
+
+def _pack_errors(y_true, y_pred):
+    # Squared errors in the real part and absolute errors in the imaginary
+    # part: one gather and one reduction give the sums of both, in float64
+    # like the point metrics
+    residuals = np.asarray(y_true, dtype=np.float64).ravel() - np.asarray(y_pred, dtype=np.float64).ravel()
+    return residuals * residuals + 1j * np.abs(residuals)
+
+
+def _resample_sums(errors, start, stop, seed):
+    """Sums of the packed errors over resamples [start, stop)."""
+    n = len(errors)
+    # np.take would convert narrower indices to intp, so draw them as intp
+    idx = np.empty((stop - start, n), dtype=np.intp)
+    for row, resample in enumerate(range(start, stop)):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(resample,)))
+        idx[row] = rng.integers(0, n, size=n, dtype=np.intp)
+    return np.take(errors, idx).sum(axis=1)
+
+
+def _init_worker(errors):
+    global _worker_errors
+    _worker_errors = errors
+
+
+def _worker_sums(start, stop, seed):
+    return _resample_sums(_worker_errors, start, stop, seed)
+
+
+def bootstrap_metrics(y_true, y_pred, n_resamples: int = 1000, confidence: float = 0.95,
+                      random_state: int = 123, max_memory_mb: float = 256, n_jobs: int = 1) -> pd.DataFrame:
+    """
+    Percentile bootstrap confidence intervals of MSE, RMSE and MAE.
+
+    Parameters
+    ----------
+    y_true : array-like
+        True target values.
+    y_pred : array-like
+        Predicted values.
+    n_resamples : int, optional
+        Number of bootstrap resamples (default is 1000).
+    confidence : float, optional
+        Confidence level of the intervals (default is 0.95).
+    random_state : int, optional
+        Random seed (default is 123).
+    max_memory_mb : float, optional
+        Approximate memory bound of one chunk of resamples (default is 256 MB).
+    n_jobs : int, optional
+        Number of worker processes (default is 1, in this process).
+
+    Returns
+    -------
+    pd.DataFrame
+        "lower" and "upper" bounds indexed by "MSE", "RMSE" and "MAE".
+
+    Raises
+    ------
+    ValueError
+        If the inputs are empty or differ in length, or if `confidence` is not in (0, 1).
+    """
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence must be between 0 and 1, got {confidence}.")
+    n = np.size(y_true)
+    if n == 0 or n != np.size(y_pred):
+        raise ValueError("y_true and y_pred must be non-empty and of the same length.")
+    errors = _pack_errors(y_true, y_pred)
+
+    # Index matrix plus gathered errors, per resample
+    per_resample = n * (np.dtype(np.intp).itemsize + errors.itemsize)
+    chunk = max(1, min(n_resamples, int(max_memory_mb * 1e6 // per_resample)))
+    if n_jobs > 1:
+        chunk = min(chunk, -(-n_resamples // n_jobs))
+    bounds = [(start, min(start + chunk, n_resamples)) for start in range(0, n_resamples, chunk)]
+
+    if n_jobs == 1:
+        sums = [_resample_sums(errors, start, stop, random_state) for start, stop in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(errors,)) as executor:
+            sums = list(executor.map(_worker_sums, *zip(*bounds), [random_state] * len(bounds)))
+    sums = np.concatenate(sums) / n
+
+    mse = sums.real
+    samples = np.stack([mse, np.sqrt(mse), sums.imag], axis=1)
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(samples, [alpha, 1 - alpha], axis=0)
+    return pd.DataFrame({"lower": lower, "upper": upper}, index=METRICS)
@@ -0,0 +1,200 @@
+"""
+One-hot encoding through pandas category codes.
+
+`OneHotEncoder` maps object columns to integers with a Python dictionary
+lookup per value on every transform. `CategoryCodeEncoder` keeps a fixed
+vocabulary per column, fitted once and pickled with the pipeline, and turns
+values into codes with `pd.Categorical`. Columns that already have a
+categorical dtype are recoded by mapping their categories, not their rows,
+onto the vocabulary, so transforming them compares no strings at all. The
+one-hot columns are then filled by integer indexing with the codes.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+
+class CategoryCodeEncoder(TransformerMixin, BaseEstimator):
+    """
+    One-hot encoder of categorical columns through category codes.
+
+    Its output and feature names are those of `OneHotEncoder` with the same
+    parameters, for columns without missing values; here missing values are
+    unknown values.
+
+    Parameters
+    ----------
+    categories : "auto" or list, optional
+        Vocabulary of each column: "auto" (default) takes the sorted values
+        seen in fit, or a list with the categories of each column, e.g. from
+        `RAW_DOMAINS`.
+    drop : None or "if_binary", optional
+        "if_binary" encodes columns with two categories as one column, the
+        indicator of the second category (default is None).
+    sparse_output : bool, optional
+        Whether the output is a scipy CSR matrix (default is True).
+    dtype : numpy dtype, optional
+        Dtype of the output (default is np.float64).
+    handle_unknown : "error" or "ignore", optional
+        What to do with values outside the vocabulary, including missing
+        values: raise a ValueError (default) or encode them as all zeros.
+
+    Attributes
+    ----------
+    categories_ : list of np.ndarray
+        Vocabulary of each column.
+    feature_names_in_ : np.ndarray
+        Names of the input columns.
+
+    Examples
+    --------
+    >>> encoder = CategoryCodeEncoder(drop="if_binary", sparse_output=False)
+    >>> encoder.fit_transform(pd.DataFrame({"sex": ["F", "M", "F"], "Mjob": ["health", "other", "at_home"]}))
+    array([[0., 0., 1., 0.],
+           [1., 0., 0., 1.],
+           [0., 1., 0., 0.]])
+    """
+
+    def __init__(self, categories="auto", drop=None, sparse_output=True, dtype=np.float64, handle_unknown="error"):
+        self.categories = categories
+        self.drop = drop
+        self.sparse_output = sparse_output
+        self.dtype = dtype
+        self.handle_unknown = handle_unknown
+
+    def fit(self, X, y=None):
+        """
+        Learn the vocabulary of each column.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Categorical columns.
+        y : None
+            Ignored.
+
+        Returns
+        -------
+        CategoryCodeEncoder
+            self.
+        """
+        if self.drop not in (None, "if_binary"):
+            raise ValueError(f"drop must be None or 'if_binary', got {self.drop!r}.")
+        if self.handle_unknown not in ("error", "ignore"):
+            raise ValueError(f"handle_unknown must be 'error' or 'ignore', got {self.handle_unknown!r}.")
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        if isinstance(self.categories, str) and self.categories == "auto":
+            self.categories_ = [self._observed(X.iloc[:, j]) for j in range(X.shape[1])]
+        else:
+            if len(self.categories) != X.shape[1]:
+                raise ValueError(f"Got categories for {len(self.categories)} columns, expected {X.shape[1]}.")
+            self.categories_ = [np.sort(np.asarray(list(categories), dtype=object)) for categories in self.categories]
+            # Values outside a given vocabulary are unknown already in fit
+            self._codes(X)
+        self._dropped = [self.drop == "if_binary" and len(categories) == 2 for categories in self.categories_]
+        widths = np.array([len(c) - dropped for c, dropped in zip(self.categories_, self._dropped)])
+        self._offsets = np.concatenate([[0], np.cumsum(widths)])
+        return self
+
+    @staticmethod
+    def _observed(column):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            categories = column.cat.categories[np.unique(column.cat.codes[column.cat.codes >= 0])]
+        else:
+            categories = pd.unique(column.dropna())
+        return np.sort(np.asarray(categories, dtype=object))
+
+    def _codes(self, X):
+        """Vocabulary codes of each column, -1 for unknown values, as an (n_rows, n_columns) array."""
+        X = pd.DataFrame(X)
+        codes = np.empty(X.shape, dtype=np.int32)
+        for j, vocabulary in enumerate(self.categories_):
+            column = X.iloc[:, j]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                # Map the column's categories, not its rows, onto the vocabulary
+                lookup = pd.Index(vocabulary).get_indexer(column.cat.categories)
+                lookup = np.append(lookup, -1).astype(np.int32)
+                codes[:, j] = lookup[column.cat.codes.to_numpy()]
+            else:
+                codes[:, j] = pd.Categorical(column, categories=vocabulary).codes
+        if self.handle_unknown == "error" and (codes < 0).any():
+            j = int(np.flatnonzero((codes < 0).any(axis=0))[0])
+            unknown = pd.unique(X.iloc[:, j][codes[:, j] < 0])[:5]
+            raise ValueError(f"Found unknown categories {list(unknown)} in column {X.columns[j]!r} during transform")
+        return codes
+
+    def transform_codes(self, X) -> np.ndarray:
+        """
+        Codes of the values in each column's vocabulary, for embedding-style lookups.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Categorical columns, as in fit.
+
+        Returns
+        -------
+        np.ndarray
+            int32 codes of shape (n_rows, n_columns); unknown values are -1
+            when `handle_unknown="ignore"`.
+        """
+        check_is_fitted(self, "categories_")
+        return self._codes(X)
+
+    def transform(self, X):
+        """
+        One-hot encode the columns.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Categorical columns, as in fit.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix or np.ndarray
+            The one-hot encoded columns.
+        """
+        codes = self.transform_codes(X)
+        n_rows = codes.shape[0]
+        # Output column of each value; dropped first categories and unknown values have none
+        dropped = np.array(self._dropped)
+        columns = codes - dropped + self._offsets[:-1].astype(np.int32)
+        valid = (codes >= 0) & ~(dropped & (codes == 0))
+        width = int(self._offsets[-1])
+        if self.sparse_output:
+            counts = valid.sum(axis=1)
+            indptr = np.concatenate([[0], np.cumsum(counts)])
+            indices = columns[valid]
+            data = np.ones(len(indices), dtype=self.dtype)
+            return sp.csr_matrix((data, indices, indptr), shape=(n_rows, width))
+        output = np.zeros((n_rows, width), dtype=self.dtype)
+        rows = np.broadcast_to(np.arange(n_rows)[:, None], codes.shape)
+        output[rows[valid], columns[valid]] = 1
+        return output
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        """
+        Output feature names, "<column>_<category>" as with `OneHotEncoder`.
+
+        Parameters
+        ----------
+        input_features : array-like, optional
+            Input column names (default is the names seen in fit).
+
+        Returns
+        -------
+        np.ndarray
+            Output feature names.
+        """
+        check_is_fitted(self, "categories_")
+        input_features = self.feature_names_in_ if input_features is None else input_features
+        names = []
+        for feature, categories, dropped in zip(input_features, self.categories_, self._dropped):
+            names.extend(f"{feature}_{category}" for category in categories[int(dropped):])
+        return np.asarray(names, dtype=object)
@@ -0,0 +1,258 @@
+"""
+Concurrent execution of validation checks with declared dependencies.
+
+Numeric checks run in a thread pool and checks that render plots run in a
+process pool, since matplotlib's pyplot state is not thread-safe and saving
+figures is CPU-bound Python code. A check starts once every check it depends
+on has passed and is skipped if one of them failed.
+
+The printed output and the warnings of every check are captured separately
+and replayed in the order the checks were declared, so the log and the
+report do not depend on which check finished first.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import numpy as np
+import pandas as pd
+
+NUMERIC = "numeric"
+RENDER = "render"
+
+
+class _ThreadLocalOutput(io.TextIOBase):
+    """Text stream writing to the buffer of the current thread, if it has one."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def write(self, text):
+        return (getattr(self.local, "buffer", None) or self.default).write(text)
+
+    def flush(self):
+        (getattr(self.local, "buffer", None) or self.default).flush()
+
+
+def _call(func, args, kwargs):
+    start = time.perf_counter()
+    try:
+        return {"status": "passed", "result": func(*args, **kwargs), "error": None,
+                "seconds": time.perf_counter() - start}
+    except Exception as e:
+        return {"status": "failed", "result": None, "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(), "seconds": time.perf_counter() - start}
+
+
+def _run_in_thread(output, caught, func, args, kwargs):
+    # Output and warnings are routed to this thread's buffers by run()
+    output.local.buffer = io.StringIO()
+    caught.local.messages = []
+    try:
+        outcome = _call(func, args, kwargs)
+        outcome.update(output=output.local.buffer.getvalue(), warnings=caught.local.messages)
+        return outcome
+    finally:
+        output.local.buffer = None
+        caught.local.messages = None
+
+
+def _run_in_process(func, args, kwargs):
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer), warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", UserWarning)
+        outcome = _call(func, args, kwargs)
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].close("all")
+    outcome.update(output=buffer.getvalue(), warnings=[str(w.message) for w in caught])
+    return outcome
+
+
+class _WarningRouter:
+    """`warnings.showwarning` replacement recording into the current thread's list."""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def __call__(self, message, category, filename, lineno, file=None, line=None):
+        messages = getattr(self.local, "messages", None)
+        if messages is None:
+            self.default(message, category, filename, lineno, file, line)
+        else:
+            messages.append(str(message))
+
+
+class CheckScheduler:
+    """
+    Run checks concurrently, respecting their dependencies.
+
+    Parameters
+    ----------
+    n_jobs : int, optional
+        Number of threads and of processes (default is the number of cores).
+
+    Examples
+    --------
+    >>> scheduler = CheckScheduler()
+    >>> scheduler.add("schema", validate_student_data, df)
+    >>> scheduler.add("correlations", validate_anomalous_correlations, df, "G3", depends_on=["schema"])
+    >>> report = scheduler.run()
+    """
+
+    def __init__(self, n_jobs: int = None):
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.checks = {}
+
+    def add(self, name: str, func, *args, depends_on=(), kind: str = NUMERIC, **kwargs) -> None:
+        """
+        Declare a check.
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the check.
+        func : callable
+            The check; it fails by raising an exception. Render checks must be
+            picklable, i.e. module-level functions.
+        *args, **kwargs
+            Arguments of `func`.
+        depends_on : iterable of str, optional
+            Names of previously declared checks that must pass first.
+        kind : str, optional
+            "numeric" to run in the thread pool (default) or "render" to run
+            in the process pool.
+
+        Raises
+        ------
+        ValueError
+            If the name is taken, a dependency is unknown or the kind is invalid.
+        """
+        if name in self.checks:
+            raise ValueError(f"Check '{name}' is already declared.")
+        unknown = [dependency for dependency in depends_on if dependency not in self.checks]
+        if unknown:
+            raise ValueError(f"Check '{name}' depends on undeclared checks: {unknown}")
+        if kind not in (NUMERIC, RENDER):
+            raise ValueError(f"Unknown check kind '{kind}'; expected '{NUMERIC}' or '{RENDER}'.")
+        self.checks[name] = {"func": func, "args": args, "kwargs": kwargs,
+                             "depends_on": list(depends_on), "kind": kind}
+
+    def run(self, echo: bool = True) -> list:
+        """
+        Run all checks.
+
+        Parameters
+        ----------
+        echo : bool, optional
+            Whether to print the captured output and warnings of each check,
+            in declaration order, as soon as it and all earlier checks are done
+            (default is True).
+
+        Returns
+        -------
+        list
+            One dict per check, in declaration order, with "name", "kind",
+            "status" ("passed", "failed" or "skipped"), "seconds", "output",
+            "warnings", "error" and "result".
+        """
+        names = list(self.checks)
+        outcomes = {}
+        echoed = 0
+        stdout = sys.stdout
+        output = _ThreadLocalOutput(stdout)
+        caught = _WarningRouter(warnings.showwarning)
+
+        processes = None
+        n_render = sum(check["kind"] == RENDER for check in self.checks.values())
+        if n_render:
+            processes = ProcessPoolExecutor(max_workers=min(self.n_jobs, n_render))
+            # Start the workers now: forking after the threads below start could copy held locks
+            processes.submit(os.getpid).result()
+
+        with ThreadPoolExecutor(max_workers=self.n_jobs) as threads, warnings.catch_warnings():
+            # Repeated warnings are reported by every check, as in a fresh process
+            warnings.simplefilter("always", UserWarning)
+            warnings.showwarning = caught
+            sys.stdout = output
+            try:
+                running = {}
+                while len(outcomes) < len(names):
+                    for name in names:
+                        if name in outcomes or name in running.values():
+                            continue
+                        check = self.checks[name]
+                        states = [outcomes.get(dependency, {}).get("status") for dependency in check["depends_on"]]
+                        if any(state in ("failed", "skipped") for state in states):
+                            outcomes[name] = {"status": "skipped", "result": None, "seconds": 0.0, "output": "",
+                                              "warnings": [], "error": f"Dependencies did not pass: {check['depends_on']}"}
+                        elif all(state == "passed" for state in states):
+                            if check["kind"] == RENDER:
+                                future = processes.submit(_run_in_process, check["func"], check["args"],
+                                                          check["kwargs"])
+                            else:
+                                future = threads.submit(_run_in_thread, output, caught, check["func"],
+                                                        check["args"], check["kwargs"])
+                            running[future] = name
+                    if running:
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            outcomes[running.pop(future)] = future.result()
+                    while echo and echoed < len(names) and names[echoed] in outcomes:
+                        self._echo(names[echoed], outcomes[names[echoed]], stdout)
+                        echoed += 1
+            finally:
+                sys.stdout = stdout
+                if processes is not None:
+                    processes.shutdown()
+
+        return [{"name": name, "kind": self.checks[name]["kind"], **outcomes[name]} for name in names]
+
+    @staticmethod
+    def _echo(name, outcome, stream):
+        stream.write(outcome["output"])
+        for message in outcome["warnings"]:
+            stream.write(f"Warning ({name}): {message}\n")
+        if outcome["status"] != "passed":
+            stream.write(f"Check '{name}' {outcome['status']}: {outcome['error']}\n")
+        stream.flush()
+
+
+def _to_json(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict(orient="records")
+    if isinstance(value, pd.Series):
+        return value.to_dict()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def write_report(results: list, path: str) -> None:
+    """
+    Write the results of `CheckScheduler.run` as a JSON validation report.
+
+    Parameters
+    ----------
+    results : list
+        Check results.
+    path : str
+        Path of the JSON file.
+    """
+    report = {
+        "passed": all(result["status"] == "passed" for result in results),
+        "checks": [{key: value for key, value in result.items() if key != "traceback"} for result in results],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=_to_json)
@@ -0,0 +1,195 @@
+"""
+Split-conformal prediction intervals around the point predictions of a model.
+
+The absolute residuals of out-of-fold predictions on the training data are
+sorted once, at fit time, and kept with the model. An interval at coverage
+c is the prediction plus or minus the ceil((n + 1) c)-th smallest residual,
+so attaching intervals to a batch costs one lookup per coverage level and
+one addition per row.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_predict
+
+# Calibration sets larger than this keep a conservative subset of the order statistics
+MAX_SCORES = 10_000
+
+
+class ConformalCalibration:
+    """
+    Sorted calibration residuals of a regression model.
+
+    Parameters
+    ----------
+    y_true : array-like
+        Target values of the calibration rows.
+    y_pred : array-like
+        Out-of-sample predictions of the calibration rows.
+    max_scores : int, optional
+        Largest number of residuals kept (default is `MAX_SCORES`). Above it,
+        residuals are kept at evenly spaced ranks and a lookup takes the next
+        kept rank, which can only widen the intervals.
+
+    Attributes
+    ----------
+    n_calibration : int
+        Number of calibration rows.
+    ranks : np.ndarray
+        1-based ranks of the kept residuals, increasing.
+    scores : np.ndarray
+        Absolute residuals at those ranks.
+
+    Examples
+    --------
+    >>> calibration = ConformalCalibration(y_train, cross_val_predict(model, X_train, y_train, cv=5))
+    >>> lower, upper = calibration.intervals(model.predict(X_new), coverage=0.9)
+    """
+
+    def __init__(self, y_true, y_pred, max_scores: int = MAX_SCORES):
+        scores = np.sort(np.abs(np.asarray(y_true, dtype=np.float64).ravel()
+                                - np.asarray(y_pred, dtype=np.float64).ravel()))
+        if not len(scores):
+            raise ValueError("Calibration needs at least one row.")
+        self.n_calibration = len(scores)
+        self.ranks = np.arange(1, len(scores) + 1)
+        if len(scores) > max_scores:
+            self.ranks = np.unique(np.ceil(np.linspace(1, len(scores), max_scores)).astype(np.int64))
+        self.scores = scores[self.ranks - 1]
+
+    def half_width(self, coverage) -> np.ndarray:
+        """
+        Half widths of the intervals at each coverage level.
+
+        Parameters
+        ----------
+        coverage : float or array-like
+            Coverage levels in (0, 1).
+
+        Returns
+        -------
+        np.ndarray
+            Half widths of the shape of `coverage`; infinite where the level
+            needs more calibration rows than there are.
+        """
+        coverage = np.asarray(coverage, dtype=np.float64)
+        if ((coverage <= 0) | (coverage >= 1)).any():
+            raise ValueError(f"Coverage levels must be in (0, 1), got {coverage}.")
+        ranks = np.ceil((self.n_calibration + 1) * coverage).astype(np.int64)
+        positions = np.searchsorted(self.ranks, ranks)
+        scores = np.append(self.scores, np.inf)
+        return scores[np.minimum(positions, len(self.scores))]
+
+    def intervals(self, y_pred, coverage: float = 0.9) -> tuple:
+        """
+        Prediction intervals of a batch at one coverage level.
+
+        Parameters
+        ----------
+        y_pred : array-like
+            Point predictions.
+        coverage : float, optional
+            Coverage level (default is 0.9).
+
+        Returns
+        -------
+        tuple
+            Lower and upper bounds, arrays of the shape of `y_pred`.
+        """
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        half_width = self.half_width(coverage)
+        return y_pred - half_width, y_pred + half_width
+
+    def interval_frame(self, y_pred, coverages=(0.8, 0.9, 0.95), index=None) -> pd.DataFrame:
+        """
+        Predictions with their intervals at several coverage levels.
+
+        Parameters
+        ----------
+        y_pred : array-like
+            Point predictions.
+        coverages : sequence of float, optional
+            Coverage levels (default is 0.8, 0.9 and 0.95).
+        index : pd.Index, optional
+            Index of the returned frame.
+
+        Returns
+        -------
+        pd.DataFrame
+            "prediction" and, for each level, e.g. 0.9, "lower_90" and "upper_90".
+        """
+        y_pred = np.asarray(y_pred, dtype=np.float64).ravel()
+        half_widths = self.half_width(list(coverages))
+        columns = {"prediction": y_pred}
+        for coverage, half_width in zip(coverages, half_widths):
+            columns[f"lower_{coverage * 100:g}"] = y_pred - half_width
+            columns[f"upper_{coverage * 100:g}"] = y_pred + half_width
+        return pd.DataFrame(columns, index=index)
+
+
+def calibrate(estimator, X, y, cv=5, n_jobs=None) -> ConformalCalibration:
+    """
+    Calibrate intervals on the out-of-fold predictions of an estimator.
+
+    The estimator is cloned and refitted on each fold, so with the `cv` of a
+    search these are the fold predictions of the chosen candidate.
+
+    Parameters
+    ----------
+    estimator : sklearn estimator
+        Model with the chosen hyperparameters; it is not refitted itself.
+    X : pd.DataFrame
+        Training features.
+    y : array-like
+        Training target.
+    cv : int or cross-validation generator, optional
+        Folds, as in `cross_val_predict` (default is 5).
+    n_jobs : int, optional
+        Number of jobs of `cross_val_predict`.
+
+    Returns
+    -------
+    ConformalCalibration
+        Calibration of the estimator.
+    """
+    y_oof = cross_val_predict(clone(estimator), X, y, cv=cv, n_jobs=n_jobs)
+    return ConformalCalibration(y, y_oof)
+
+
+class IntervalCoverage:
+    """
+    Running empirical coverage of conformal intervals on labelled batches.
+
+    Parameters
+    ----------
+    calibration : ConformalCalibration
+        Calibration the intervals come from.
+    coverages : sequence of float, optional
+        Nominal coverage levels (default is 0.8, 0.9 and 0.95).
+    """
+
+    def __init__(self, calibration: ConformalCalibration, coverages=(0.8, 0.9, 0.95)):
+        self.coverages = np.asarray(coverages, dtype=np.float64)
+        self.half_widths = calibration.half_width(self.coverages)
+        self.count = 0
+        self.covered = np.zeros(len(self.coverages), dtype=np.int64)
+
+    def update(self, y_true, y_pred) -> "IntervalCoverage":
+        """Add a batch of targets and predictions, in place."""
+        residuals = np.abs(np.asarray(y_true, dtype=np.float64).ravel() - np.asarray(y_pred, dtype=np.float64).ravel())
+        self.count += len(residuals)
+        self.covered += (residuals[:, None] <= self.half_widths).sum(axis=0)
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """Nominal and empirical coverage and width of the intervals at each level."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            empirical = self.covered / self.count
+        return pd.DataFrame({
+            "nominal": self.coverages,
+            "empirical": empirical,
+            "covered": self.covered,
+            "count": self.count,
+            "width": 2 * self.half_widths,
+        })
@@ -0,0 +1,240 @@
+"""
+Resumable, verified downloads and in-memory extraction of nested zip archives.
+
+Transfers are streamed with a chunk size that adapts to the connection and
+resumed with HTTP range requests after a dropped connection, either within
+one call or, for downloads to a file, across runs through a `.part` file.
+"""
+
+import hashlib
+import io
+import os
+import time
+import zipfile
+import requests
+import urllib3
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 8 * 1024 * 1024
+# Chunk size is adapted so that one chunk takes about this long to read
+TARGET_CHUNK_SECONDS = 0.25
+
+
+class ResumeError(IOError):
+    """The server resumed a transfer at the wrong offset."""
+
+
+# Errors after which the transfer is resumed; urllib3 errors come from reading the raw stream
+_RETRY_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+    urllib3.exceptions.HTTPError,
+    ResumeError,
+)
+
+
+def _next_chunk_size(chunk_size, elapsed):
+    if elapsed < TARGET_CHUNK_SECONDS / 2:
+        return min(chunk_size * 2, MAX_CHUNK_SIZE)
+    if elapsed > TARGET_CHUNK_SECONDS * 2:
+        return max(chunk_size // 2, MIN_CHUNK_SIZE)
+    return chunk_size
+
+
+def _open(session, url, offset, timeout):
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    response = session.get(url, headers=headers, stream=True, timeout=timeout)
+    if response.status_code == 416 and offset:
+        # The partial download is already complete
+        response.close()
+        return None
+    response.raise_for_status()
+    if offset and response.status_code == 206:
+        start = int(response.headers.get("Content-Range", "bytes 0-").split()[1].split("-")[0])
+        if start != offset:
+            response.close()
+            raise ResumeError(f"Server resumed at byte {start} instead of {offset}.")
+    return response
+
+
+def stream_download(url: str, fileobj, digest=None, max_retries: int = 3, timeout: float = 30,
+                    session: requests.Session = None):
+    """
+    Stream `url` into a binary file object, resuming after dropped connections.
+
+    Writing starts at the current position of `fileobj`; if it is not at the
+    start, the transfer is resumed from that offset with a range request.
+
+    Parameters
+    ----------
+    url : str
+        URL to download.
+    fileobj : file-like
+        Binary file object opened for writing, e.g. `io.BytesIO`.
+    digest : hashlib hash, optional
+        SHA-256 state covering the bytes already in `fileobj` (default is a new hash).
+    max_retries : int, optional
+        Number of consecutive failed attempts before giving up (default is 3).
+    timeout : float, optional
+        Connection and read timeout in seconds (default is 30).
+    session : requests.Session, optional
+        Session used for the requests.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 of all bytes in `fileobj`.
+
+    Raises
+    ------
+    requests.exceptions.HTTPError
+        If the server answers with an error status.
+    requests.exceptions.RequestException
+        If the transfer still fails after `max_retries` attempts.
+    """
+    session = session or requests.Session()
+    digest = digest or hashlib.sha256()
+    chunk_size = MIN_CHUNK_SIZE
+    failures = 0
+    while True:
+        offset = fileobj.tell()
+        try:
+            response = _open(session, url, offset, timeout)
+            if response is None:
+                return digest.hexdigest()
+            if offset and response.status_code != 206:
+                # Range not supported: start over
+                fileobj.seek(0)
+                fileobj.truncate()
+                digest = hashlib.sha256()
+            with response:
+                while True:
+                    start = time.perf_counter()
+                    chunk = response.raw.read(chunk_size, decode_content=True)
+                    if not chunk:
+                        return digest.hexdigest()
+                    fileobj.write(chunk)
+                    digest.update(chunk)
+                    failures = 0
+                    chunk_size = _next_chunk_size(chunk_size, time.perf_counter() - start)
+        except _RETRY_ERRORS:
+            failures += 1
+            if failures > max_retries:
+                raise
+
+
+def _check_sha256(actual, expected_sha256):
+    if expected_sha256 is not None and actual != expected_sha256.lower():
+        raise ValueError(f"SHA-256 mismatch: expected {expected_sha256}, got {actual}.")
+
+
+def download_file(url: str, dest_path: str, expected_sha256: str = None, **kwargs) -> str:
+    """
+    Download `url` to `dest_path`, resuming an earlier interrupted run.
+
+    Bytes are written to `<dest_path>.part`, which is renamed to `dest_path`
+    only once the download is complete and verified.
+
+    Parameters
+    ----------
+    url : str
+        URL to download.
+    dest_path : str
+        Path of the downloaded file.
+    expected_sha256 : str, optional
+        Hex SHA-256 the file must have.
+    **kwargs : dict
+        Passed to `stream_download`.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 of the file.
+
+    Raises
+    ------
+    ValueError
+        If the checksum doesn't match; the partial file is removed.
+    """
+    part_path = dest_path + ".part"
+    digest = hashlib.sha256()
+    if os.path.exists(part_path):
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(MAX_CHUNK_SIZE), b""):
+                digest.update(block)
+    with open(part_path, "ab") as f:
+        actual = stream_download(url, f, digest=digest, **kwargs)
+    try:
+        _check_sha256(actual, expected_sha256)
+    except ValueError:
+        os.remove(part_path)
+        raise
+    os.replace(part_path, dest_path)
+    return actual
+
+
+def download_bytes(url: str, expected_sha256: str = None, **kwargs) -> tuple:
+    """
+    Download `url` into memory.
+
+    Parameters
+    ----------
+    url : str
+        URL to download.
+    expected_sha256 : str, optional
+        Hex SHA-256 the content must have.
+    **kwargs : dict
+        Passed to `stream_download`.
+
+    Returns
+    -------
+    tuple
+        The downloaded content (bytes) and its hex SHA-256.
+
+    Raises
+    ------
+    ValueError
+        If the checksum doesn't match.
+    """
+    buffer = io.BytesIO()
+    actual = stream_download(url, buffer, **kwargs)
+    _check_sha256(actual, expected_sha256)
+    return buffer.getvalue(), actual
+
+
+def read_nested_member(archive: bytes, member: str) -> bytes:
+    """
+    Read a file from a zip archive, looking inside zip archives nested in it.
+
+    Nothing is written to disk: inner archives are opened in memory.
+
+    Parameters
+    ----------
+    archive : bytes
+        Content of the outer zip archive.
+    member : str
+        Base name of the file to read, e.g. "student-mat.csv".
+
+    Returns
+    -------
+    bytes
+        Content of the first matching file, searching the outer archive first.
+
+    Raises
+    ------
+    KeyError
+        If no archive contains the file.
+    """
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        names = zf.namelist()
+        for name in names:
+            if os.path.basename(name) == member:
+                return zf.read(name)
+        for name in names:
+            if name.lower().endswith(".zip"):
+                try:
+                    return read_nested_member(zf.read(name), member)
+                except KeyError:
+                    continue
+    raise KeyError(f"'{member}' not found in the archive.")
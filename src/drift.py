@@ -0,0 +1,240 @@
+"""
+Distribution drift of the features between the training data and new batches.
+
+Every feature has a small known domain (`RAW_DOMAINS`), so its distribution
+is summarized exactly by one count per value: a `np.bincount` of the value
+codes plus a last bin for values outside the domain or missing. The counts
+of the training data are saved once; those of a scoring batch are added up
+chunk by chunk, and the drift statistics of all features are computed at
+once on the stacked count tables.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from scipy import stats
+from src.student_schema import RAW_DOMAINS
+
+# Population stability index above which a feature is reported as drifting, or worth a look
+PSI_DRIFT = 0.25
+PSI_WARNING = 0.1
+# Proportions are floored at this value in the PSI, so that empty bins give a finite index
+_PSI_FLOOR = 1e-4
+
+
+class FeatureHistograms:
+    """
+    Counts of each domain value of several features, accumulated over batches.
+
+    Parameters
+    ----------
+    domains : dict
+        Domain of each column, as in `RAW_DOMAINS`: a list of labels or an
+        inclusive (low, high) range of integers.
+
+    Attributes
+    ----------
+    counts : dict
+        Counts of each column: one per domain value, in domain order, then
+        the count of values outside the domain and missing values.
+
+    Examples
+    --------
+    >>> reference = FeatureHistograms.for_columns(["sex", "age"]).update(X_train)
+    >>> reference.save("results/models/feature_histograms.json")
+    """
+
+    def __init__(self, domains: dict):
+        self.domains = {column: list(domain) if isinstance(domain, list) else tuple(domain)
+                        for column, domain in domains.items()}
+        self.counts = {column: np.zeros(self._n_values(column) + 1, dtype=np.int64) for column in self.domains}
+
+    @classmethod
+    def for_columns(cls, columns) -> "FeatureHistograms":
+        """Histograms of raw data columns, with their domains from `RAW_DOMAINS`."""
+        return cls({column: RAW_DOMAINS[column] for column in columns})
+
+    def _n_values(self, column):
+        domain = self.domains[column]
+        return len(domain) if isinstance(domain, list) else domain[1] - domain[0] + 1
+
+    def _codes(self, column, values):
+        """Domain positions of the values, with values outside the domain in the last bin."""
+        domain, n_values = self.domains[column], self._n_values(column)
+        if isinstance(domain, list):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Map the categories, not the rows, onto the domain
+                lookup = np.append(pd.Index(domain).get_indexer(values.cat.categories), -1)
+                codes = lookup[values.cat.codes.to_numpy()]
+            else:
+                codes = pd.Categorical(values, categories=domain).codes.astype(np.int64)
+            return np.where(codes < 0, n_values, codes)
+        if pd.api.types.is_integer_dtype(values.dtype):
+            codes = values.to_numpy(dtype=np.int64) - domain[0]
+        else:
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+            codes = np.where(numbers == np.floor(numbers), numbers - domain[0], -1)
+            codes = np.nan_to_num(codes, nan=-1).astype(np.int64)
+        return np.where((codes < 0) | (codes >= n_values), n_values, codes)
+
+    def update(self, X: pd.DataFrame) -> "FeatureHistograms":
+        """
+        Add the rows of a batch, in place.
+
+        Raises
+        ------
+        ValueError
+            If a column of the histograms is not in `X`.
+        """
+        missing = [column for column in self.domains if column not in X.columns]
+        if missing:
+            raise ValueError(f"Columns not in the batch: {missing}")
+        for column in self.domains:
+            self.counts[column] += np.bincount(self._codes(column, X[column]), minlength=len(self.counts[column]))
+        return self
+
+    def update_packed(self, records: np.ndarray, layout) -> "FeatureHistograms":
+        """
+        Add packed rows (see `src.packed_records`), in place, counting the fields without decoding them.
+
+        Raises
+        ------
+        ValueError
+            If a column of the histograms is not in the layout or has another domain.
+        """
+        for column in self.domains:
+            if column not in layout.columns or list(layout.domains[column]) != list(self.domains[column]):
+                raise ValueError(f"Column {column!r} is not packed with the domain of the histograms.")
+        for column in self.domains:
+            n_values = self._n_values(column)
+            # Field values past the domain can only come from corrupt records
+            codes = np.minimum(layout.codes(records, column), n_values)
+            self.counts[column] += np.bincount(codes, minlength=n_values + 1)
+        return self
+
+    def merge(self, other: "FeatureHistograms") -> "FeatureHistograms":
+        """Add the counts of other rows of the same columns, in place."""
+        for column in self.domains:
+            self.counts[column] += other.counts[column]
+        return self
+
+    @property
+    def n_rows(self) -> int:
+        """Number of rows counted."""
+        return int(next(iter(self.counts.values())).sum()) if self.counts else 0
+
+    def to_dict(self) -> dict:
+        """Domains and counts, as JSON-serializable lists."""
+        return {
+            "domains": {column: list(domain) for column, domain in self.domains.items()},
+            "categorical": [column for column, domain in self.domains.items() if isinstance(domain, list)],
+            "counts": {column: counts.tolist() for column, counts in self.counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FeatureHistograms":
+        """Histograms from the output of `to_dict`."""
+        categorical = set(data["categorical"])
+        histograms = cls({column: domain if column in categorical else tuple(domain)
+                          for column, domain in data["domains"].items()})
+        for column, counts in data["counts"].items():
+            histograms.counts[column] = np.asarray(counts, dtype=np.int64)
+        return histograms
+
+    def save(self, path: str):
+        """Write the histograms to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureHistograms":
+        """Read histograms written by `save`."""
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def drift_report(reference: FeatureHistograms, current: FeatureHistograms, psi_warning: float = PSI_WARNING,
+                 psi_drift: float = PSI_DRIFT, alpha: float = 0.01) -> pd.DataFrame:
+    """
+    Drift statistics of each feature of a batch against the reference histograms.
+
+    The population stability index (PSI) compares the value proportions;
+    the chi-square test of homogeneity compares the counts of all values,
+    and the two-sample Kolmogorov-Smirnov statistic the cumulative
+    distributions of integer features along their domain (it is left empty
+    for categorical features). The test p-values become tiny for negligible
+    shifts on large batches, so the status is driven by the PSI: "drift" at
+    `psi_drift` or more, "warning" at `psi_warning` or more or when either
+    test rejects at level `alpha`, and "stable" otherwise.
+
+    Parameters
+    ----------
+    reference : FeatureHistograms
+        Histograms of the training data.
+    current : FeatureHistograms
+        Histograms of the batch, of the same columns and domains.
+    psi_warning : float, optional
+        PSI of a "warning" (default is 0.1).
+    psi_drift : float, optional
+        PSI of a "drift" (default is 0.25).
+    alpha : float, optional
+        Level of the tests (default is 0.01).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per feature: "feature", "psi", "chi2", "chi2_p_value", "ks",
+        "ks_p_value", "out_of_domain" (share of the batch outside the
+        domain or missing) and "status".
+    """
+    columns = list(reference.domains)
+    if list(current.domains) != columns or any(current.domains[c] != reference.domains[c] for c in columns):
+        raise ValueError("The histograms have different columns or domains.")
+    width = max(len(counts) for counts in reference.counts.values())
+    # Count tables padded with empty bins; valid marks the real ones
+    ref = np.zeros((len(columns), width))
+    cur = np.zeros((len(columns), width))
+    valid = np.zeros((len(columns), width), dtype=bool)
+    for i, column in enumerate(columns):
+        n_bins = len(reference.counts[column])
+        ref[i, :n_bins], cur[i, :n_bins], valid[i, :n_bins] = reference.counts[column], current.counts[column], True
+    n_ref, n_cur = ref.sum(axis=1, keepdims=True), cur.sum(axis=1, keepdims=True)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p, q = ref / n_ref, cur / n_cur
+        p_floor, q_floor = np.maximum(p, _PSI_FLOOR), np.maximum(q, _PSI_FLOOR)
+        psi = np.where(valid, (q_floor - p_floor) * np.log(q_floor / p_floor), 0).sum(axis=1)
+
+        # Chi-square test of homogeneity of the 2 x bins table, over the bins seen at all
+        total = ref + cur
+        expected_ref, expected_cur = total * n_ref / (n_ref + n_cur), total * n_cur / (n_ref + n_cur)
+        seen = total > 0
+        chi2 = np.where(seen, (ref - expected_ref) ** 2 / expected_ref + (cur - expected_cur) ** 2 / expected_cur,
+                        0).sum(axis=1)
+        chi2_p = stats.chi2.sf(chi2, np.maximum(seen.sum(axis=1) - 1, 1))
+
+        # Kolmogorov-Smirnov along the domain order, out-of-domain values left out
+        in_domain = valid.copy()
+        in_domain[np.arange(len(columns)), valid.sum(axis=1) - 1] = False
+        p_in = np.where(in_domain, ref, 0)
+        q_in = np.where(in_domain, cur, 0)
+        m_ref, m_cur = p_in.sum(axis=1), q_in.sum(axis=1)
+        ks = np.abs(np.cumsum(p_in, axis=1) / m_ref[:, None] - np.cumsum(q_in, axis=1) / m_cur[:, None]).max(axis=1)
+        # Asymptotic p-value, conservative for discrete distributions
+        ks_p = stats.kstwobign.sf(ks * np.sqrt(m_ref * m_cur / (m_ref + m_cur)))
+    categorical = np.array([isinstance(reference.domains[column], list) for column in columns])
+    ks, ks_p = np.where(categorical, np.nan, ks), np.where(categorical, np.nan, ks_p)
+    out_of_domain = np.array([current.counts[column][-1] for column in columns]) / n_cur[:, 0]
+
+    warning = (psi >= psi_warning) | (chi2_p < alpha) | (ks_p < alpha)
+    status = np.where(psi >= psi_drift, "drift", np.where(warning, "warning", "stable"))
+    return pd.DataFrame({
+        "feature": columns,
+        "psi": psi,
+        "chi2": chi2,
+        "chi2_p_value": chi2_p,
+        "ks": ks,
+        "ks_p_value": ks_p,
+        "out_of_domain": out_of_domain,
+        "status": status,
+    })
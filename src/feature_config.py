@@ -0,0 +1,70 @@
+"""
+Feature sets of the analysis, read from `config/features.json`.
+
+A feature set lists the input columns and the columns whose one-hot encoded
+values are crossed pairwise. The "default" set is the seven features of the
+original analysis; the "wide" set uses every attribute with interactions.
+"""
+
+import json
+import os
+from src.student_schema import RAW_DOMAINS
+
+FEATURE_CONFIG = os.path.join(os.path.dirname(__file__), "..", "config", "features.json")
+
+
+def load_feature_set(name: str = "default", path: str = FEATURE_CONFIG) -> dict:
+    """
+    Read a feature set from the feature configuration.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the feature set (default is "default").
+    path : str, optional
+        Path to the JSON configuration (default is `config/features.json`).
+
+    Returns
+    -------
+    dict
+        "features" (list of input columns), "target", "columns" (features
+        then target), "interactions" (list of columns crossed pairwise, empty
+        for none) and "min_frequency" (rarer one-hot values of the
+        interaction columns are grouped, or None).
+
+    Raises
+    ------
+    ValueError
+        If the set is unknown or refers to columns outside the raw data.
+    """
+    with open(path) as f:
+        config = json.load(f)
+    feature_sets = config["feature_sets"]
+    if name not in feature_sets:
+        raise ValueError(f"Unknown feature set '{name}'; expected one of {list(feature_sets)}.")
+    feature_set = feature_sets[name]
+    target = config["target"]
+    features = list(feature_set["features"])
+    interactions = list(feature_set.get("interactions", []))
+
+    unknown = [column for column in features + [target] if column not in RAW_DOMAINS]
+    if unknown:
+        raise ValueError(f"Feature set '{name}' has unknown columns: {unknown}")
+    if target in features:
+        raise ValueError(f"Feature set '{name}' uses the target '{target}' as a feature.")
+    outside = [column for column in interactions if column not in features]
+    if outside:
+        raise ValueError(f"Interaction columns of feature set '{name}' are not features: {outside}")
+    return {
+        "features": features,
+        "target": target,
+        "columns": features + [target],
+        "interactions": interactions,
+        "min_frequency": feature_set.get("min_frequency"),
+    }
+
+
+def feature_set_names(path: str = FEATURE_CONFIG) -> list:
+    """Names of the feature sets of the configuration."""
+    with open(path) as f:
+        return list(json.load(f)["feature_sets"])
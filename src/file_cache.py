@@ -0,0 +1,71 @@
+"""
+Cache of parsed CSV files shared by the pipeline stages of one process.
+
+Validation and splitting both parse the same raw file; when the stages run in
+one process (see `scripts/batch_pipeline.py`) the file is parsed only once.
+Entries are keyed on the file's path, modification time and size, so a
+rewritten file is parsed again.
+"""
+
+import functools
+import os
+import pandas as pd
+from src.student_csv import read_student_csv
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_csv(path, mtime_ns, size, options, reader=pd.read_csv):
+    return reader(path, **dict(options))
+
+
+def read_csv_cached(filepath: str, **kwargs) -> pd.DataFrame:
+    """
+    Read a CSV file, reusing the parsed result of an earlier identical call.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV file.
+    **kwargs : dict
+        Hashable keyword arguments passed to `pd.read_csv`, e.g. `delimiter=";"`.
+
+    Returns
+    -------
+    pd.DataFrame
+        A shallow copy of the cached DataFrame, so adding or dropping columns
+        doesn't affect the cache. Values must not be modified in place.
+    """
+    path = os.path.abspath(filepath)
+    stat = os.stat(path)
+    parsed = _parse_csv(path, stat.st_mtime_ns, stat.st_size, tuple(sorted(kwargs.items())))
+    return parsed.copy(deep=False)
+
+
+def read_student_csv_cached(filepath: str, columns=None, **kwargs) -> pd.DataFrame:
+    """
+    Read columns of a raw student CSV file with `read_student_csv`, reusing the result of an earlier identical call.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV file.
+    columns : list, optional
+        Columns to read (default is all columns).
+    **kwargs : dict
+        Hashable keyword arguments passed to `read_student_csv`, e.g. `delimiter=";"`.
+
+    Returns
+    -------
+    pd.DataFrame
+        A shallow copy of the cached DataFrame, as with `read_csv_cached`.
+    """
+    path = os.path.abspath(filepath)
+    stat = os.stat(path)
+    options = tuple(sorted({**kwargs, "columns": None if columns is None else tuple(columns)}.items()))
+    parsed = _parse_csv(path, stat.st_mtime_ns, stat.st_size, options, reader=read_student_csv)
+    return parsed.copy(deep=False)
+
+
+def clear_csv_cache() -> None:
+    """Drop all cached files."""
+    _parse_csv.cache_clear()
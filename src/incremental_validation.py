@@ -0,0 +1,241 @@
+"""
+Incremental validation of an append-only raw data file.
+
+The state of the whole-dataset checks is kept between runs: row hashes for
+duplicate detection, null counts, per-column moments and the co-moments of
+the numeric columns. With it a watermark records how far the file has been
+validated, as a byte offset and the SHA-256 of the bytes before it.
+
+A later run checks that the validated prefix is unchanged, parses only the
+bytes after the watermark and merges their statistics into the state. If the
+prefix changed, the file is validated again from the start.
+"""
+
+import copy
+import hashlib
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.row_hash import hash_keys
+from src.streaming_stats import CoMoments, Moments
+
+STATE_VERSION = 1
+_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+class ValidationState:
+    """
+    Whole-dataset check state of the rows before the watermark.
+
+    Parameters
+    ----------
+    header : list
+        Columns of the file, from its first line.
+    columns : list
+        Validated columns.
+    numeric_columns : list
+        Columns summarized by moments and co-moments.
+
+    Attributes
+    ----------
+    offset : int
+        Byte offset of the watermark, just after the last validated line.
+    prefix_sha256 : str
+        Hex SHA-256 of the bytes before the watermark.
+    rows : int
+        Number of validated rows.
+    null_counts : np.ndarray
+        Missing values per validated column.
+    empty_rows : int
+        Rows whose validated columns are all missing.
+    duplicate_rows : int
+        Rows equal, on the validated columns, to an earlier row.
+    hashes : np.ndarray
+        Sorted unique uint64 hashes of the validated rows.
+    moments : Moments
+        Moments of the numeric columns.
+    comoments : CoMoments
+        Co-moments of the numeric columns.
+    """
+
+    def __init__(self, header: list, columns: list, numeric_columns: list):
+        self.header = list(header)
+        self.columns = list(columns)
+        self.numeric_columns = list(numeric_columns)
+        self.offset = 0
+        self.prefix_sha256 = hashlib.sha256().hexdigest()
+        self.rows = 0
+        self.null_counts = np.zeros(len(columns), dtype=np.int64)
+        self.empty_rows = 0
+        self.duplicate_rows = 0
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.moments = Moments(len(numeric_columns))
+        self.comoments = CoMoments(len(numeric_columns))
+
+    def update(self, data: pd.DataFrame) -> "ValidationState":
+        """
+        Merge the statistics of rows following the ones already counted.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            New rows with the validated columns.
+
+        Returns
+        -------
+        ValidationState
+            self.
+        """
+        data = data[self.columns]
+        nulls = data.isna()
+        self.null_counts += nulls.sum().to_numpy()
+        self.empty_rows += int(nulls.all(axis=1).sum())
+        self.rows += len(data)
+
+        # Numeric columns are hashed as float64 so that rows parsed in chunks with
+        # different integer or float dtypes hash alike
+        normalized = data.astype({column: np.float64 for column in self.numeric_columns})
+        hashes = hash_keys(normalized, self.columns)
+        repeated = pd.Series(hashes).duplicated().to_numpy() | np.isin(hashes, self.hashes)
+        self.duplicate_rows += int(repeated.sum())
+        self.hashes = np.union1d(self.hashes, hashes)
+
+        values = normalized[self.numeric_columns].to_numpy()
+        self.moments.merge(Moments.of(values))
+        self.comoments.merge(CoMoments.of(values))
+        return self
+
+    def save(self, path: str) -> None:
+        """Write the state to `path` (NumPy .npz), replacing it atomically."""
+        meta = {
+            "version": STATE_VERSION, "header": self.header, "columns": self.columns,
+            "numeric_columns": self.numeric_columns, "offset": self.offset,
+            "prefix_sha256": self.prefix_sha256, "rows": self.rows,
+            "null_counts": self.null_counts.tolist(), "empty_rows": self.empty_rows,
+            "duplicate_rows": self.duplicate_rows,
+        }
+        arrays = {f"moments_{name}": value for name, value in self.moments.to_dict().items()}
+        arrays.update({f"comoments_{name}": value for name, value in self.comoments.to_dict().items()})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), hashes=self.hashes, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ValidationState":
+        """
+        Read a state written by `save`.
+
+        Raises
+        ------
+        ValueError
+            If the state was written by an incompatible version.
+        """
+        with np.load(path) as arrays:
+            meta = json.loads(str(arrays["meta"]))
+            if meta.get("version") != STATE_VERSION:
+                raise ValueError(f"Unsupported validation state version: {meta.get('version')}")
+            state = cls(meta["header"], meta["columns"], meta["numeric_columns"])
+            for name in ("offset", "prefix_sha256", "rows", "empty_rows", "duplicate_rows"):
+                setattr(state, name, meta[name])
+            state.null_counts = np.array(meta["null_counts"], dtype=np.int64)
+            state.hashes = arrays["hashes"]
+            state.moments = Moments.from_dict(
+                {name: arrays[f"moments_{name}"] for name in ("count", "mean", "m2", "m3", "m4")}
+            )
+            state.comoments = CoMoments.from_dict(
+                {name: arrays[f"comoments_{name}"] for name in ("count", "mean", "comoment")}
+            )
+        return state
+
+
+def _resume(f, state, columns):
+    """Hash the validated prefix and return its digest if the state still applies, else None."""
+    if state is None or state.columns != list(columns):
+        return None
+    if state.offset > os.fstat(f.fileno()).st_size:
+        return None
+    digest = hashlib.sha256()
+    remaining = state.offset
+    while remaining:
+        block = f.read(min(remaining, _BLOCK_SIZE))
+        if not block:
+            return None
+        digest.update(block)
+        remaining -= len(block)
+    return digest if digest.hexdigest() == state.prefix_sha256 else None
+
+
+def _parse(data, header, columns, delimiter):
+    if not data:
+        return pd.DataFrame({column: pd.Series(dtype=np.float64) for column in columns})
+    return pd.read_csv(io.BytesIO(data), delimiter=delimiter, header=None, names=header, usecols=columns)
+
+
+def update_validation_state(raw_path: str, state_path: str, columns: list, check=None,
+                            delimiter: str = ";") -> tuple:
+    """
+    Validate the rows appended to `raw_path` since the last run and update the stored state.
+
+    Only lines ending with a newline move the watermark. A last line without
+    one is included in the returned state but not stored, so it is read
+    again by the next run.
+
+    Parameters
+    ----------
+    raw_path : str
+        Path to the append-only CSV file.
+    state_path : str
+        Path of the stored state; it is created by the first run.
+    columns : list
+        Columns to validate.
+    check : callable, optional
+        Called with the new rows before they are merged; raising an error
+        leaves the stored state unchanged.
+    delimiter : str, optional
+        Field delimiter (default is ";").
+
+    Returns
+    -------
+    tuple
+        The state of the whole file (ValidationState), the new rows
+        (pd.DataFrame) and whether the file was validated from the start (bool).
+    """
+    state = ValidationState.load(state_path) if os.path.exists(state_path) else None
+    with open(raw_path, "rb") as f:
+        digest = _resume(f, state, columns)
+        full = digest is None
+        if full:
+            f.seek(0)
+            digest = hashlib.sha256()
+            header_line = f.readline()
+            digest.update(header_line)
+            header = pd.read_csv(io.BytesIO(header_line), delimiter=delimiter, nrows=0).columns.tolist()
+        else:
+            header = state.header
+        start = f.tell()
+        tail = f.read()
+
+    complete, partial = tail[:tail.rfind(b"\n") + 1], tail[tail.rfind(b"\n") + 1:]
+    new_rows = _parse(complete, header, columns, delimiter)
+    partial_rows = _parse(partial, header, columns, delimiter)
+    if full:
+        numeric = (new_rows if len(new_rows) else partial_rows).select_dtypes(include="number").columns
+        state = ValidationState(header, columns, [column for column in columns if column in numeric])
+    rows = [frame for frame in (new_rows, partial_rows) if len(frame)]
+    if check is not None and rows:
+        check(pd.concat(rows, ignore_index=True))
+
+    digest.update(complete)
+    state.update(new_rows)
+    state.offset = start + len(complete)
+    state.prefix_sha256 = digest.hexdigest()
+    state.save(state_path)
+
+    if len(partial_rows):
+        state = copy.deepcopy(state).update(partial_rows)
+        new_rows = pd.concat(rows, ignore_index=True)
+    return state, new_rows, full
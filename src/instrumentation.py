@@ -0,0 +1,263 @@
+"""
+Timing and memory instrumentation shared by the pipeline scripts.
+
+Scripts open nested spans around their stages; each finished span records wall
+time, CPU time, the peak resident set size so far and an optional row count.
+Spans can be written as a Chrome trace (viewable in chrome://tracing or
+https://ui.perfetto.dev) and the slowest top-level span can be profiled with
+cProfile.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+import click
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of the current process in megabytes.
+
+    Returns
+    -------
+    float
+        Peak RSS in MB, or NaN where the platform does not report it.
+    """
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+class Span:
+    """A timed stage of a pipeline script."""
+
+    def __init__(self, name: str, depth: int, start: float, rows: int = None, **attrs):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.rows = rows
+        self.attrs = attrs
+        self.wall = None
+        self.cpu = None
+        self.peak_rss_mb = None
+        self.profiler = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "start_s": self.start,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "peak_rss_mb": self.peak_rss_mb,
+            "rows": self.rows,
+            **self.attrs,
+        }
+
+
+class Tracer:
+    """
+    Collects nested spans for one script run.
+
+    Parameters
+    ----------
+    enabled : bool, optional
+        If False, spans are not recorded and add no overhead (default is True).
+    profile : bool, optional
+        If True, every top-level span runs under cProfile (default is False).
+    """
+
+    def __init__(self, enabled: bool = True, profile: bool = False):
+        self.enabled = enabled or profile
+        self.profile = profile
+        self.spans = []
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, rows: int = None, **attrs):
+        """
+        Time the enclosed block as a span nested in the currently open span.
+
+        Parameters
+        ----------
+        name : str
+            Stage name, e.g. "load" or "save".
+        rows : int, optional
+            Number of rows handled by the stage; can also be set on the yielded span.
+        **attrs : dict
+            Extra attributes stored with the span.
+
+        Yields
+        ------
+        Span
+            The open span; when the tracer is disabled it is not recorded.
+        """
+        if not self.enabled:
+            yield Span(name, self._depth, 0.0, rows, **attrs)
+            return
+        record = Span(name, self._depth, time.perf_counter() - self._origin, rows, **attrs)
+        self.spans.append(record)
+        if self.profile and self._depth == 0:
+            record.profiler = cProfile.Profile()
+            record.profiler.enable()
+        self._depth += 1
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - wall0
+            record.cpu = time.process_time() - cpu0
+            record.peak_rss_mb = peak_rss_mb()
+            self._depth -= 1
+            if record.profiler is not None:
+                record.profiler.disable()
+
+    def record(self, name: str, wall: float, rows: int = None, start: float = None, **attrs) -> None:
+        """
+        Add an already measured span one level below the currently open span.
+
+        Useful for stages timed by a library, such as the per-fold `fit_time`
+        returned by `sklearn.model_selection.cross_validate`.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+        wall : float
+            Duration in seconds.
+        rows : int, optional
+            Number of rows handled by the stage.
+        start : float, optional
+            Start time in seconds since the tracer was created; defaults to `wall` before now.
+        **attrs : dict
+            Extra attributes stored with the span.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter() - self._origin
+        record = Span(name, self._depth, now - wall if start is None else start, rows, **attrs)
+        record.wall = wall
+        record.peak_rss_mb = peak_rss_mb()
+        self.spans.append(record)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Convert the recorded spans to the Chrome trace event format.
+
+        Returns
+        -------
+        dict
+            JSON-serializable trace with one complete ("X") event per span.
+        """
+        pid = os.getpid()
+        events = [{
+            "name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+            "args": {"name": os.path.basename(sys.argv[0]) or "python"},
+        }]
+        for span in self.spans:
+            args = {key: value for key, value in span.to_dict().items()
+                    if key not in ("name", "start_s", "wall_s") and value is not None}
+            events.append({
+                "name": span.name,
+                "cat": "pipeline",
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": (span.wall or 0.0) * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> str:
+        """
+        Format the recorded spans as an indented text table.
+
+        Returns
+        -------
+        str
+            One line per span with wall time, CPU time, peak RSS and rows.
+        """
+        lines = [f"{'span':<40}{'wall (s)':>10}{'cpu (s)':>10}{'peak MB':>10}{'rows':>12}"]
+        for span in self.spans:
+            name = ("  " * span.depth + span.name)[:40]
+            cpu = "" if span.cpu is None else f"{span.cpu:.3f}"
+            rows = "" if span.rows is None else str(span.rows)
+            lines.append(
+                f"{name:<40}{span.wall:>10.3f}{cpu:>10}{span.peak_rss_mb:>10.1f}{rows:>12}"
+            )
+        return "\n".join(lines)
+
+    def slowest_profiled_span(self):
+        """Return the slowest top-level span that ran under cProfile, or None."""
+        profiled = [span for span in self.spans if span.profiler is not None]
+        return max(profiled, key=lambda span: span.wall, default=None)
+
+    def report(self, metrics_out: str = None) -> None:
+        """
+        Print and save the collected instrumentation.
+
+        Prints a summary table when profiling. Writes the Chrome trace to
+        `metrics_out` and, when profiling, the cProfile stats of the slowest
+        top-level span next to it with a `.prof` suffix (printed if
+        `metrics_out` is None).
+
+        Parameters
+        ----------
+        metrics_out : str, optional
+            Path of the JSON trace file.
+        """
+        if not self.enabled:
+            return
+        if self.profile:
+            print(self.summary())
+        if metrics_out:
+            directory = os.path.dirname(metrics_out)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(metrics_out, "w") as f:
+                json.dump(self.to_chrome_trace(), f, indent=1)
+            print(f"Metrics trace saved to {metrics_out}")
+
+        slowest = self.slowest_profiled_span()
+        if slowest is None:
+            return
+        if metrics_out:
+            prof_path = os.path.splitext(metrics_out)[0] + ".prof"
+            slowest.profiler.dump_stats(prof_path)
+            print(f"cProfile stats for slowest span '{slowest.name}' saved to {prof_path}")
+        else:
+            stream = io.StringIO()
+            pstats.Stats(slowest.profiler, stream=stream).sort_stats("cumulative").print_stats(15)
+            print(f"cProfile stats for slowest span '{slowest.name}':")
+            print(stream.getvalue())
+
+
+def instrumentation_options(command):
+    """
+    Add the `--profile` and `--metrics-out` options to a click command.
+
+    The decorated function receives `profile` and `metrics_out` keyword arguments.
+    """
+    command = click.option(
+        "--metrics-out", type=str, default=None,
+        help="Path of a JSON file for per-stage timings (Chrome trace format)",
+    )(command)
+    command = click.option(
+        "--profile", is_flag=True,
+        help="Print per-stage timings and cProfile the slowest stage",
+    )(command)
+    return command
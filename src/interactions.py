@@ -0,0 +1,158 @@
+"""
+Pairwise interactions of one-hot encoded columns.
+
+`PolynomialFeatures(interaction_only=True)` over a one-hot block multiplies
+every pair of its columns, including pairs of values of the same source
+column, which are never both set and give all-zero columns. `OneHotCrosses`
+encodes each column on its own and builds only the products of values of two
+different columns. Every row has at most one value per column, so the product
+of two columns is the one-hot encoding of their pair of codes and is built
+directly in CSR form.
+"""
+
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.utils.validation import check_is_fitted
+
+
+class OneHotCrosses(TransformerMixin, BaseEstimator):
+    """
+    One-hot encoded columns followed by the products of values of every pair of columns.
+
+    The output columns are those of `OneHotEncoder` followed by
+    `PolynomialFeatures(degree=2, interaction_only=True, include_bias=False)`,
+    in the same order and with the same names, without the products of two
+    values of the same column.
+
+    Parameters
+    ----------
+    min_frequency : int, optional
+        Values seen fewer times are grouped into one infrequent category
+        (default is None, no grouping).
+    handle_unknown : str, optional
+        `handle_unknown` of the `OneHotEncoder` of each column (default is
+        "infrequent_if_exist").
+    dtype : numpy dtype, optional
+        Dtype of the output (default is np.float64).
+
+    Attributes
+    ----------
+    encoders_ : list of OneHotEncoder
+        Fitted encoder of each column.
+    feature_names_in_ : np.ndarray
+        Names of the input columns.
+
+    Examples
+    --------
+    >>> crosses = OneHotCrosses().fit(pd.DataFrame({"sex": ["F", "M"], "Mjob": ["health", "other"]}))
+    >>> list(crosses.get_feature_names_out())[4:]
+    ['sex_F Mjob_health', 'sex_F Mjob_other', 'sex_M Mjob_health', 'sex_M Mjob_other']
+    """
+
+    def __init__(self, min_frequency=None, handle_unknown="infrequent_if_exist", dtype=np.float64):
+        self.min_frequency = min_frequency
+        self.handle_unknown = handle_unknown
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        """
+        Fit the one-hot encoder of each column.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Columns to encode and cross.
+        y : None
+            Ignored.
+
+        Returns
+        -------
+        OneHotCrosses
+            self.
+        """
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = X.shape[1]
+        self.encoders_ = [
+            OneHotEncoder(handle_unknown=self.handle_unknown, min_frequency=self.min_frequency,
+                          sparse_output=True, dtype=self.dtype).fit(X.iloc[:, [j]])
+            for j in range(X.shape[1])
+        ]
+        return self
+
+    def transform(self, X):
+        """
+        Encode the columns and cross them pairwise.
+
+        Parameters
+        ----------
+        X : pd.DataFrame
+            Columns, as in fit.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            The one-hot columns, then the crosses of each pair of columns.
+        """
+        check_is_fitted(self, "encoders_")
+        X = pd.DataFrame(X)
+        n_rows, n_inputs = X.shape
+        # Code of the value of each row in each column; rows of unknown values
+        # without an infrequent category have none (-1)
+        codes = np.full((n_rows, n_inputs), -1, dtype=np.int64)
+        for j, encoder in enumerate(self.encoders_):
+            block = encoder.transform(X.iloc[:, [j]]).tocsr()
+            codes[np.diff(block.indptr) > 0, j] = block.indices
+        widths = np.array([len(encoder.get_feature_names_out()) for encoder in self.encoders_], dtype=np.int64)
+        first, second = np.array(list(combinations(range(n_inputs), 2)), dtype=np.intp).reshape(-1, 2).T
+        # Start of each one-hot block, then of each block of crosses, then the width of the output
+        offsets = np.cumsum(np.concatenate([[0], widths, widths[first] * widths[second]]))
+        n_outputs = n_inputs + len(first)
+        largest = max(int(offsets[-1]), n_rows * n_outputs)
+        index_dtype = np.int32 if largest < np.iinfo(np.int32).max else np.int64
+
+        # Output column of every one-hot value and cross of each row, in CSR order
+        columns = np.empty((n_rows, n_outputs), dtype=index_dtype)
+        valid = np.empty(columns.shape, dtype=bool)
+        columns[:, :n_inputs] = codes + offsets[:n_inputs]
+        valid[:, :n_inputs] = codes >= 0
+        start = n_inputs
+        for i in range(n_inputs - 1):
+            # Crosses of column i with every later column, one slice of the output at a time
+            later = slice(i + 1, n_inputs)
+            stop = start + n_inputs - i - 1
+            columns[:, start:stop] = (codes[:, [i]] * widths[later] + codes[:, later]
+                                      + offsets[start:stop])
+            valid[:, start:stop] = valid[:, [i]] & valid[:, later]
+            start = stop
+        indices = columns[valid]
+        indptr = np.concatenate([[0], np.cumsum(valid.sum(axis=1))]).astype(index_dtype)
+        data = np.ones(len(indices), dtype=self.dtype)
+        return sp.csr_matrix((data, indices, indptr), shape=(n_rows, int(offsets[-1])))
+
+    def get_feature_names_out(self, input_features=None) -> np.ndarray:
+        """
+        Output feature names: "<column>_<category>", then "<name> <name>" for each cross.
+
+        Parameters
+        ----------
+        input_features : array-like, optional
+            Input column names (default is the names seen in fit).
+
+        Returns
+        -------
+        np.ndarray
+            Output feature names.
+        """
+        check_is_fitted(self, "encoders_")
+        input_features = self.feature_names_in_ if input_features is None else input_features
+        encoded = [encoder.get_feature_names_out([feature])
+                   for encoder, feature in zip(self.encoders_, input_features)]
+        names = [name for block in encoded for name in block]
+        for first, second in combinations(encoded, 2):
+            names.extend(f"{a} {b}" for a in first for b in second)
+        return np.asarray(names, dtype=object)
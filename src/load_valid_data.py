@@ -1,7 +1,9 @@
 import os
 import pandas as pd
+from src.feature_config import load_feature_set
+from src.student_csv import read_student_csv
 
-def load_valid_data(filepath: str) -> pd.DataFrame:
+def load_valid_data(filepath: str, subject: str = None, feature_set: str = "default") -> pd.DataFrame:
     """
     Check filepath and load the correct file.
 
@@ -9,11 +11,17 @@ def load_valid_data(filepath: str) -> pd.DataFrame:
     ----------
     filepath : str
         Path to the file to load.
+    subject : str, optional
+        Subject suffix, "mat" or "por", to load from a merged dataset written by
+        `scripts/merge_subjects.py`; the suffix is stripped from the column names.
+    feature_set : str, optional
+        Feature set of `config/features.json` whose features and target are
+        loaded (default is "default").
 
     Returns
     -------
     pd.DataFrame
-        Loaded DataFrame.
+        Loaded DataFrame, with `int64[pyarrow]` and categorical columns (see `src.student_csv.read_student_csv`).
 
     Raises
     ------
@@ -28,6 +36,6 @@ def load_valid_data(filepath: str) -> pd.DataFrame:
     if not filepath.endswith(".csv"):
         raise ValueError(f"The file '{filepath}' is not a CSV file.")
 
-    student_performance = pd.read_csv(filepath, delimiter=";")
-    columns = ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc", "G3"]
-    return student_performance[columns]
\ No newline at end of file
+    suffix = None if subject is None else f"_{subject}"
+    return read_student_csv(filepath, columns=load_feature_set(feature_set)["columns"], delimiter=";",
+                            suffix=suffix)
\ No newline at end of file
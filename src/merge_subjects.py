@@ -0,0 +1,156 @@
+"""
+Merge of the math and Portuguese student datasets.
+
+Students taking both courses are identified by 13 attributes, as in the R
+script `data/zip/student-merge.R` that ships with the UCI bundle. The key
+columns are hashed once into 64-bit keys and joined through a hash table of
+the second dataset; candidate pairs are then checked on the original key
+values so that hash collisions never produce a false match.
+"""
+
+import numpy as np
+import pandas as pd
+from src.row_hash import hash_keys
+
+# Attributes identifying a student in both datasets (see student-merge.R)
+MERGE_KEYS = [
+    "school", "sex", "age", "address", "famsize", "Pstatus",
+    "Medu", "Fedu", "Mjob", "Fjob", "reason", "nursery", "internet",
+]
+SUBJECT_SUFFIXES = ("_mat", "_por")
+
+
+class _HashTable:
+    """Rows of the right dataset grouped by key hash, built once per join."""
+
+    def __init__(self, right_hash):
+        codes, uniques = pd.factorize(right_hash)
+        self.index = pd.Index(uniques)
+        self.order = np.argsort(codes, kind="stable")
+        self.counts = np.bincount(codes, minlength=len(uniques))
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def match(self, left_hash):
+        """Positions of all left/right row pairs with equal hashes, in left order."""
+        group = self.index.get_indexer(left_hash)
+        found = group >= 0
+        counts = np.where(found, self.counts[group], 0)
+        left_pos = np.repeat(np.arange(len(left_hash)), counts)
+        # Offset of each pair within the right rows of its group
+        run_start = np.repeat(np.cumsum(counts) - counts, counts)
+        offsets = np.arange(len(left_pos)) - run_start
+        right_pos = self.order[np.repeat(self.starts[group[found]], counts[found]) + offsets]
+        return left_pos, right_pos
+
+
+def _join(left, right, table, keys, suffixes):
+    left_pos, right_pos = table.match(hash_keys(left, keys))
+
+    # Gather every output column once; the gathered left keys double as the
+    # check that drops pairs whose hashes collide but whose key values differ
+    key_columns = {key: left[key].to_numpy()[left_pos] for key in keys}
+    matches = np.ones(len(left_pos), dtype=bool)
+    for key in keys:
+        matches &= key_columns[key] == right[key].to_numpy()[right_pos]
+    if not matches.all():
+        left_pos, right_pos = left_pos[matches], right_pos[matches]
+        key_columns = {key: values[matches] for key, values in key_columns.items()}
+
+    columns = dict(key_columns)
+    for frame, positions, suffix in [(left, left_pos, suffixes[0]), (right, right_pos, suffixes[1])]:
+        for column in frame.columns.drop(keys):
+            columns[f"{column}{suffix}"] = frame[column].to_numpy()[positions]
+    return pd.DataFrame(columns, copy=False)
+
+
+def merge_subjects(left: pd.DataFrame, right: pd.DataFrame, keys: list = MERGE_KEYS,
+                   suffixes: tuple = SUBJECT_SUFFIXES) -> pd.DataFrame:
+    """
+    Inner join two subject datasets on their key columns.
+
+    Equivalent to R's `merge(left, right, by=keys)`: every pair of rows with
+    equal keys is returned, with the key columns first followed by the other
+    columns of `left` and of `right` with the subject suffixes. Rows are in
+    the order of `left` and columns have NumPy dtypes.
+
+    Parameters
+    ----------
+    left : pd.DataFrame
+        First dataset, e.g. student-mat.csv.
+    right : pd.DataFrame
+        Second dataset, e.g. student-por.csv.
+    keys : list, optional
+        Columns identifying a student (default is MERGE_KEYS).
+    suffixes : tuple, optional
+        Suffixes of the non-key columns of `left` and `right` (default is ("_mat", "_por")).
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged dataset with a fresh RangeIndex.
+
+    Raises
+    ------
+    ValueError
+        If a key column doesn't exist in either dataset.
+    """
+    return _join(left, right, _HashTable(hash_keys(right, keys)), keys, suffixes)
+
+
+def merge_subject_chunks(left_chunks, right: pd.DataFrame, keys: list = MERGE_KEYS,
+                         suffixes: tuple = SUBJECT_SUFFIXES):
+    """
+    Join chunks of the first dataset against the second dataset.
+
+    `right` is hashed once and kept in memory while `left` is streamed, so
+    the memory use is bounded by `right` and one chunk of `left`.
+
+    Parameters
+    ----------
+    left_chunks : iterable of pd.DataFrame
+        Chunks of the first dataset, e.g. from `pd.read_csv(..., chunksize=...)`.
+    right : pd.DataFrame
+        Second dataset.
+    keys : list, optional
+        Columns identifying a student (default is MERGE_KEYS).
+    suffixes : tuple, optional
+        Suffixes of the non-key columns (default is ("_mat", "_por")).
+
+    Yields
+    ------
+    pd.DataFrame
+        The merged rows of each chunk.
+    """
+    table = _HashTable(hash_keys(right, keys))
+    for chunk in left_chunks:
+        yield _join(chunk, right, table, keys, suffixes)
+
+
+def merge_subject_files(left_path: str, right_path: str, chunksize: int = None,
+                        keys: list = MERGE_KEYS, suffixes: tuple = SUBJECT_SUFFIXES) -> pd.DataFrame:
+    """
+    Merge two semicolon-delimited subject files.
+
+    Parameters
+    ----------
+    left_path : str
+        Path of the first dataset, e.g. data/zip/student-mat.csv.
+    right_path : str
+        Path of the second dataset, e.g. data/zip/student-por.csv.
+    chunksize : int, optional
+        If given, the first file is read and joined in chunks of this many rows.
+    keys : list, optional
+        Columns identifying a student (default is MERGE_KEYS).
+    suffixes : tuple, optional
+        Suffixes of the non-key columns (default is ("_mat", "_por")).
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged dataset.
+    """
+    right = pd.read_csv(right_path, delimiter=";")
+    if chunksize is None:
+        return merge_subjects(pd.read_csv(left_path, delimiter=";"), right, keys=keys, suffixes=suffixes)
+    chunks = pd.read_csv(left_path, delimiter=";", chunksize=chunksize)
+    return pd.concat(list(merge_subject_chunks(chunks, right, keys=keys, suffixes=suffixes)), ignore_index=True)
@@ -0,0 +1,368 @@
+"""
+Search across model families with successive halving and a time budget.
+
+Every candidate, a model family with one combination of its parameters, is
+cross-validated on a small random subset of the training rows. Only the best
+`1 / factor` of the candidates go on to the next round, which uses `factor`
+times more rows, until the last round uses all of them. Fits run in a process
+pool that receives the training data once per worker.
+
+With a time budget, no fit starts after the deadline: the running fits are
+finished, and candidates are ranked on the last round they completed.
+"""
+
+import math
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.linear_model import ElasticNet, Lasso, Ridge
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import ParameterGrid
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import make_pipeline
+
+# Model families: display name, estimator class and parameter grid. The keys
+# are the step names `make_pipeline` gives the estimators.
+MODEL_FAMILIES = {
+    "ridge": ("Ridge Regression", Ridge, {"alpha": [0.1, 1, 10, 100]}),
+    "lasso": ("Lasso", Lasso, {"alpha": [0.01, 0.1, 1]}),
+    "elasticnet": ("Elastic Net", ElasticNet, {"alpha": [0.01, 0.1, 1], "l1_ratio": [0.2, 0.5, 0.8]}),
+    "histgradientboostingregressor": ("Gradient Boosting", HistGradientBoostingRegressor,
+                                      {"learning_rate": [0.05, 0.1], "max_leaf_nodes": [15, 31]}),
+    "kneighborsregressor": ("k-Nearest Neighbors", KNeighborsRegressor, {"n_neighbors": [5, 15, 45]}),
+}
+
+# Training data and candidates of the current process, set by _attach
+_search = {}
+
+
+def make_candidates(preprocessor, families=None, random_state=None, estimator_params: dict = None) -> list:
+    """
+    Pipelines and parameters of every candidate of the given model families.
+
+    Parameters
+    ----------
+    preprocessor : sklearn.compose.ColumnTransformer
+        Unfitted preprocessor shared by all candidates.
+    families : list, optional
+        Keys of `MODEL_FAMILIES` (default is all of them).
+    random_state : int, optional
+        Seed of the estimators that take one.
+    estimator_params : dict, optional
+        Fixed estimator parameters per family, e.g. {"ridge": {"solver": "lsqr"}}.
+
+    Returns
+    -------
+    list
+        (family, pipeline, params) tuples, where params are set on the
+        pipeline, e.g. {"ridge__alpha": 10}.
+
+    Raises
+    ------
+    ValueError
+        If a family is unknown.
+    """
+    families = list(MODEL_FAMILIES) if families is None else list(families)
+    unknown = [family for family in families if family not in MODEL_FAMILIES]
+    if unknown:
+        raise ValueError(f"Unknown model families: {unknown}; expected some of {list(MODEL_FAMILIES)}")
+    candidates = []
+    for family in families:
+        _, estimator_class, grid = MODEL_FAMILIES[family]
+        estimator = estimator_class(**(estimator_params or {}).get(family, {}))
+        if "random_state" in estimator.get_params():
+            estimator.set_params(random_state=random_state)
+        pipeline = make_pipeline(clone(preprocessor), estimator)
+        for params in ParameterGrid(grid):
+            candidates.append((family, pipeline, {f"{family}__{name}": value for name, value in params.items()}))
+    return candidates
+
+
+def _attach(X, y, order, candidates, cv, scoring):
+    _search.update(X=X, y=y, order=order, candidates=candidates, cv=cv, scoring=scoring)
+
+
+def _split(order, n_rows, cv, fold):
+    """Train and test row positions of a fold over the first `n_rows` rows of `order`."""
+    folds = np.array_split(order[:n_rows], cv)
+    return np.concatenate(folds[:fold] + folds[fold + 1:]), folds[fold]
+
+
+def _fit_and_score(candidate, n_rows, fold):
+    train, test = _split(_search["order"], n_rows, _search["cv"], fold)
+    X, y = _search["X"], _search["y"]
+    _, pipeline, params = _search["candidates"][candidate]
+    estimator = clone(pipeline).set_params(**params)
+    fit_time = score_time = 0.0
+    start = time.perf_counter()
+    try:
+        estimator.fit(X.iloc[train], y.iloc[train])
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        score = check_scoring(estimator, _search["scoring"])(estimator, X.iloc[test], y.iloc[test])
+        score_time = time.perf_counter() - start
+    except Exception as e:
+        # Scored as NaN, like `error_score=np.nan` in scikit-learn searches
+        return fit_time or time.perf_counter() - start, score_time, np.nan, f"{type(e).__name__}: {e}"
+    return fit_time, score_time, score, None
+
+
+def _schedule(n_samples, n_candidates, cv, factor, min_resources):
+    """Number of rows of each round; the last round uses all of them."""
+    if min_resources is None:
+        min_resources = 10 * cv
+    min_resources = max(min(min_resources, n_samples), cv)
+    n_required = 1 + math.floor(math.log(n_candidates, factor)) if n_candidates > 1 else 1
+    n_possible = 1 + math.floor(math.log(n_samples / min_resources, factor))
+    n_rounds = min(n_required, n_possible)
+    return [n_samples // factor ** (n_rounds - 1 - i) for i in range(n_rounds)]
+
+
+class SuccessiveHalvingResult:
+    """
+    Outcome of `successive_halving_search`.
+
+    Attributes
+    ----------
+    cv_results_ : dict
+        One entry per evaluation of a candidate on a round, with the keys of
+        `HalvingGridSearchCV.cv_results_`: "iter", "n_resources", "params",
+        "param_<name>", "split<k>_test_score", "mean_test_score",
+        "std_test_score", "mean_fit_time", "mean_score_time" and
+        "rank_test_score", plus the "model" family. Evaluations on later
+        rounds rank first.
+    best_index_, best_params_, best_score_, n_splits_
+        As in `GridSearchCV`; the best candidate is the best of the last round.
+    best_model_ : str
+        Family of the best candidate, a key of `MODEL_FAMILIES`.
+    best_estimator_ : sklearn.pipeline.Pipeline
+        The best candidate refitted on all the training rows.
+    folds_ : list
+        (train, test) row positions of each fold over all the training rows,
+        the folds of a round that uses every row. Pass as `cv` to score or
+        calibrate the best candidate on the folds of the search.
+    n_resources_ : list
+        Number of rows of each round that was started.
+    n_candidates_ : list
+        Number of candidates of each round that was started.
+    timed_out_ : bool
+        Whether the search was cut short by the time budget.
+    """
+
+    def __init__(self, cv_results, n_splits, n_resources, n_candidates, timed_out):
+        self.cv_results_ = cv_results
+        self.n_splits_ = n_splits
+        self.n_resources_ = n_resources
+        self.n_candidates_ = n_candidates
+        self.timed_out_ = timed_out
+        self.best_index_ = int(np.argmin(cv_results["rank_test_score"]))
+        self.best_params_ = cv_results["params"][self.best_index_]
+        self.best_score_ = cv_results["mean_test_score"][self.best_index_]
+        self.best_model_ = cv_results["model"][self.best_index_]
+        self.best_estimator_ = None
+        self.folds_ = None
+
+    def leaderboard(self) -> pd.DataFrame:
+        """
+        Last evaluation of every candidate, best first.
+
+        Returns
+        -------
+        pd.DataFrame
+            Indexed by "rank_test_score", with the "mean_test_score", the
+            "param_<name>" columns, "mean_fit_time", "model" and "n_resources",
+            like the grid search results table.
+        """
+        results = pd.DataFrame({key: value.filled(np.nan) if np.ma.isMaskedArray(value) else value
+                                for key, value in self.cv_results_.items()
+                                if key != "params" and "split" not in key})
+        results["candidate"] = [repr(sorted(params.items())) for params in self.cv_results_["params"]]
+        last = results.sort_values("iter").groupby("candidate").tail(1).copy()
+        last["rank_test_score"] = _rank(last["iter"].to_numpy(), last["mean_test_score"].to_numpy())
+        columns = (["mean_test_score"] + sorted(key for key in results if key.startswith("param_"))
+                   + ["mean_fit_time", "model", "n_resources"])
+        return last.set_index("rank_test_score")[columns].sort_index()
+
+
+def best_candidate(results: pd.DataFrame) -> tuple:
+    """
+    Family, parameters and score of the best row of a saved search results table.
+
+    Columns are read by name, so this works on both layouts of
+    `grid_search_results.csv`: the Ridge grid search results, which have no
+    "model" column, and the leaderboard of a successive halving search.
+
+    Parameters
+    ----------
+    results : pd.DataFrame
+        The table as read back with `pd.read_csv`.
+
+    Returns
+    -------
+    tuple
+        The family, a key of `MODEL_FAMILIES`; its parameters without the
+        family prefix, e.g. {"alpha": 10.0}; and the mean test score.
+    """
+    best = results.sort_values("rank_test_score", kind="stable").iloc[0]
+    family = best["model"] if "model" in results.columns else "ridge"
+    prefix = f"param_{family}__"
+    params = {column[len(prefix):]: best[column] for column in results.columns
+              if column.startswith(prefix) and pd.notna(best[column])}
+    return family, params, best["mean_test_score"]
+
+
+def _rank(rounds, scores):
+    """Ranks with later rounds first and higher scores first within a round; ties share the lowest rank."""
+    keys = np.column_stack([-rounds, -np.nan_to_num(scores, nan=-np.inf)])
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    counts = np.bincount(inverse.ravel())
+    first = np.concatenate([[0], np.cumsum(counts)[:-1]]) + 1
+    return first[inverse.ravel()].astype(np.int32)
+
+
+def _run_round(executor, survivors, n_rows, cv, deadline):
+    """Fold results of each candidate that finished every fold, and whether the deadline cut the round."""
+    tasks = [(candidate, n_rows, fold) for candidate in survivors for fold in range(cv)]
+    outcomes = {}
+    timed_out = False
+    if executor is None:
+        for task in tasks:
+            if deadline is not None and time.perf_counter() >= deadline:
+                timed_out = True
+                break
+            outcomes[task] = _fit_and_score(*task)
+    else:
+        futures = {executor.submit(_fit_and_score, *task): task for task in tasks}
+        remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+        _, pending = wait(futures, timeout=remaining)
+        if pending:
+            timed_out = True
+            # Running fits cannot be interrupted; they are finished and kept
+            for future in pending:
+                future.cancel()
+            wait(pending)
+        outcomes = {task: future.result() for future, task in futures.items() if not future.cancelled()}
+    results = {}
+    for candidate in survivors:
+        folds = [outcomes.get((candidate, n_rows, fold)) for fold in range(cv)]
+        if all(fold is not None for fold in folds):
+            results[candidate] = folds
+    return results, timed_out
+
+
+def successive_halving_search(candidates, X, y, cv: int = 5, factor: int = 3, min_resources: int = None,
+                              time_budget: float = None, scoring: str = "neg_mean_squared_error",
+                              random_state=None, n_jobs: int = 1) -> SuccessiveHalvingResult:
+    """
+    Search the candidates with successive halving over the number of training rows.
+
+    Parameters
+    ----------
+    candidates : list
+        (family, pipeline, params) tuples, as from `make_candidates`.
+    X : pd.DataFrame
+        Training features.
+    y : pd.Series
+        Training target.
+    cv : int, optional
+        Number of folds of each round (default is 5).
+    factor : int, optional
+        Rows grow and candidates shrink by this factor at each round (default is 3).
+    min_resources : int, optional
+        Rows of the first round; the number of rounds is chosen so that the
+        last round uses all rows (default is 10 * cv).
+    time_budget : float, optional
+        Seconds after which no fit is started (default is None, no limit).
+    scoring : str, optional
+        Scorer, higher is better (default is "neg_mean_squared_error").
+    random_state : int, optional
+        Seed of the row subsets; the rows of a round include those of the
+        previous rounds.
+    n_jobs : int, optional
+        Number of worker processes (default is 1, in this process).
+
+    Returns
+    -------
+    SuccessiveHalvingResult
+        The search results, with the best candidate refitted on all rows.
+
+    Raises
+    ------
+    TimeoutError
+        If no candidate finished its first round within the time budget.
+    """
+    start = time.perf_counter()
+    deadline = None if time_budget is None else start + time_budget
+    order = np.random.default_rng(random_state).permutation(len(X))
+    n_resources = _schedule(len(X), len(candidates), cv, factor, min_resources)
+
+    evaluations = []
+    survivors = list(range(len(candidates)))
+    started_resources, started_candidates = [], []
+    timed_out = False
+    executor = None
+    if n_jobs == 1:
+        _attach(X, y, order, candidates, cv, scoring)
+    else:
+        executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                       initargs=(X, y, order, candidates, cv, scoring))
+    try:
+        for round_, n_rows in enumerate(n_resources):
+            if round_ and deadline is not None and time.perf_counter() >= deadline:
+                timed_out = True
+                break
+            started_resources.append(n_rows)
+            started_candidates.append(len(survivors))
+            results, timed_out = _run_round(executor, survivors, n_rows, cv, deadline)
+            scores = {}
+            for candidate, folds in results.items():
+                folds = np.array([fold[:3] for fold in folds], dtype=float)
+                scores[candidate] = folds[:, 2].mean()
+                evaluations.append((round_, n_rows, candidate, folds))
+                errors = [fold[3] for fold in results[candidate] if fold[3] is not None]
+                if errors:
+                    warnings.warn(f"{len(errors)} of {cv} fits of {candidates[candidate][2]} on {n_rows} rows "
+                                  f"failed and were scored as NaN: {errors[0]}")
+            if timed_out:
+                break
+            # Keep the best 1 / factor, NaN scores last
+            n_keep = math.ceil(len(survivors) / factor)
+            survivors = sorted(survivors, key=lambda c: -np.nan_to_num(scores[c], nan=-np.inf))[:n_keep]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+            _search.clear()
+    if not evaluations:
+        raise TimeoutError(f"No candidate finished its first round within {time_budget} seconds.")
+
+    cv_results = {"iter": np.array([e[0] for e in evaluations]),
+                  "n_resources": np.array([e[1] for e in evaluations]),
+                  "model": [candidates[e[2]][0] for e in evaluations]}
+    params = [candidates[e[2]][2] for e in evaluations]
+    folds = np.stack([e[3] for e in evaluations])
+    cv_results["mean_fit_time"] = folds[:, :, 0].mean(axis=1)
+    cv_results["std_fit_time"] = folds[:, :, 0].std(axis=1)
+    cv_results["mean_score_time"] = folds[:, :, 1].mean(axis=1)
+    cv_results["std_score_time"] = folds[:, :, 1].std(axis=1)
+    for name in sorted({name for candidate in params for name in candidate}):
+        values = np.ma.MaskedArray(np.empty(len(params), dtype=object), mask=True)
+        for i, candidate in enumerate(params):
+            if name in candidate:
+                values[i] = candidate[name]
+        cv_results[f"param_{name}"] = values
+    cv_results["params"] = params
+    for fold in range(cv):
+        cv_results[f"split{fold}_test_score"] = folds[:, fold, 2]
+    cv_results["mean_test_score"] = folds[:, :, 2].mean(axis=1)
+    cv_results["std_test_score"] = folds[:, :, 2].std(axis=1)
+    cv_results["rank_test_score"] = _rank(cv_results["iter"], cv_results["mean_test_score"])
+
+    result = SuccessiveHalvingResult(cv_results, cv, started_resources, started_candidates, timed_out)
+    _, pipeline, best_params = candidates[evaluations[result.best_index_][2]]
+    result.best_estimator_ = clone(pipeline).set_params(**best_params).fit(X, y)
+    result.folds_ = [_split(order, len(X), cv, fold) for fold in range(cv)]
+    return result
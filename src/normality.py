@@ -0,0 +1,209 @@
+"""
+Normality tests that scale to large samples.
+
+Shapiro-Wilk is exact for small samples but its p-value is not reliable
+beyond 5000 observations. For larger data, D'Agostino's K² test is computed
+from the count, skewness and kurtosis alone, so it works on streaming
+moments, and the Anderson-Darling test is run on a fixed-size stratified
+sample taken from the histogram of the data.
+"""
+
+import numpy as np
+from scipy.special import log_ndtr
+from scipy.stats import chi2, shapiro
+from src.streaming_stats import Moments
+
+SHAPIRO_MAX_SAMPLES = 5000
+ANDERSON_SAMPLE_SIZE = 5000
+
+
+def dagostino_k2(count: float, skewness: float, kurtosis: float) -> tuple:
+    """
+    D'Agostino-Pearson K² test of normality from sample moments.
+
+    Gives the same result as `scipy.stats.normaltest` on the data the moments
+    were computed from.
+
+    Parameters
+    ----------
+    count : float
+        Number of observations; at least 8.
+    skewness : float
+        Biased sample skewness, as `Moments.skewness`.
+    kurtosis : float
+        Biased excess kurtosis, as `Moments.kurtosis`.
+
+    Returns
+    -------
+    tuple
+        The K² statistic and its p-value.
+
+    Raises
+    ------
+    ValueError
+        If there are fewer than 8 observations.
+    """
+    n = float(count)
+    if n < 8:
+        raise ValueError(f"The K² test needs at least 8 observations, got {int(n)}.")
+
+    # Skewness test
+    y = skewness * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = 3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2) * (n + 5) * (n + 7) * (n + 9))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = 1.0 if y == 0 else y
+    z_skew = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+    # Kurtosis test
+    b2 = kurtosis + 3
+    expected = 3.0 * (n - 1) / (n + 1)
+    variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1) * (n + 3) * (n + 5))
+    x = (b2 - expected) / np.sqrt(variance)
+    sqrt_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                  * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3))))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / sqrt_beta1 ** 2))
+    denominator = 1 + x * np.sqrt(2 / (a - 4.0))
+    term = np.sign(denominator) * np.cbrt((1 - 2.0 / a) / abs(denominator)) if denominator else np.nan
+    z_kurt = (1 - 2 / (9.0 * a) - term) / np.sqrt(2 / (9.0 * a))
+
+    statistic = z_skew ** 2 + z_kurt ** 2
+    return float(statistic), float(chi2.sf(statistic, 2))
+
+
+def anderson_darling(sample) -> tuple:
+    """
+    Anderson-Darling test of normality with estimated mean and variance.
+
+    Parameters
+    ----------
+    sample : array-like
+        Observations.
+
+    Returns
+    -------
+    tuple
+        The A² statistic, as `scipy.stats.anderson`, and its approximate
+        p-value from D'Agostino and Stephens (1986).
+    """
+    sample = np.sort(np.asarray(sample, dtype=np.float64))
+    n = len(sample)
+    z = (sample - sample.mean()) / sample.std(ddof=1)
+    i = np.arange(1, n + 1)
+    statistic = -n - np.mean((2 * i - 1) * (log_ndtr(z) + log_ndtr(-z[::-1])))
+
+    adjusted = statistic * (1 + 0.75 / n + 2.25 / n ** 2)
+    if adjusted >= 153.467:
+        # Past the minimum of the fitted curve, which would rise again
+        p = 0.0
+    elif adjusted >= 0.6:
+        p = np.exp(1.2937 - 5.709 * adjusted + 0.0186 * adjusted ** 2)
+    elif adjusted >= 0.34:
+        p = np.exp(0.9177 - 4.279 * adjusted - 1.38 * adjusted ** 2)
+    elif adjusted >= 0.2:
+        p = 1 - np.exp(-8.318 + 42.796 * adjusted - 59.938 * adjusted ** 2)
+    else:
+        p = 1 - np.exp(-13.436 + 101.14 * adjusted - 223.73 * adjusted ** 2)
+    return float(statistic), float(np.clip(p, 0, 1))
+
+
+def integer_histogram(values, domain: tuple) -> np.ndarray:
+    """
+    Counts of each integer of `domain` in `values`, in one `np.bincount`.
+
+    Parameters
+    ----------
+    values : array-like
+        Integer observations within the domain.
+    domain : tuple
+        Smallest and largest possible value, e.g. (0, 20) for grades.
+
+    Returns
+    -------
+    np.ndarray
+        Count of each value from domain[0] to domain[1].
+    """
+    low, high = domain
+    return np.bincount(np.asarray(values, dtype=np.int64) - low, minlength=high - low + 1)
+
+
+def stratified_sample(counts, values, size: int = ANDERSON_SAMPLE_SIZE) -> np.ndarray:
+    """
+    Sample of `size` observations with each value in proportion to its count.
+
+    Allocations are rounded with the largest remainder method, so the sample
+    reproduces the histogram as closely as its size allows.
+
+    Parameters
+    ----------
+    counts : array-like
+        Count of each value.
+    values : array-like
+        The values counted.
+    size : int, optional
+        Sample size (default is ANDERSON_SAMPLE_SIZE).
+
+    Returns
+    -------
+    np.ndarray
+        The sample, sorted by value.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    size = int(min(size, counts.sum()))
+    quotas = counts * size / counts.sum()
+    allocation = np.floor(quotas).astype(np.int64)
+    remainder = size - allocation.sum()
+    allocation[np.argsort(allocation - quotas, kind="stable")[:remainder]] += 1
+    return np.repeat(np.asarray(values), allocation)
+
+
+def normality_test(values, domain: tuple = None, max_shapiro_samples: int = SHAPIRO_MAX_SAMPLES,
+                   sample_size: int = ANDERSON_SAMPLE_SIZE) -> dict:
+    """
+    Test normality with Shapiro-Wilk on small data and moment-based tests on large data.
+
+    Parameters
+    ----------
+    values : array-like
+        Observations.
+    domain : tuple, optional
+        Smallest and largest value of integer observations, e.g. (0, 20) for
+        grades. If given, the histogram is one bincount over the domain;
+        otherwise it has 20 bins.
+    max_shapiro_samples : int, optional
+        Largest sample tested with Shapiro-Wilk (default is 5000).
+    sample_size : int, optional
+        Size of the stratified sample of the Anderson-Darling test (default is 5000).
+
+    Returns
+    -------
+    dict
+        "test", "n_samples", "statistic" and "p_value" of the main test, the
+        histogram as "counts" and "edges", and for large data the
+        "anderson_statistic", "anderson_p_value" and "anderson_samples" of
+        the Anderson-Darling test.
+    """
+    values = np.asarray(values)
+    if domain is not None:
+        counts = integer_histogram(values, domain)
+        edges = np.arange(domain[0], domain[1] + 2) - 0.5
+    else:
+        counts, edges = np.histogram(values, bins=20)
+
+    if len(values) <= max_shapiro_samples:
+        statistic, p_value = shapiro(values)
+        return {"test": "Shapiro-Wilk", "n_samples": len(values), "statistic": float(statistic),
+                "p_value": float(p_value), "counts": counts, "edges": edges}
+
+    moments = Moments.of(values.reshape(-1, 1))
+    statistic, p_value = dagostino_k2(moments.count[0], moments.skewness[0], moments.kurtosis[0])
+    if domain is not None:
+        sample = stratified_sample(counts, np.arange(domain[0], domain[1] + 1), sample_size)
+    else:
+        # One observation per equal-probability stratum of the data
+        sample = np.quantile(values, (np.arange(sample_size) + 0.5) / sample_size)
+    anderson_statistic, anderson_p_value = anderson_darling(sample)
+    return {"test": "D'Agostino K²", "n_samples": len(values), "statistic": statistic, "p_value": p_value,
+            "counts": counts, "edges": edges, "anderson_statistic": anderson_statistic,
+            "anderson_p_value": anderson_p_value, "anderson_samples": len(sample)}
@@ -0,0 +1,287 @@
+"""
+Bit-packed records of the student columns.
+
+Every validated column has a small domain (`RAW_DOMAINS`), so a value is
+stored as its position in the domain in just enough bits: `sex` in 1 bit,
+`age` in 3, `G3` in 5, and a row of the eight analysis columns in 23 bits
+of one uint32, against 64 bytes as int64 columns. Columns are fields of the
+record at fixed bit offsets, read with a shift and a mask, so counts and
+group-bys run on the packed array without decoding it.
+
+A packed dataset on disk is a directory with the records in `records.npy`,
+memory-mapped when read, and the layout in `layout.json`.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from src.student_schema import COLUMNS, RAW_DOMAINS
+
+_RECORDS_FILE = "records.npy"
+_LAYOUT_FILE = "layout.json"
+# Record dtypes, narrowest first
+_UINT_DTYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+class PackedLayout:
+    """
+    Bit fields of the columns in a packed record, the first column in the lowest bits.
+
+    Parameters
+    ----------
+    columns : list, optional
+        Columns of `RAW_DOMAINS` (default is the features and target of the
+        analysis, `COLUMNS`).
+
+    Attributes
+    ----------
+    bits : dict
+        Width of each field.
+    shifts : dict
+        Bit offset of each field.
+    dtype : np.dtype
+        Narrowest unsigned integer holding a record.
+
+    Raises
+    ------
+    ValueError
+        If a column has no known domain or the record needs more than 64 bits.
+
+    Examples
+    --------
+    >>> layout = PackedLayout()
+    >>> layout.bits["age"], layout.dtype
+    (3, dtype('uint32'))
+    >>> records = layout.encode(X)
+    >>> layout.decode(records).equals(X)
+    """
+
+    def __init__(self, columns=None):
+        self.columns = list(COLUMNS if columns is None else columns)
+        unknown = [column for column in self.columns if column not in RAW_DOMAINS]
+        if unknown:
+            raise ValueError(f"Columns without a known domain: {unknown}")
+        self.domains = {column: RAW_DOMAINS[column] for column in self.columns}
+        self.bits, self.shifts = {}, {}
+        offset = 0
+        for column in self.columns:
+            self.shifts[column] = offset
+            self.bits[column] = max(1, (self._n_values(column) - 1).bit_length())
+            offset += self.bits[column]
+        self.total_bits = offset
+        for dtype in _UINT_DTYPES:
+            if offset <= np.iinfo(dtype).bits:
+                self.dtype = np.dtype(dtype)
+                break
+        else:
+            raise ValueError(f"Records of {offset} bits do not fit 64 bits; pack fewer columns.")
+
+    def _n_values(self, column):
+        domain = self.domains[column]
+        return len(domain) if isinstance(domain, list) else domain[1] - domain[0] + 1
+
+    def _column_codes(self, column, values):
+        """Domain positions of a column's values; raises on values outside the domain."""
+        domain = self.domains[column]
+        if isinstance(domain, list):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                lookup = np.append(pd.Index(domain).get_indexer(values.cat.categories), -1)
+                codes = lookup[values.cat.codes.to_numpy()]
+            else:
+                codes = pd.Categorical(values, categories=domain).codes
+        else:
+            if not pd.api.types.is_integer_dtype(values.dtype):
+                raise ValueError(f"Column {column!r} must hold integers to be packed, got {values.dtype}.")
+            codes = values.to_numpy() - domain[0]
+        invalid = (codes < 0) | (codes >= self._n_values(column))
+        if invalid.any():
+            raise ValueError(f"Column {column!r} has values outside its domain {domain}, "
+                             f"e.g. {values.to_numpy()[np.flatnonzero(invalid)[0]]!r}; validate the data first.")
+        return codes
+
+    def encode(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Pack the layout columns of a DataFrame.
+
+        Parameters
+        ----------
+        frame : pd.DataFrame
+            Validated data with the layout columns; other columns are ignored.
+
+        Returns
+        -------
+        np.ndarray
+            One record per row, of the layout dtype.
+
+        Raises
+        ------
+        ValueError
+            If a column is missing or has values outside its domain.
+        """
+        missing = [column for column in self.columns if column not in frame.columns]
+        if missing:
+            raise ValueError(f"Columns not in the data: {missing}")
+        records = np.zeros(len(frame), dtype=self.dtype)
+        for column in self.columns:
+            records |= self._column_codes(column, frame[column]).astype(self.dtype) << self.dtype.type(
+                self.shifts[column])
+        return records
+
+    def encode_codes(self, codes: np.ndarray) -> np.ndarray:
+        """Pack domain positions given as an (n_columns, n_rows) array, one row per layout column."""
+        records = np.zeros(codes.shape[1], dtype=self.dtype)
+        for j, column in enumerate(self.columns):
+            records |= codes[j].astype(self.dtype) << self.dtype.type(self.shifts[column])
+        return records
+
+    def codes(self, records: np.ndarray, column: str) -> np.ndarray:
+        """Domain positions of one column, read off the records without decoding the others."""
+        field = (records >> self.dtype.type(self.shifts[column])) & self.dtype.type((1 << self.bits[column]) - 1)
+        return field.astype(np.uint8 if self.bits[column] <= 8 else np.int64)
+
+    def decode(self, records: np.ndarray, columns=None, int_dtype=np.int64, index=None) -> pd.DataFrame:
+        """
+        Unpack records into a DataFrame.
+
+        Parameters
+        ----------
+        records : np.ndarray
+            Packed records.
+        columns : list, optional
+            Columns to decode (default is all layout columns).
+        int_dtype : numpy dtype, optional
+            Dtype of the integer columns (default is np.int64, as read from CSV).
+        index : pd.Index, optional
+            Index of the DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            Integer columns and categorical columns with their domain as categories.
+        """
+        data = {}
+        for column in self.columns if columns is None else columns:
+            codes, domain = self.codes(records, column), self.domains[column]
+            if isinstance(domain, list):
+                data[column] = pd.Categorical.from_codes(codes.astype(np.int8), categories=domain)
+            else:
+                data[column] = codes.astype(int_dtype) + int_dtype(domain[0])
+        return pd.DataFrame(data, index=index)
+
+    def to_dict(self) -> dict:
+        """Columns and fields, as written to `layout.json`."""
+        return {"columns": self.columns, "bits": self.bits, "shifts": self.shifts, "dtype": self.dtype.str}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PackedLayout":
+        """Layout of `to_dict`, checked against the current domains."""
+        layout = cls(data["columns"])
+        if layout.to_dict() != {**data, "columns": list(data["columns"])}:
+            raise ValueError("The packed layout does not match the current column domains.")
+        return layout
+
+
+def write_packed(path: str, data, layout: PackedLayout = None, n_rows: int = None) -> PackedLayout:
+    """
+    Write a packed dataset.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the dataset; created if needed and overwritten if it exists.
+    data : pd.DataFrame or iterable of pd.DataFrame
+        Validated rows, whole or in consecutive chunks, e.g. from
+        `pd.read_csv(..., chunksize=...)`.
+    layout : PackedLayout, optional
+        Layout of the records (default is `PackedLayout()`).
+    n_rows : int, optional
+        Total number of rows; required when `data` is an iterable of chunks.
+
+    Returns
+    -------
+    PackedLayout
+        The layout written.
+    """
+    layout = PackedLayout() if layout is None else layout
+    if isinstance(data, pd.DataFrame):
+        data, n_rows = [data], len(data)
+    if n_rows is None:
+        raise ValueError("n_rows is needed to write chunks.")
+    records = create_packed(path, layout, n_rows)
+    start = 0
+    for chunk in data:
+        if start + len(chunk) > n_rows:
+            raise ValueError(f"Got more than the {n_rows} rows announced.")
+        records[start:start + len(chunk)] = layout.encode(chunk)
+        start += len(chunk)
+    if start != n_rows:
+        raise ValueError(f"Got {start} rows, {n_rows} were announced.")
+    records.flush()
+    return layout
+
+
+def create_packed(path: str, layout: PackedLayout, n_rows: int) -> np.memmap:
+    """
+    Create an empty packed dataset of `n_rows` records, to be filled in place.
+
+    Returns
+    -------
+    np.memmap
+        Writable memory-mapped records; call `flush()` once filled.
+    """
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, _LAYOUT_FILE), "w") as f:
+        json.dump(layout.to_dict(), f, indent=1)
+    return np.lib.format.open_memmap(os.path.join(path, _RECORDS_FILE), mode="w+", dtype=layout.dtype,
+                                     shape=(n_rows,))
+
+
+def is_packed(path: str) -> bool:
+    """Whether `path` is a packed dataset directory."""
+    return os.path.isfile(os.path.join(path, _LAYOUT_FILE))
+
+
+def read_packed(path: str, mmap: bool = True) -> tuple:
+    """
+    Read a packed dataset.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the dataset.
+    mmap : bool, optional
+        If True (default), the records are a read-only memory map of the file.
+
+    Returns
+    -------
+    tuple
+        The records (np.ndarray) and their PackedLayout.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the directory is not a packed dataset.
+    """
+    if not is_packed(path):
+        raise FileNotFoundError(f"'{path}' is not a packed dataset.")
+    with open(os.path.join(path, _LAYOUT_FILE)) as f:
+        layout = PackedLayout.from_dict(json.load(f))
+    records = np.load(os.path.join(path, _RECORDS_FILE), mmap_mode="r" if mmap else None)
+    return records, layout
+
+
+def iter_packed(path: str, chunksize: int, columns=None):
+    """
+    Decode a packed dataset chunk by chunk.
+
+    Yields
+    ------
+    pd.DataFrame
+        Consecutive chunks of at most `chunksize` rows of `columns` (default
+        all), indexed by row number.
+    """
+    records, layout = read_packed(path)
+    for start in range(0, len(records), chunksize):
+        chunk = records[start:start + chunksize]
+        yield layout.decode(chunk, columns=columns, index=pd.RangeIndex(start, start + len(chunk)))
@@ -0,0 +1,195 @@
+"""
+Permutation importance of the original input columns of a fitted pipeline.
+
+For each repeat, the copies of the data with one column permuted are stacked
+into one batch and scored with a single `predict` call, instead of one call
+per column. Columns are split into chunks that fit a memory budget and the
+chunks can be scored in worker processes.
+
+The features are encoded once by the transform steps of the pipeline. When
+the encoded outputs of a column depend on that column alone, as for scaled
+numeric and one-hot encoded columns, permuting the column permutes the rows
+of those outputs, so its stacked batch is built from the encoded matrix and
+only the final estimator runs on it. Other columns, e.g. ones entering
+interaction features, are stacked in their original form and go through the
+whole pipeline.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from sklearn.pipeline import Pipeline
+
+# Number of rows used to find the encoded outputs of each column
+PROBE_ROWS = 1024
+
+# Pipeline and data of the worker process, set by _init_worker
+_worker_state = {}
+
+
+def _permutation(seed, repeat, column, n):
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(repeat, column)))
+    return rng.permutation(n)
+
+
+def _encoded_outputs(transform, X, encoded, seed):
+    """
+    Encoded output columns of each input column, found on a sample of rows.
+
+    A column maps to the outputs that change when the column is shuffled
+    within the sample, provided the shuffled outputs are exactly the outputs
+    of the rows the values came from; otherwise it maps to None.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(X), size=min(len(X), PROBE_ROWS), replace=False))
+    probe, expected = X.iloc[rows], encoded[rows]
+    shuffle = rng.permutation(len(rows))
+    outputs = {}
+    for position, name in enumerate(X.columns):
+        values = probe[name].to_numpy()
+        if not (values != values[shuffle]).any():
+            # Nothing to learn from this sample
+            outputs[position] = None
+            continue
+        shuffled = probe.copy()
+        shuffled[name] = values[shuffle]
+        actual = np.asarray(transform.transform(shuffled), dtype=np.float64)
+        changed = np.flatnonzero((actual != expected).any(axis=0))
+        unchanged = np.setdiff1d(np.arange(expected.shape[1]), changed)
+        separable = (np.array_equal(actual[:, changed], expected[shuffle][:, changed], equal_nan=True)
+                     and np.array_equal(actual[:, unchanged], expected[:, unchanged], equal_nan=True))
+        outputs[position] = changed if separable else None
+    return outputs
+
+
+def _encoded_batch(encoded, outputs, positions, repeat, seed):
+    """Encoded matrix repeated once per column position, with the outputs of that column permuted."""
+    n = len(encoded)
+    stacked = np.tile(encoded, (len(positions), 1))
+    for block, position in enumerate(positions):
+        columns = outputs[position]
+        rows = _permutation(seed, repeat, position, n)
+        stacked[block * n:(block + 1) * n, columns] = encoded[np.ix_(rows, columns)]
+    return stacked
+
+
+def _raw_batch(X, positions, repeat, seed):
+    """X repeated once per column position, with that column permuted in its own block."""
+    n = len(X)
+    data = {}
+    for position, name in enumerate(X.columns):
+        values = X[name].to_numpy()
+        tiled = np.tile(values, len(positions))
+        for block, permuted in enumerate(positions):
+            if permuted == position:
+                tiled[block * n:(block + 1) * n] = values[_permutation(seed, repeat, position, n)]
+        data[name] = tiled
+    return pd.DataFrame(data, copy=False)
+
+
+def _score_chunk(state, positions, repeat, seed, encoded):
+    """MSE of the pipeline with each column of `positions` permuted."""
+    if encoded:
+        batch = _encoded_batch(state["encoded"], state["outputs"], positions, repeat, seed)
+        y_pred = state["pipeline"][-1].predict(batch)
+    else:
+        y_pred = state["pipeline"].predict(_raw_batch(state["X"], positions, repeat, seed))
+    errors = np.asarray(y_pred, dtype=np.float64).reshape(len(positions), -1) - state["y"]
+    return np.mean(errors * errors, axis=1)
+
+
+def _init_worker(state):
+    _worker_state.update(state)
+
+
+def _worker_score(positions, repeat, seed, encoded):
+    return _score_chunk(_worker_state, positions, repeat, seed, encoded)
+
+
+def _chunks(positions, bytes_per_column, max_memory_mb, n_jobs):
+    size = max(1, int(max_memory_mb * 1e6 // max(bytes_per_column, 1)))
+    if n_jobs > 1:
+        size = min(size, -(-len(positions) // n_jobs))
+    return [positions[start:start + size] for start in range(0, len(positions), size)]
+
+
+def permutation_importance(pipeline, X: pd.DataFrame, y, n_repeats: int = 5, random_state: int = 123,
+                           max_memory_mb: float = 512, n_jobs: int = 1) -> pd.DataFrame:
+    """
+    Increase of the mean squared error when each input column is permuted.
+
+    Parameters
+    ----------
+    pipeline : estimator
+        Fitted estimator taking `X`, e.g. the preprocessor and Ridge pipeline.
+        The encoded path is used for a `Pipeline` whose transform steps give a
+        dense output; any other estimator is scored on stacked copies of `X`.
+    X : pd.DataFrame
+        Features in their original columns, e.g. the test set.
+    y : array-like
+        Target.
+    n_repeats : int, optional
+        Number of permutations of each column (default is 5).
+    random_state : int, optional
+        Random seed (default is 123).
+    max_memory_mb : float, optional
+        Approximate memory bound of one stacked batch (default is 512 MB).
+    n_jobs : int, optional
+        Number of worker processes scoring column chunks (default is 1, in this process).
+
+    Returns
+    -------
+    pd.DataFrame
+        "feature", "importance_mean" and "importance_std" per column, sorted
+        by decreasing mean importance.
+
+    Raises
+    ------
+    ValueError
+        If `X` and `y` differ in length.
+    """
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if len(X) != len(y):
+        raise ValueError(f"X has {len(X)} rows but y has {len(y)}.")
+
+    state = {"pipeline": pipeline, "X": X, "y": y, "encoded": None, "outputs": {}}
+    if isinstance(pipeline, Pipeline) and len(pipeline) > 1:
+        encoded = pipeline[:-1].transform(X)
+        if not sp.issparse(encoded):
+            state["encoded"] = np.ascontiguousarray(encoded, dtype=np.float64)
+            state["outputs"] = _encoded_outputs(pipeline[:-1], X, state["encoded"], random_state)
+        y_pred = pipeline[-1].predict(encoded)
+    else:
+        y_pred = pipeline.predict(X)
+    baseline_errors = np.asarray(y_pred, dtype=np.float64) - y
+    baseline = np.mean(baseline_errors * baseline_errors)
+
+    outputs = state["outputs"]
+    importances = np.zeros((n_repeats, X.shape[1]))
+    # Columns without encoded outputs are unused by the pipeline and keep an importance of 0
+    encoded_positions = [p for p in range(X.shape[1]) if outputs.get(p) is not None and len(outputs[p])]
+    raw_positions = [p for p in range(X.shape[1]) if outputs.get(p) is None]
+    tasks = []
+    for positions, encoded, bytes_per_column in [
+        (encoded_positions, True, state["encoded"].nbytes if state["encoded"] is not None else 0),
+        # Stacked input plus the encoded copy the pipeline makes of it
+        (raw_positions, False, 2 * X.memory_usage(deep=True, index=False).sum()),
+    ]:
+        if positions:
+            chunks = _chunks(positions, bytes_per_column, max_memory_mb, n_jobs)
+            tasks += [(chunk, repeat, random_state, encoded) for repeat in range(n_repeats) for chunk in chunks]
+
+    if n_jobs == 1 or not tasks:
+        scores = [_score_chunk(state, *task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(state,)) as executor:
+            scores = list(executor.map(_worker_score, *zip(*tasks)))
+    for (positions, repeat, _, _), score in zip(tasks, scores):
+        importances[repeat, positions] = score - baseline
+
+    return pd.DataFrame({
+        "feature": X.columns,
+        "importance_mean": importances.mean(axis=0),
+        "importance_std": importances.std(axis=0),
+    }).sort_values("importance_mean", ascending=False, ignore_index=True)
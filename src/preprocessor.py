@@ -1,9 +1,23 @@
 # preprocessor.py
-from sklearn.compose import make_column_transformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+import weakref
+import numpy as np
 import pandas as pd
+from scipy import sparse as sp
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+from src.category_encoding import CategoryCodeEncoder
+from src.interactions import OneHotCrosses
 
-def create_preprocessor(X_train):
+# Feature names per fitted preprocessor, invalidated when it is refitted
+_feature_names_cache = weakref.WeakKeyDictionary()
+
+
+def _astype(X, dtype):
+    return X.astype(dtype, copy=False)
+
+
+def create_preprocessor(X_train, dtype=np.float64, sparse=False, verbose_feature_names_out=True, encoding="onehot"):
     """
     Creates a preprocessing pipeline for the given dataset.
 
@@ -11,52 +25,160 @@ def create_preprocessor(X_train):
     ----------
     X_train : pd.DataFrame
         Training features dataset.
+    dtype : numpy dtype, optional
+        Floating point dtype of the transformed output (default is np.float64).
+        np.float32 halves the memory of the transformed matrix.
+    sparse : bool, optional
+        If True, one-hot encoded columns are sparse and the transformed output
+        is a scipy CSR matrix (default is False).
+    verbose_feature_names_out : bool, optional
+        If True, feature names are prefixed with the transformer name (default is True).
+    encoding : str, optional
+        "onehot" (default) encodes the categorical columns with `OneHotEncoder`;
+        "codes" with `CategoryCodeEncoder`, which gives the same output through
+        pandas category codes and is fastest on columns of categorical dtype.
 
     Returns
     -------
     preprocessor : sklearn.compose.ColumnTransformer
         A preprocessing pipeline with scaling and encoding steps.
     """
-    categorical_feats = X_train.select_dtypes(include=["object"]).columns
-    numeric_feats = X_train.select_dtypes(include=["int64", "float64"]).columns
+    categorical_feats = X_train.select_dtypes(include=["object", "category"]).columns
+    numeric_feats = X_train.select_dtypes(include="number").columns
+
+    # StandardScaler keeps float32 input as float32, so cast before scaling
+    scaler = StandardScaler()
+    if np.dtype(dtype) != np.float64:
+        scaler = make_pipeline(
+            FunctionTransformer(_astype, kw_args={"dtype": dtype}, feature_names_out="one-to-one"),
+            scaler,
+        )
+
+    if encoding == "codes":
+        encoder = CategoryCodeEncoder(drop="if_binary", sparse_output=sparse, dtype=dtype)
+    elif encoding == "onehot":
+        encoder = OneHotEncoder(drop="if_binary", sparse_output=sparse, dtype=dtype)
+    else:
+        raise ValueError(f"Unknown encoding '{encoding}'; expected 'onehot' or 'codes'.")
 
-    # Scaling and encoding pipeline
-    preprocessor = make_column_transformer(
-        (StandardScaler(), numeric_feats),
-        (OneHotEncoder(drop="if_binary", sparse_output=False), categorical_feats),
-        verbose_feature_names_out=True,  # Ensure unique feature names
+    # Scaling and encoding pipeline; the encoder step keeps its name for either encoding
+    preprocessor = ColumnTransformer(
+        [
+            ("standardscaler", scaler, numeric_feats),
+            ("onehotencoder", encoder, categorical_feats),
+        ],
+        sparse_threshold=1.0 if sparse else 0.0,
+        verbose_feature_names_out=verbose_feature_names_out,  # Ensure unique feature names
     )
     return preprocessor
 
-# Convert transformed output to a DataFrame for consistency
-def transform_to_dataframe(preprocessor, X_train, transformed):
+
+def create_wide_preprocessor(X_train, interactions, dtype=np.float64, min_frequency=None,
+                             verbose_feature_names_out=True):
     """
-    Converts the transformed output back to a DataFrame.
+    Creates a sparse preprocessor with pairwise interactions of one-hot encoded values.
+
+    Numeric features are scaled as in `create_preprocessor`. The interaction
+    columns, numeric or categorical, are one-hot encoded and every pair of
+    values of two different columns is multiplied (see `OneHotCrosses`),
+    which gives thousands of columns with few nonzeros per row; the output is
+    a scipy CSR matrix throughout.
+    Categorical features outside the interactions are one-hot encoded alone.
 
     Parameters
     ----------
-    preprocessor : sklearn.compose.ColumnTransformer
-        The preprocessor pipeline used for transformation.
     X_train : pd.DataFrame
-        Original DataFrame before transformation.
-    transformed : np.ndarray
-        Transformed output from the preprocessor.
+        Training features dataset.
+    interactions : list
+        Columns crossed pairwise.
+    dtype : numpy dtype, optional
+        Floating point dtype of the transformed output (default is np.float64).
+    min_frequency : int, optional
+        Values of an interaction column seen fewer times are grouped into one
+        infrequent category (default is None, no grouping).
+    verbose_feature_names_out : bool, optional
+        If True, feature names are prefixed with the transformer name (default is True).
 
     Returns
     -------
-    pd.DataFrame
-        Transformed data as a DataFrame with appropriate feature names.
+    preprocessor : sklearn.compose.ColumnTransformer
+        A preprocessing pipeline with scaling, encoding and interaction steps.
     """
-    return pd.DataFrame(
-        transformed,
-        columns=preprocessor.get_feature_names_out(),
-        index=X_train.index
+    categorical_feats = X_train.select_dtypes(include=["object", "category"]).columns.difference(
+        interactions, sort=False
     )
+    numeric_feats = X_train.select_dtypes(include="number").columns
 
+    scaler = StandardScaler()
+    if np.dtype(dtype) != np.float64:
+        scaler = make_pipeline(
+            FunctionTransformer(_astype, kw_args={"dtype": dtype}, feature_names_out="one-to-one"),
+            scaler,
+        )
 
+    # Products of one-hot columns are one-hot columns of value pairs, so they stay sparse;
+    # values of the same column are never crossed, as their products are always zero
+    crossed = OneHotCrosses(min_frequency=min_frequency, dtype=dtype)
+    preprocessor = ColumnTransformer(
+        [
+            ("standardscaler", scaler, numeric_feats),
+            ("onehotencoder", OneHotEncoder(drop="if_binary", sparse_output=True, dtype=dtype), categorical_feats),
+            ("interactions", crossed, list(interactions)),
+        ],
+        sparse_threshold=1.0,
+        verbose_feature_names_out=verbose_feature_names_out,
+    )
+    return preprocessor
 
 
+def feature_names(preprocessor):
+    """
+    Returns the output feature names of a fitted preprocessor, computed once per fit.
+
+    Parameters
+    ----------
+    preprocessor : sklearn.compose.ColumnTransformer
+        A fitted preprocessor.
+
+    Returns
+    -------
+    np.ndarray
+        Output feature names.
+    """
+    fitted = preprocessor.transformers_
+    cached = _feature_names_cache.get(preprocessor)
+    if cached is None or cached[0] is not fitted:
+        cached = (fitted, preprocessor.get_feature_names_out())
+        _feature_names_cache[preprocessor] = cached
+    return cached[1]
 
 
+# Convert transformed output to a DataFrame for consistency
+def transform_to_dataframe(preprocessor, X_train, transformed):
+    """
+    Converts the transformed output back to a DataFrame.
 
+    Dense arrays are wrapped without copying and sparse matrices become
+    sparse-backed DataFrames.
 
+    Parameters
+    ----------
+    preprocessor : sklearn.compose.ColumnTransformer
+        The preprocessor pipeline used for transformation.
+    X_train : pd.DataFrame
+        Original DataFrame before transformation.
+    transformed : np.ndarray, scipy.sparse matrix or pd.DataFrame
+        Transformed output from the preprocessor.
+
+    Returns
+    -------
+    pd.DataFrame
+        Transformed data as a DataFrame with appropriate feature names.
+    """
+    if isinstance(transformed, pd.DataFrame):
+        # Already a DataFrame when sklearn is set to pandas output
+        return transformed
+    columns = feature_names(preprocessor)
+    if sp.issparse(transformed):
+        return pd.DataFrame.sparse.from_spmatrix(transformed, index=X_train.index, columns=columns)
+    return pd.DataFrame(transformed, columns=columns, index=X_train.index, copy=False)
@@ -0,0 +1,45 @@
+"""
+64-bit hashes of the values of a row.
+
+Used to join datasets on many key columns (`src.merge_subjects`) and to
+detect duplicate rows across runs (`src.incremental_validation`).
+"""
+
+import numpy as np
+import pandas as pd
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hash_keys(data: pd.DataFrame, keys: list) -> np.ndarray:
+    """
+    Hash the key columns of each row into a 64-bit key.
+
+    The hash depends only on the values of a row, so keys computed on
+    different chunks of a file can be compared.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Dataset containing the key columns.
+    keys : list
+        Key columns.
+
+    Returns
+    -------
+    np.ndarray
+        uint64 hash per row.
+
+    Raises
+    ------
+    ValueError
+        If a key column doesn't exist.
+    """
+    missing = [key for key in keys if key not in data.columns]
+    if missing:
+        raise ValueError(f"Key columns not found in dataset: {missing}")
+    combined = np.zeros(len(data), dtype=np.uint64)
+    for key in keys:
+        # boost::hash_combine, cheaper than hash_pandas_object on many columns
+        combined ^= pd.util.hash_array(data[key].to_numpy()) + _GOLDEN + (combined << 6) + (combined >> 2)
+    return combined
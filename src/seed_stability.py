@@ -0,0 +1,169 @@
+"""
+Test scores and chosen Ridge alpha of many train/test split seeds at once.
+
+For every seed, the rows fall into the test split or one of the folds of the
+grid search, as `fit_model.py` would draw them. Ridge with an intercept and
+standardized numeric features depends on its training rows only through the
+count, sums and cross products of [1, X, y], and so does the squared error of
+its predictions on other rows. These moments are taken once for every seed
+and row group with one matrix product, the moments of each training set are
+sums of group moments, and every seed, fold and alpha is solved with one
+batched eigendecomposition.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold, train_test_split
+
+# Rows per block of the moment products
+_BLOCK_ROWS = 16_384
+
+
+def seed_groups(n_rows: int, seeds, test_size: float = 0.2, cv: int = 5) -> np.ndarray:
+    """
+    Split group of each row for each seed: fold 0 to cv - 1 of the grid search, or cv for the test split.
+
+    The test split is `train_test_split(..., test_size, random_state=seed)`
+    and the folds are `KFold(cv)` of the shuffled training rows, as in
+    `fit_model.py` with `--seed=seed`.
+
+    Returns
+    -------
+    np.ndarray
+        int8 array of shape (len(seeds), n_rows).
+    """
+    groups = np.empty((len(seeds), n_rows), dtype=np.int8)
+    for i, seed in enumerate(seeds):
+        train_pos, test_pos = train_test_split(np.arange(n_rows), test_size=test_size, random_state=seed)
+        groups[i, test_pos] = cv
+        for fold, (_, validation) in enumerate(KFold(cv).split(train_pos)):
+            groups[i, train_pos[validation]] = fold
+    return groups
+
+
+def _group_moments(Z, groups, n_groups):
+    """Sums of the outer products of the rows of Z over each group of each seed, (seeds, groups, q, q)."""
+    n_seeds, q = len(groups), Z.shape[1]
+    moments = np.zeros((n_seeds * n_groups, q * q))
+    offsets = (np.arange(n_seeds) * n_groups)[:, None]
+    for start in range(0, len(Z), _BLOCK_ROWS):
+        block = Z[start:start + _BLOCK_ROWS]
+        outer = (block[:, :, None] * block[:, None, :]).reshape(len(block), q * q)
+        membership = np.zeros((n_seeds * n_groups, len(block)))
+        membership[(groups[:, start:start + _BLOCK_ROWS] + offsets).ravel(),
+                   np.tile(np.arange(len(block)), n_seeds)] = 1
+        moments += membership @ outer
+    return moments.reshape(n_seeds, n_groups, q, q)
+
+
+def _split_moments(M, p):
+    n, sx, sy = M[..., 0, 0], M[..., 0, 1:p + 1], M[..., 0, p + 1]
+    return n, sx, sy, M[..., 1:p + 1, 1:p + 1], M[..., 1:p + 1, p + 1], M[..., p + 1, p + 1]
+
+
+def ridge_seed_stability(matrix, y, n_numeric: int, alphas, seeds, test_size: float = 0.2,
+                         cv: int = 5) -> pd.DataFrame:
+    """
+    Grid-search the Ridge alpha and score the refitted model on the test split, for every seed.
+
+    Equivalent to `GridSearchCV(make_pipeline(create_preprocessor(X), Ridge()),
+    {"ridge__alpha": alphas}, cv=cv, scoring="neg_mean_squared_error")` on the
+    training split of each seed, up to rounding: the numeric columns are
+    standardized on each training set and the one-hot columns are not.
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Encoded features of all rows, the raw numeric columns first, e.g.
+        from `src.shared_cv.encode_once`.
+    y : array-like
+        Target of all rows.
+    n_numeric : int
+        Number of numeric columns at the start of `matrix`.
+    alphas : sequence of float
+        Ridge penalties of the grid.
+    seeds : sequence of int
+        Seeds of the train/test splits.
+    test_size : float, optional
+        Share of the rows in the test split (default is 0.2).
+    cv : int, optional
+        Number of folds of the grid search (default is 5).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per seed: "seed", "alpha" (chosen), "cv_mse" (mean validation
+        MSE of the chosen alpha), "test_mse" and "test_rmse".
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    alphas = np.asarray(alphas, dtype=np.float64)
+    p = matrix.shape[1]
+    # Shifting X and y changes only the intercept; centering keeps the moments well conditioned
+    Z = np.column_stack([np.ones(len(y)), matrix - matrix.mean(axis=0), y - y.mean()])
+    groups = seed_groups(len(y), seeds, test_size=test_size, cv=cv)
+    moments = _group_moments(Z, groups, cv + 1)
+
+    # Training sets: all folds but one, then all folds for the refit
+    all_folds = moments[:, :cv].sum(axis=1)
+    train = np.concatenate([all_folds[:, None] - moments[:, :cv], all_folds[:, None]], axis=1)
+    n, sx, sy, G, h, _ = _split_moments(train, p)
+
+    # Centered and standardized normal equations of each training set
+    mean_x = sx / n[..., None]
+    Gc = G - sx[..., :, None] * mean_x[..., None, :]
+    hc = h - sx * (sy / n)[..., None]
+    scale = np.ones_like(mean_x)
+    std = np.sqrt(np.maximum(np.diagonal(Gc, axis1=-2, axis2=-1)[..., :n_numeric] / n[..., None], 0))
+    scale[..., :n_numeric] = np.where(std < 10 * np.finfo(np.float64).eps, 1.0, std)
+    eigenvalues, eigenvectors = np.linalg.eigh(Gc / (scale[..., :, None] * scale[..., None, :]))
+    projected = np.einsum("sfji,sfj->sfi", eigenvectors, hc / scale)
+    # Coefficients for every alpha, back on the unscaled features: (seeds, sets, alphas, p)
+    coefs = np.einsum("sfij,sfaj->sfai", eigenvectors,
+                      projected[..., None, :] / (eigenvalues[..., None, :] + alphas[:, None])) / scale[..., None, :]
+    intercepts = (sy[..., None] - np.einsum("sfai,sfi->sfa", coefs, sx)) / n[..., None]
+
+    # Squared error on the held-out group of each training set, from its moments
+    n_v, sx_v, sy_v, G_v, h_v, yy_v = _split_moments(moments, p)
+    sse = (yy_v[..., None]
+           - 2 * (intercepts * sy_v[..., None] + np.einsum("sfai,sfi->sfa", coefs, h_v))
+           + intercepts ** 2 * n_v[..., None]
+           + 2 * intercepts * np.einsum("sfai,sfi->sfa", coefs, sx_v)
+           + np.einsum("sfai,sfij,sfaj->sfa", coefs, G_v, coefs))
+    mse = np.maximum(sse, 0) / n_v[..., None]
+
+    cv_mse = mse[:, :cv].mean(axis=1)
+    # The first of tied alphas wins, as in GridSearchCV
+    best = np.argmin(cv_mse, axis=1)
+    rows = np.arange(len(seeds))
+    test_mse = mse[rows, cv, best]
+    return pd.DataFrame({
+        "seed": list(seeds),
+        "alpha": alphas[best],
+        "cv_mse": cv_mse[rows, best],
+        "test_mse": test_mse,
+        "test_rmse": np.sqrt(test_mse),
+    })
+
+
+def summarize_stability(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Distribution of the test scores and chosen alphas across seeds.
+
+    Returns
+    -------
+    pd.DataFrame
+        Mean, standard deviation and 5%, 50% and 95% quantiles of "cv_mse",
+        "test_mse" and "test_rmse", and the share of seeds choosing each alpha.
+    """
+    scores = results[["cv_mse", "test_mse", "test_rmse"]]
+    summary = pd.concat([
+        scores.mean().rename("mean"),
+        scores.std().rename("std"),
+        scores.quantile(0.05).rename("q05"),
+        scores.median().rename("median"),
+        scores.quantile(0.95).rename("q95"),
+    ], axis=1)
+    chosen = results["alpha"].value_counts(normalize=True).sort_index()
+    chosen.index = [f"alpha={alpha:g}" for alpha in chosen.index]
+    return pd.concat([summary, chosen.rename("share").to_frame()])
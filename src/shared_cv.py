@@ -0,0 +1,266 @@
+"""
+Cross-validation with the fold data shared between worker processes.
+
+`GridSearchCV` and `cross_validate` pickle the training data to every worker
+when `n_jobs` is set. Here the training matrix, the target and the fold
+assignment are written once to memory-mapped `.npy` files (in RAM-backed
+/dev/shm where available) and workers attach to them without copying; only
+the estimator and its parameters are sent with each task.
+
+One-hot encoding is stateless given the categories, so it is done once for
+all folds by `encode_once`; the numeric columns are still scaled per fold.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy import sparse as sp
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import KFold, ParameterGrid
+
+# Fold data of the current process, attached by _attach
+_shared = {}
+
+
+def encode_once(preprocessor: ColumnTransformer, X) -> tuple:
+    """
+    Apply the stateless part of a `create_preprocessor` ColumnTransformer once.
+
+    Parameters
+    ----------
+    preprocessor : sklearn.compose.ColumnTransformer
+        Unfitted preprocessor with "standardscaler" and "onehotencoder" steps.
+    X : pd.DataFrame
+        Training features.
+
+    Returns
+    -------
+    tuple
+        The dense matrix with the raw numeric columns first and the one-hot
+        encoded columns after them, an unfitted ColumnTransformer that
+        scales the numeric columns of that matrix, to be fitted per fold,
+        and the number of numeric columns.
+
+    Raises
+    ------
+    ValueError
+        If the preprocessor output is sparse.
+    """
+    encoder = clone(preprocessor).set_params(standardscaler="passthrough")
+    matrix = encoder.fit_transform(X)
+    if sp.issparse(matrix):
+        raise ValueError("Shared cross-validation needs a dense preprocessor output.")
+    dtype = encoder.named_transformers_["onehotencoder"].dtype
+    matrix = np.ascontiguousarray(np.asarray(matrix), dtype=dtype)
+    columns = {name: columns for name, _, columns in encoder.transformers_}
+    n_numeric = len(columns["standardscaler"])
+    fold_preprocessor = ColumnTransformer(
+        [("standardscaler", clone(preprocessor.get_params()["standardscaler"]), np.arange(n_numeric))],
+        remainder="passthrough",
+    )
+    return matrix, fold_preprocessor, n_numeric
+
+
+def _attach(path):
+    _shared["path"] = path
+    for name in ("X", "y", "folds"):
+        _shared[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+
+def _fit_and_score(estimator, params, fold, scoring, return_train_score):
+    X, y, folds = _shared["X"], _shared["y"], _shared["folds"]
+    test = folds == fold
+    train = ~test
+    estimator = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_time = time.perf_counter() - start
+    scorer = check_scoring(estimator, scoring)
+    start = time.perf_counter()
+    test_score = scorer(estimator, X[test], y[test])
+    score_time = time.perf_counter() - start
+    train_score = scorer(estimator, X[train], y[train]) if return_train_score else np.nan
+    return fit_time, score_time, test_score, train_score
+
+
+class SharedSearchResult:
+    """
+    Outcome of `SharedFoldData.grid_search`, with the attributes of a fitted `GridSearchCV`.
+
+    Attributes
+    ----------
+    cv_results_ : dict
+        Same keys and layout as `GridSearchCV.cv_results_`.
+    best_index_, best_params_, best_score_, n_splits_
+        As in `GridSearchCV`.
+    best_estimator_ : estimator
+        Set by `refit`.
+    """
+
+    def __init__(self, cv_results, n_splits):
+        self.cv_results_ = cv_results
+        self.n_splits_ = n_splits
+        self.best_index_ = int(np.argmin(cv_results["rank_test_score"]))
+        self.best_params_ = cv_results["params"][self.best_index_]
+        self.best_score_ = cv_results["mean_test_score"][self.best_index_]
+        self.best_estimator_ = None
+
+    def refit(self, estimator, X, y):
+        """
+        Fit `estimator` with the best parameters on the full training data.
+
+        Parameters
+        ----------
+        estimator : estimator
+            The full pipeline, e.g. preprocessor and Ridge, taking the raw features.
+        X, y : array-like
+            Training data.
+
+        Returns
+        -------
+        SharedSearchResult
+            self, with `best_estimator_` set.
+        """
+        self.best_estimator_ = clone(estimator).set_params(**self.best_params_).fit(X, y)
+        return self
+
+
+class SharedFoldData:
+    """
+    Training data and fold assignment placed once in memory-mapped files.
+
+    Use as a context manager, or call `close` to remove the files; they are
+    also removed when the object is garbage collected or the process exits.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Dense training matrix, e.g. from `encode_once`.
+    y : array-like
+        Training target.
+    cv : int, optional
+        Number of unshuffled folds, as `GridSearchCV(cv=5)` uses for regressors (default is 5).
+    dir : str, optional
+        Directory for the files (default is /dev/shm if it exists, else the temp directory).
+    """
+
+    def __init__(self, X, y, cv: int = 5, dir: str = None):
+        if dir is None and os.path.isdir("/dev/shm"):
+            dir = "/dev/shm"
+        self.path = tempfile.mkdtemp(prefix="shared_cv_", dir=dir)
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.path, ignore_errors=True)
+        self.n_splits = cv
+        folds = np.empty(len(y), dtype=np.int8)
+        for fold, (_, test) in enumerate(KFold(n_splits=cv).split(X)):
+            folds[test] = fold
+        np.save(os.path.join(self.path, "X.npy"), np.ascontiguousarray(X))
+        np.save(os.path.join(self.path, "y.npy"), np.asarray(y))
+        np.save(os.path.join(self.path, "folds.npy"), folds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Remove the memory-mapped files."""
+        if _shared.get("path") == self.path:
+            _shared.clear()
+        self._cleanup()
+
+    def _run(self, estimator, candidates, scoring, return_train_score, n_jobs):
+        tasks = [(estimator, params, fold, scoring, return_train_score)
+                 for params in candidates for fold in range(self.n_splits)]
+        if n_jobs == 1:
+            _attach(self.path)
+            results = [_fit_and_score(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach, initargs=(self.path,)) as executor:
+                results = list(executor.map(_fit_and_score, *zip(*tasks)))
+        # (candidates, folds, [fit_time, score_time, test_score, train_score])
+        return np.array(results, dtype=float).reshape(len(candidates), self.n_splits, 4)
+
+    def cross_validate(self, estimator, scoring=None, return_train_score: bool = False, n_jobs: int = 1) -> dict:
+        """
+        Cross-validate one estimator, like `sklearn.model_selection.cross_validate`.
+
+        Parameters
+        ----------
+        estimator : estimator
+            Estimator taking the shared matrix.
+        scoring : str or callable, optional
+            Scorer; defaults to the estimator's `score` method.
+        return_train_score : bool, optional
+            Whether to score the training folds too (default is False).
+        n_jobs : int, optional
+            Number of worker processes (default is 1, in this process).
+
+        Returns
+        -------
+        dict
+            "fit_time", "score_time", "test_score" and optionally "train_score" per fold.
+        """
+        results = self._run(estimator, [{}], scoring, return_train_score, n_jobs)[0]
+        scores = {"fit_time": results[:, 0], "score_time": results[:, 1], "test_score": results[:, 2]}
+        if return_train_score:
+            scores["train_score"] = results[:, 3]
+        return scores
+
+    def grid_search(self, estimator, param_grid, scoring=None, return_train_score: bool = False,
+                    n_jobs: int = 1) -> SharedSearchResult:
+        """
+        Evaluate every parameter combination on every fold, like `GridSearchCV`.
+
+        Parameters
+        ----------
+        estimator : estimator
+            Estimator taking the shared matrix, e.g. the fold preprocessor of
+            `encode_once` followed by Ridge.
+        param_grid : dict or list of dicts
+            Parameter grid, as for `GridSearchCV`.
+        scoring : str or callable, optional
+            Scorer; defaults to the estimator's `score` method.
+        return_train_score : bool, optional
+            Whether to score the training folds too (default is False).
+        n_jobs : int, optional
+            Number of worker processes (default is 1, in this process).
+
+        Returns
+        -------
+        SharedSearchResult
+            The search results; call `refit` to fit the best estimator.
+        """
+        candidates = list(ParameterGrid(param_grid))
+        results = self._run(estimator, candidates, scoring, return_train_score, n_jobs)
+
+        cv_results = {}
+        for key, index in [("fit_time", 0), ("score_time", 1)]:
+            cv_results[f"mean_{key}"] = results[:, :, index].mean(axis=1)
+            cv_results[f"std_{key}"] = results[:, :, index].std(axis=1)
+        for name in sorted({name for params in candidates for name in params}):
+            values = np.ma.MaskedArray(np.empty(len(candidates), dtype=object), mask=True)
+            for i, params in enumerate(candidates):
+                if name in params:
+                    values[i] = params[name]
+            cv_results[f"param_{name}"] = values
+        cv_results["params"] = candidates
+        for split, index in [("test", 2), ("train", 3)]:
+            if split == "train" and not return_train_score:
+                continue
+            for fold in range(self.n_splits):
+                cv_results[f"split{fold}_{split}_score"] = results[:, fold, index]
+            cv_results[f"mean_{split}_score"] = results[:, :, index].mean(axis=1)
+            cv_results[f"std_{split}_score"] = results[:, :, index].std(axis=1)
+            if split == "test":
+                cv_results["rank_test_score"] = rankdata(
+                    -cv_results["mean_test_score"], method="min"
+                ).astype(np.int32)
+        return SharedSearchResult(cv_results, self.n_splits)
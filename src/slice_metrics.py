@@ -0,0 +1,186 @@
+"""
+Error metrics of the test set broken down by subgroups ("slices").
+
+Every row gets one integer key, the mixed-radix number whose digits are
+the codes of its slicing columns, and the error sums of each key are taken
+with `np.bincount` in a single pass over the rows. The slices of
+every grouping set are then sums over these cells, whose number is bounded
+by the product of the column cardinalities, not by the number of rows.
+"""
+
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Columns the evaluation is broken down by, when none are given
+SLICE_COLUMNS = ["sex", "age", "failures", "studytime"]
+# Above this many possible cells, keys are compressed to the observed ones
+MAX_DENSE_CELLS = 1 << 22
+# Per-cell sums: count, residual, squared, absolute and fourth power of the residual
+_SUMS = 5
+
+
+def grouping_sets(columns, max_order: int = None) -> list:
+    """
+    All combinations of `columns` of one up to `max_order` columns.
+
+    Parameters
+    ----------
+    columns : list
+        Slicing columns.
+    max_order : int, optional
+        Largest number of columns in a grouping set (default is all of them).
+
+    Returns
+    -------
+    list of tuple
+        Grouping sets, singles first.
+    """
+    max_order = len(columns) if max_order is None else min(max_order, len(columns))
+    return [subset for order in range(1, max_order + 1) for subset in combinations(columns, order)]
+
+
+def _cell_sums(X, columns, residuals):
+    """Per-cell error sums and the codes of each cell's columns, over the observed cells."""
+    codes, levels = [], []
+    for column in columns:
+        column_codes, column_levels = pd.factorize(X[column], sort=True, use_na_sentinel=False)
+        codes.append(column_codes.astype(np.int64))
+        levels.append(np.asarray(column_levels, dtype=object))
+    radix = np.array([len(column_levels) for column_levels in levels], dtype=np.int64)
+
+    # Mixed-radix key of the codes, renumbered to the observed keys if it gets too large
+    key = np.zeros(len(residuals), dtype=np.int64)
+    n_cells = 1
+    for column_codes, column_radix in zip(codes, radix):
+        if n_cells * column_radix > MAX_DENSE_CELLS:
+            _, key = np.unique(key, return_inverse=True)
+            n_cells = int(key.max()) + 1 if len(key) else 1
+        key = key * column_radix + column_codes
+        n_cells *= int(column_radix)
+
+    squared = residuals * residuals
+    sums = np.empty((_SUMS, n_cells))
+    for row, weights in enumerate([None, residuals, squared, np.abs(residuals), squared * squared]):
+        sums[row] = np.bincount(key, weights=weights, minlength=n_cells)
+    observed = np.flatnonzero(sums[0] > 0)
+    # Codes of each observed cell, read off its first row
+    first_row = np.empty(n_cells, dtype=np.int64)
+    first_row[key[::-1]] = np.arange(len(key) - 1, -1, -1)
+    cell_codes = np.stack(codes, axis=1)[first_row[observed]] if codes else np.empty((len(observed), 0), np.int64)
+    return sums[:, observed], cell_codes, radix, levels
+
+
+def _welch_worse(n, mse, variance, n_rest, mse_rest, variance_rest):
+    """One-sided p-values of Welch's t-test that the mean squared error of a slice exceeds that of the other rows."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a, b = variance / n, variance_rest / n_rest
+        t = (mse - mse_rest) / np.sqrt(a + b)
+        df = (a + b) ** 2 / (a * a / (n - 1) + b * b / (n_rest - 1))
+        return stats.t.sf(t, df)
+
+
+def _benjamini_hochberg(p_values):
+    """Benjamini-Hochberg adjusted p-values, NaN where the p-value is NaN."""
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    if len(valid):
+        order = valid[np.argsort(p_values[valid])]
+        ranked = p_values[order] * len(valid) / np.arange(1, len(valid) + 1)
+        adjusted[order] = np.minimum(np.minimum.accumulate(ranked[::-1])[::-1], 1.0)
+    return adjusted
+
+
+def slice_metrics(X, y_true, y_pred, sets=None, alpha: float = 0.05, min_count: int = 30) -> pd.DataFrame:
+    """
+    MSE, MAE, bias and count of every slice of every grouping set, flagging slices worse than the rest.
+
+    A slice is flagged when its mean squared error is larger than that of
+    the rows outside it by a one-sided Welch t-test, with Benjamini-Hochberg
+    adjusted p-values at level `alpha` over all slices tested.
+
+    Parameters
+    ----------
+    X : pd.DataFrame
+        Test features, including the slicing columns.
+    y_true : array-like
+        True target values.
+    y_pred : array-like
+        Predicted values.
+    sets : list of tuple, optional
+        Grouping sets, e.g. [("sex",), ("sex", "age")] (default is every
+        combination of the `SLICE_COLUMNS` in `X`).
+    alpha : float, optional
+        False discovery rate of the flagged slices (default is 0.05).
+    min_count : int, optional
+        Slices with fewer rows are reported but not tested (default is 30).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per slice, after a first row for all rows: "grouping" (the
+        columns, joined by ", "), "slice" (e.g. "sex=F, age=16"), "count",
+        "mse", "mae", "bias" (mean prediction minus mean target), "p_value",
+        "q_value" (adjusted p-value) and "worse".
+
+    Raises
+    ------
+    ValueError
+        If a grouping set refers to a column not in `X`.
+    """
+    if sets is None:
+        sets = grouping_sets([column for column in SLICE_COLUMNS if column in X.columns])
+    sets = [tuple(columns) for columns in sets]
+    columns = list(dict.fromkeys(column for columns in sets for column in columns))
+    missing = [column for column in columns if column not in X.columns]
+    if missing:
+        raise ValueError(f"Slicing columns not in the data: {missing}")
+
+    residuals = np.asarray(y_pred, dtype=np.float64).ravel() - np.asarray(y_true, dtype=np.float64).ravel()
+    if len(residuals) != len(X):
+        raise ValueError(f"Got {len(residuals)} predictions for {len(X)} rows.")
+    sums, cell_codes, radix, levels = _cell_sums(X, columns, residuals)
+    total = sums.sum(axis=1)
+
+    groupings, labels, blocks = ["(all)"], ["(all)"], [total[:, None]]
+    for grouping in sets:
+        positions = [columns.index(column) for column in grouping]
+        group_key = np.zeros(len(cell_codes), dtype=np.int64)
+        for position in positions:
+            group_key = group_key * radix[position] + cell_codes[:, position]
+        groups, inverse = np.unique(group_key, return_inverse=True)
+        blocks.append(np.stack([np.bincount(inverse, weights=row, minlength=len(groups)) for row in sums]))
+        # Codes of each group, decoded from its key
+        group_codes = np.empty((len(groups), len(positions)), dtype=np.int64)
+        remainder = groups
+        for i in range(len(positions) - 1, -1, -1):
+            remainder, group_codes[:, i] = np.divmod(remainder, radix[positions[i]])
+        groupings.extend([", ".join(grouping)] * len(groups))
+        labels.extend(", ".join(f"{column}={levels[position][code]}" for column, position, code
+                                in zip(grouping, positions, codes)) for codes in group_codes)
+
+    count, residual_sum, squared_sum, absolute_sum, fourth_sum = np.concatenate(blocks, axis=1)
+    mse = squared_sum / count
+    # Sample variance of the squared errors, inside and outside each slice
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.maximum(fourth_sum - count * mse * mse, 0) / (count - 1)
+        n_rest = total[0] - count
+        mse_rest = (total[2] - squared_sum) / n_rest
+        variance_rest = np.maximum(total[4] - fourth_sum - n_rest * mse_rest * mse_rest, 0) / (n_rest - 1)
+    tested = (count >= min_count) & (n_rest >= 2)
+    tested[0] = False
+    p_values = np.where(tested, _welch_worse(count, mse, variance, n_rest, mse_rest, variance_rest), np.nan)
+    q_values = _benjamini_hochberg(p_values)
+
+    return pd.DataFrame({
+        "grouping": groupings,
+        "slice": labels,
+        "count": count.astype(np.int64),
+        "mse": mse,
+        "mae": absolute_sum / count,
+        "bias": residual_sum / count,
+        "p_value": p_values,
+        "q_value": q_values,
+        "worse": q_values <= alpha,
+    })
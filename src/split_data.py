@@ -1,3 +1,5 @@
+import os
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 
@@ -39,3 +41,160 @@ def split_train_test(data, target_column, test_size=0.2, random_state=123):
     
     return train_test_split(X, y, test_size=test_size, random_state=random_state)
 
+
+def _index_dtype(n_samples):
+    return np.int32 if n_samples < np.iinfo(np.int32).max else np.int64
+
+
+def _stratified_test_mask(strata, n_test, rng):
+    """Pick `n_test` rows at random with per-stratum counts proportional to stratum size."""
+    n_samples = len(strata)
+    counts = np.bincount(strata)
+    # Largest remainder allocation so the per-stratum counts add up to n_test
+    quota = counts * (n_test / n_samples)
+    n_test_per_stratum = np.floor(quota).astype(np.int64)
+    shortfall = n_test - n_test_per_stratum.sum()
+    n_test_per_stratum[np.argsort(n_test_per_stratum - quota, kind="stable")[:shortfall]] += 1
+
+    # Random order within each stratum: shuffle, then stable sort by stratum
+    order = rng.permutation(n_samples)
+    order = order[np.argsort(strata[order], kind="stable")]
+    sorted_strata = strata[order]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rank = np.arange(n_samples) - starts[sorted_strata]
+    mask = np.zeros(n_samples, dtype=bool)
+    mask[order[rank < n_test_per_stratum[sorted_strata]]] = True
+    return mask
+
+
+def _grouped_test_mask(groups, n_test, rng):
+    """Assign whole groups to the test set so that it holds as close to `n_test` rows as possible."""
+    _, group_codes, group_sizes = np.unique(groups, return_inverse=True, return_counts=True)
+    test_groups = np.zeros(len(group_sizes), dtype=bool)
+    # Greedy pass over the groups in random order; loops over groups, not rows
+    filled = 0
+    for group in rng.permutation(len(group_sizes)):
+        if abs(filled + group_sizes[group] - n_test) < abs(filled - n_test):
+            test_groups[group] = True
+            filled += group_sizes[group]
+    return test_groups[group_codes.ravel()]
+
+
+def split_indices(data, test_size=0.2, random_state=123, stratify_column=None, n_bins=5, group_column=None):
+    """
+    Splits the rows of a dataset into training and testing index arrays without copying data.
+
+    Parameters:
+    ----------
+    data: pandas.DataFrame
+        The input dataset.
+    test_size: float
+        Proportion of rows to include in the test split. Default is 0.2.
+    random_state: int
+        Random seed for reproducibility. Default is 123.
+    stratify_column: str
+        Column to stratify on, e.g. "G3". Numeric columns with more than `n_bins`
+        distinct values are binned into `n_bins` quantile bins. Default is None.
+    n_bins: int
+        Number of quantile bins for a numeric stratification column. Default is 5.
+    group_column: str
+        Column whose groups (e.g. "school") must not be split between train
+        and test. Cannot be combined with `stratify_column`. Default is None.
+
+    Returns:
+    --------
+        tuple:
+            train_idx, test_idx as sorted int32 (int64 for very large data) positional
+            indices. Use `data.take(idx)` or `take_rows` to materialize a split on demand.
+
+    Raises:
+    -------
+    ValueError
+        If the test_size is not between 0 and 1.
+        If a stratify or group column doesn't exist, or both are given.
+    """
+    if test_size < 0 or test_size > 1:
+        raise ValueError(f"Test size {test_size} should range from 0 to 1")
+    for column in (stratify_column, group_column):
+        if column is not None and column not in data.columns:
+            raise ValueError(f"Column {column} not found in dataset.")
+    if stratify_column is not None and group_column is not None:
+        raise ValueError("Use either stratify_column or group_column, not both.")
+
+    n_samples = len(data)
+    n_test = int(np.ceil(test_size * n_samples))
+    rng = np.random.default_rng(random_state)
+
+    if stratify_column is not None:
+        values = data[stratify_column].to_numpy()
+        if pd.api.types.is_numeric_dtype(values) and len(np.unique(values)) > n_bins:
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+            strata = np.searchsorted(edges, values, side="right")
+        else:
+            strata = np.unique(values, return_inverse=True)[1].ravel()
+        is_test = _stratified_test_mask(strata, n_test, rng)
+    elif group_column is not None:
+        is_test = _grouped_test_mask(data[group_column].to_numpy(), n_test, rng)
+    else:
+        is_test = np.zeros(n_samples, dtype=bool)
+        is_test[rng.permutation(n_samples)[:n_test]] = True
+
+    dtype = _index_dtype(n_samples)
+    return np.flatnonzero(~is_test).astype(dtype), np.flatnonzero(is_test).astype(dtype)
+
+
+def take_rows(data, indices, columns=None):
+    """
+    Materializes the rows of a split from positional indices.
+
+    Parameters:
+    ----------
+    data: pandas.DataFrame
+        The input dataset.
+    indices: np.ndarray
+        Positional row indices, e.g. from `split_indices`.
+    columns: list
+        Columns to keep. Default is all columns.
+
+    Returns:
+    --------
+        pandas.DataFrame or pandas.Series:
+            The selected rows; a Series if `columns` is a single column name.
+    """
+    selected = data if columns is None else data[columns]
+    return selected.take(indices)
+
+
+def save_split_indices(path, train_idx, test_idx):
+    """
+    Saves train and test index arrays to a `.npz` file.
+
+    Parameters:
+    ----------
+    path: str
+        Destination file path.
+    train_idx, test_idx: np.ndarray
+        Index arrays from `split_indices`.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez(path, train=train_idx, test=test_idx)
+
+
+def load_split_indices(path):
+    """
+    Loads train and test index arrays saved by `save_split_indices`.
+
+    Parameters:
+    ----------
+    path: str
+        Path of the `.npz` file.
+
+    Returns:
+    --------
+        tuple:
+            train_idx, test_idx.
+    """
+    with np.load(path) as split:
+        return split["train"], split["test"]
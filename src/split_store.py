@@ -0,0 +1,206 @@
+"""
+Single on-disk store for the train/test split of a dataset.
+
+Each column is one `.npy` file with the training rows first and the test rows
+after them, so every split is a contiguous slice of a memory-mapped array.
+Integer columns are stored in the narrowest dtype that holds their range and
+categorical columns as integer codes with their categories in `meta.json`.
+The `row_index.npy` sidecar maps store rows back to the rows of the source data.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+_META_FILE = "meta.json"
+_ROW_INDEX_FILE = "row_index.npy"
+SPLITS = ("train", "test")
+
+
+def _column_file(store_path, column):
+    return os.path.join(store_path, f"{column}.npy")
+
+
+def _narrowest_int(values: np.ndarray) -> np.ndarray:
+    if len(values) == 0:
+        return values
+    low, high = values.min(), values.max()
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values
+
+
+def write_split_store(
+    store_path: str, data: pd.DataFrame, train_idx, test_idx, target_column: str = "G3", downcast: bool = True
+) -> None:
+    """
+    Write a dataset and its train/test split to a split store.
+
+    Parameters
+    ----------
+    store_path : str
+        Directory of the store; created if needed and overwritten if it exists.
+    data : pd.DataFrame
+        The full dataset.
+    train_idx, test_idx : np.ndarray
+        Positional row indices of the two splits, e.g. from `split_indices`.
+    target_column : str, optional
+        Name of the target column (default is "G3").
+    downcast : bool, optional
+        If True, integer columns are stored in the narrowest integer dtype that
+        holds their values (default is True). `read_split_store` can restore
+        the original dtypes at the cost of a copy.
+
+    Raises
+    ------
+    ValueError
+        If the target column doesn't exist.
+    """
+    if target_column not in data.columns:
+        raise ValueError(f"Target column {target_column} not found in dataset.")
+    os.makedirs(store_path, exist_ok=True)
+
+    order = np.concatenate([train_idx, test_idx])
+    np.save(os.path.join(store_path, _ROW_INDEX_FILE), order)
+
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_numeric_dtype(values):
+            array = values.to_numpy()
+            columns[column] = {"dtype": array.dtype.str, "original_dtype": array.dtype.str}
+            if downcast and pd.api.types.is_integer_dtype(array):
+                array = _narrowest_int(array)
+                columns[column]["dtype"] = array.dtype.str
+        else:
+            categorical = pd.Categorical(values)
+            array = categorical.codes
+            columns[column] = {"dtype": "category", "categories": categorical.categories.tolist()}
+        np.save(_column_file(store_path, column), array[order])
+
+    meta = {
+        "n_train": int(len(train_idx)),
+        "n_test": int(len(test_idx)),
+        "target": target_column,
+        "columns": columns,
+    }
+    with open(os.path.join(store_path, _META_FILE), "w") as f:
+        json.dump(meta, f, indent=1)
+
+
+def read_store_meta(store_path: str) -> dict:
+    """
+    Read the metadata of a split store.
+
+    Parameters
+    ----------
+    store_path : str
+        Directory of the store.
+
+    Returns
+    -------
+    dict
+        Metadata with keys "n_train", "n_test", "target" and "columns".
+
+    Raises
+    ------
+    FileNotFoundError
+        If the directory is not a split store.
+    """
+    meta_path = os.path.join(store_path, _META_FILE)
+    if not os.path.isfile(meta_path):
+        raise FileNotFoundError(f"'{store_path}' is not a split store.")
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _split_slice(meta, split):
+    if split is None:
+        return slice(0, meta["n_train"] + meta["n_test"])
+    if split not in SPLITS:
+        raise ValueError(f"Split must be one of {SPLITS} or None, got '{split}'.")
+    if split == "train":
+        return slice(0, meta["n_train"])
+    return slice(meta["n_train"], meta["n_train"] + meta["n_test"])
+
+
+def read_split_store(
+    store_path: str, split: str = None, columns: list = None, restore_dtypes: bool = False
+) -> pd.DataFrame:
+    """
+    Read a split from a split store without copying the data.
+
+    Numeric columns are read-only views of memory-mapped files and categorical
+    columns are `pd.Categorical` built on memory-mapped codes.
+
+    Parameters
+    ----------
+    store_path : str
+        Directory of the store.
+    split : str, optional
+        "train", "test" or None for all rows (default is None).
+    columns : list, optional
+        Columns to read (default is all columns).
+    restore_dtypes : bool, optional
+        If True, downcast integer columns are copied back to their original
+        dtype, e.g. int64 as read from CSV (default is False).
+
+    Returns
+    -------
+    pd.DataFrame
+        The requested rows and columns, indexed by their row in the source data.
+
+    Raises
+    ------
+    ValueError
+        If the split or a column is unknown.
+    """
+    meta = read_store_meta(store_path)
+    rows = _split_slice(meta, split)
+    columns = list(meta["columns"]) if columns is None else list(columns)
+    unknown = [column for column in columns if column not in meta["columns"]]
+    if unknown:
+        raise ValueError(f"Columns not in the store: {unknown}")
+
+    data = {}
+    for column in columns:
+        values = np.load(_column_file(store_path, column), mmap_mode="r")[rows]
+        info = meta["columns"][column]
+        if info["dtype"] == "category":
+            values = pd.Categorical.from_codes(values, categories=info["categories"])
+        elif restore_dtypes and info["dtype"] != info["original_dtype"]:
+            values = values.astype(info["original_dtype"])
+        data[column] = values
+    index = np.load(os.path.join(store_path, _ROW_INDEX_FILE), mmap_mode="r")[rows]
+    return pd.DataFrame(data, index=pd.Index(index), copy=False)
+
+
+def read_xy(store_path: str, split: str, restore_dtypes: bool = False) -> tuple:
+    """
+    Read the features and target of a split from a split store.
+
+    Parameters
+    ----------
+    store_path : str
+        Directory of the store.
+    split : str
+        "train" or "test".
+    restore_dtypes : bool, optional
+        If True, downcast integer columns are copied back to their original dtype
+        (default is False).
+
+    Returns
+    -------
+    tuple
+        X (pd.DataFrame) and y (pd.Series), sharing memory with the store files
+        unless dtypes are restored.
+    """
+    meta = read_store_meta(store_path)
+    target = meta["target"]
+    features = [column for column in meta["columns"] if column != target]
+    X = read_split_store(store_path, split, columns=features, restore_dtypes=restore_dtypes)
+    y = read_split_store(store_path, split, columns=[target], restore_dtypes=restore_dtypes)[target]
+    return X, y
@@ -0,0 +1,164 @@
+"""
+Regression metrics accumulated over chunks of predictions.
+
+The squared and absolute errors are summed exactly: every float64 is an
+integer mantissa times a power of two, so the mantissas are added up per
+exponent and the per-exponent totals are carried as one Python integer.
+Exact sums do not depend on the order or chunking of the rows, and the
+metrics are correctly rounded from them, so evaluating a test set in chunks
+gives the same bits as evaluating it at once.
+"""
+
+import numpy as np
+import pandas as pd
+from src.streaming_stats import Moments
+
+# frexp exponents of finite float64 values are in [-1073, 1024]; mantissas have 53 bits
+_MIN_EXPONENT = -1074
+_N_EXPONENTS = 1024 - _MIN_EXPONENT + 1
+_MANTISSA_BITS = 53
+_SCALE_BITS = _MANTISSA_BITS - _MIN_EXPONENT
+# bincount adds in float64, which is exact while the per-exponent totals of
+# 27-bit half mantissas stay below 2**53
+_BLOCK_ROWS = 1 << 24
+
+
+class ExactSum:
+    """
+    Exact sum of float64 values, added in any number of batches.
+
+    Examples
+    --------
+    >>> total = ExactSum()
+    >>> total.add(np.array([1e16, 1.0, -1e16]))
+    >>> total.value()
+    1.0
+    """
+
+    def __init__(self):
+        # The sum is total * 2**-_SCALE_BITS
+        self.total = 0
+
+    def add(self, values):
+        """Add an array of finite values to the sum."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not np.isfinite(values).all():
+            raise ValueError("Only finite values can be summed exactly.")
+        for start in range(0, len(values), _BLOCK_ROWS):
+            mantissas, exponents = np.frexp(values[start:start + _BLOCK_ROWS])
+            mantissas = np.ldexp(mantissas, _MANTISSA_BITS).astype(np.int64)
+            high = mantissas >> 26
+            low = mantissas - (high << 26)
+            bins = exponents - _MIN_EXPONENT
+            high_totals = np.bincount(bins, weights=high, minlength=_N_EXPONENTS)
+            low_totals = np.bincount(bins, weights=low, minlength=_N_EXPONENTS)
+            for b in np.flatnonzero(high_totals != 0):
+                self.total += int(high_totals[b]) << (int(b) + 26)
+            for b in np.flatnonzero(low_totals != 0):
+                self.total += int(low_totals[b]) << int(b)
+
+    def merge(self, other: "ExactSum") -> "ExactSum":
+        """Add the sum of other values, in place."""
+        self.total += other.total
+        return self
+
+    def value(self) -> float:
+        """The sum, correctly rounded to float64."""
+        return self.total / (1 << _SCALE_BITS)
+
+    def mean(self, count: int) -> float:
+        """The sum divided by `count`, correctly rounded to float64."""
+        return self.total / (count << _SCALE_BITS)
+
+
+class RegressionMetrics:
+    """
+    Running MSE, RMSE and MAE of predictions, with residual moments and histogram.
+
+    Parameters
+    ----------
+    histogram_bins : int, optional
+        Number of equal-width bins of the residual histogram; 0 (default)
+        keeps no histogram.
+    histogram_range : tuple, optional
+        Lower and upper edge of the histogram bins (default is (-20, 20), the
+        range of the grades). Residuals outside it are counted in an open
+        first or last bin.
+
+    Examples
+    --------
+    >>> metrics = RegressionMetrics()
+    >>> for X_chunk, y_chunk in chunks:
+    ...     metrics.update(y_chunk, model.predict(X_chunk))
+    >>> metrics.mse, metrics.rmse, metrics.mae
+    """
+
+    def __init__(self, histogram_bins: int = 0, histogram_range: tuple = (-20, 20)):
+        self.count = 0
+        self.squared_error = ExactSum()
+        self.absolute_error = ExactSum()
+        self.moments = Moments(1)
+        self.min_residual = np.inf
+        self.max_residual = -np.inf
+        self.edges = np.linspace(*histogram_range, histogram_bins + 1) if histogram_bins > 0 else None
+        self.histogram = np.zeros(histogram_bins + 2 if histogram_bins > 0 else 0, dtype=np.int64)
+
+    def update(self, y_true, y_pred) -> "RegressionMetrics":
+        """Add a chunk of targets and predictions, in place."""
+        residuals = np.asarray(y_true, dtype=np.float64).ravel() - np.asarray(y_pred, dtype=np.float64).ravel()
+        if residuals.size == 0:
+            return self
+        self.count += residuals.size
+        self.squared_error.add(residuals ** 2)
+        self.absolute_error.add(np.abs(residuals))
+        self.moments.merge(Moments.of(residuals[:, None]))
+        self.min_residual = min(self.min_residual, residuals.min())
+        self.max_residual = max(self.max_residual, residuals.max())
+        if self.edges is not None:
+            # Bin 0 and the last bin hold the residuals below and above the edges
+            bins = np.searchsorted(self.edges, residuals, side="right")
+            bins[residuals == self.edges[-1]] = len(self.edges) - 1
+            self.histogram += np.bincount(bins, minlength=len(self.histogram))
+        return self
+
+    def merge(self, other: "RegressionMetrics") -> "RegressionMetrics":
+        """Combine with the metrics of other rows, in place."""
+        self.count += other.count
+        self.squared_error.merge(other.squared_error)
+        self.absolute_error.merge(other.absolute_error)
+        self.moments.merge(other.moments)
+        self.min_residual = min(self.min_residual, other.min_residual)
+        self.max_residual = max(self.max_residual, other.max_residual)
+        if self.edges is not None:
+            self.histogram += other.histogram
+        return self
+
+    @property
+    def mse(self) -> float:
+        """Mean squared error."""
+        return self.squared_error.mean(self.count) if self.count else np.nan
+
+    @property
+    def rmse(self) -> float:
+        """Root mean squared error."""
+        return float(np.sqrt(self.mse))
+
+    @property
+    def mae(self) -> float:
+        """Mean absolute error."""
+        return self.absolute_error.mean(self.count) if self.count else np.nan
+
+    def residual_summary(self) -> pd.DataFrame:
+        """Count, mean, standard deviation, skewness, kurtosis and range of the residuals (true - predicted)."""
+        return pd.DataFrame({
+            "Statistic": ["count", "mean", "std", "skewness", "kurtosis", "min", "max"],
+            "Value": [self.count, self.moments.mean[0], np.sqrt(self.moments.variance[0]),
+                      self.moments.skewness[0], self.moments.kurtosis[0], self.min_residual, self.max_residual],
+        })
+
+    def residual_histogram(self) -> pd.DataFrame:
+        """Lower edge, upper edge and count of each histogram bin, the outer bins being open."""
+        if self.edges is None:
+            raise ValueError("No residual histogram was kept; pass histogram_bins > 0.")
+        edges = np.concatenate([[-np.inf], self.edges, [np.inf]])
+        return pd.DataFrame({"lower": edges[:-1], "upper": edges[1:], "count": self.histogram})
@@ -0,0 +1,155 @@
+"""
+Mergeable summary statistics of numeric columns.
+
+Statistics of a batch of rows are computed with NumPy and merged into the
+running totals with the pairwise update formulas of Chan et al. and Pébay,
+so data can be summarized in chunks, or across runs, without keeping it.
+"""
+
+import numpy as np
+
+
+class Moments:
+    """
+    Count, mean and central moment sums up to the fourth order of each column.
+
+    Missing values are left out of the column they appear in.
+
+    Parameters
+    ----------
+    n_columns : int
+        Number of columns.
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        # Sums of the 2nd, 3rd and 4th powers of the deviations from the mean
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.m4 = np.zeros(n_columns)
+
+    @classmethod
+    def of(cls, values) -> "Moments":
+        """Moments of a 2D array, one column per statistic column."""
+        values = np.asarray(values, dtype=np.float64)
+        moments = cls(values.shape[1])
+        valid = ~np.isnan(values)
+        moments.count = valid.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            moments.mean = np.where(moments.count > 0, np.nansum(values, axis=0) / moments.count, 0.0)
+        deviations = np.where(valid, values - moments.mean, 0.0)
+        squared = deviations * deviations
+        moments.m2 = squared.sum(axis=0)
+        moments.m3 = (squared * deviations).sum(axis=0)
+        moments.m4 = (squared * squared).sum(axis=0)
+        return moments
+
+    def merge(self, other: "Moments") -> "Moments":
+        """Combine with the moments of other rows of the same columns, in place."""
+        na, nb = self.count, other.count
+        n = na + nb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(n > 0, other.mean - self.mean, 0.0)
+            nn = np.where(n > 0, n, 1.0)
+            m4 = (self.m4 + other.m4
+                  + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / nn ** 3
+                  + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / nn ** 2
+                  + 4 * delta * (na * other.m3 - nb * self.m3) / nn)
+            m3 = (self.m3 + other.m3
+                  + delta ** 3 * na * nb * (na - nb) / nn ** 2
+                  + 3 * delta * (na * other.m2 - nb * self.m2) / nn)
+            m2 = self.m2 + other.m2 + delta ** 2 * na * nb / nn
+            self.mean = self.mean + delta * nb / nn
+        self.count, self.m2, self.m3, self.m4 = n, m2, m3, m4
+        return self
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Sample variance (ddof=1) of each column."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / (self.count - 1)
+
+    @property
+    def skewness(self) -> np.ndarray:
+        """Biased sample skewness of each column, as `scipy.stats.skew`."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.sqrt(self.count) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self) -> np.ndarray:
+        """Biased excess kurtosis of each column, as `scipy.stats.kurtosis`."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.count * self.m4 / self.m2 ** 2 - 3
+
+    def to_dict(self) -> dict:
+        """Arrays of the statistics, keyed by attribute name."""
+        return {name: getattr(self, name) for name in ("count", "mean", "m2", "m3", "m4")}
+
+    @classmethod
+    def from_dict(cls, arrays: dict) -> "Moments":
+        """Moments from the arrays of `to_dict`."""
+        moments = cls(len(arrays["count"]))
+        for name in ("count", "mean", "m2", "m3", "m4"):
+            setattr(moments, name, np.asarray(arrays[name], dtype=np.float64))
+        return moments
+
+
+class CoMoments:
+    """
+    Count, means and cross-product sums of the deviations of several columns.
+
+    Only rows without missing values are counted.
+
+    Parameters
+    ----------
+    n_columns : int
+        Number of columns.
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = 0.0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    @classmethod
+    def of(cls, values) -> "CoMoments":
+        """Co-moments of a 2D array, one column per variable."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values).any(axis=1)]
+        comoments = cls(values.shape[1])
+        comoments.count = float(len(values))
+        if len(values):
+            comoments.mean = values.mean(axis=0)
+            deviations = values - comoments.mean
+            comoments.comoment = deviations.T @ deviations
+        return comoments
+
+    def merge(self, other: "CoMoments") -> "CoMoments":
+        """Combine with the co-moments of other rows of the same columns, in place."""
+        n = self.count + other.count
+        if n > 0:
+            delta = other.mean - self.mean
+            self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.count * other.count / n
+            self.mean = self.mean + delta * other.count / n
+        self.count = n
+        return self
+
+    def correlation(self) -> np.ndarray:
+        """Pearson correlation matrix."""
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.comoment / np.outer(scale, scale)
+
+    def to_dict(self) -> dict:
+        """Arrays of the statistics, keyed by attribute name."""
+        return {"count": np.float64(self.count), "mean": self.mean, "comoment": self.comoment}
+
+    @classmethod
+    def from_dict(cls, arrays: dict) -> "CoMoments":
+        """Co-moments from the arrays of `to_dict`."""
+        comoments = cls(len(arrays["mean"]))
+        comoments.count = float(arrays["count"])
+        comoments.mean = np.asarray(arrays["mean"], dtype=np.float64)
+        comoments.comoment = np.asarray(arrays["comoment"], dtype=np.float64)
+        return comoments
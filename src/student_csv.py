@@ -0,0 +1,104 @@
+"""
+Typed, column-pruned reads of the raw student CSV files with the pyarrow CSV engine.
+
+The raw files quote every categorical value and the grades `G1` and `G2`
+(`"5"`), so `pd.read_csv` infers Python object columns for the labels and
+has to parse every column before the analysis columns are selected. Here
+the parser gets an explicit schema built from `RAW_DOMAINS`, integers for
+the quoted grades too and dictionary-encoded strings for categoricals, and
+parses only the requested columns, with several threads. The Arrow columns
+are handed to pandas without a copy, as `pd.ArrowDtype` integer columns
+and categorical columns.
+
+Files that do not fit the schema, e.g. a grade of "abc", and environments
+without pyarrow fall back to `pd.read_csv`, so validation still reports the
+offending values.
+"""
+
+import csv
+import pandas as pd
+from src.student_schema import RAW_DOMAINS, is_categorical
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:  # pyarrow is optional; pd.read_csv is used instead
+    pa = pa_csv = None
+
+
+def _read_header(filepath: str, delimiter: str) -> list:
+    with open(filepath, newline="") as f:
+        return next(csv.reader(f, delimiter=delimiter), [])
+
+
+def _arrow_type(column: str):
+    # The CSV reader only builds dictionaries with int32 indices
+    return pa.dictionary(pa.int32(), pa.string()) if is_categorical(column) else pa.int64()
+
+
+def _pandas_dtype(arrow_type):
+    # pandas does not support dictionary ArrowDtype columns everywhere (pd.Categorical of one fails),
+    # so these become categoricals on the same indices and dictionary
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def read_student_csv(filepath: str, columns=None, delimiter: str = ";", suffix: str = None,
+                     use_threads: bool = True) -> pd.DataFrame:
+    """
+    Read columns of a raw student CSV file.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the CSV file.
+    columns : list, optional
+        Columns to read, in this order (default is all columns of the file).
+    delimiter : str, optional
+        Field delimiter (default is ";").
+    suffix : str, optional
+        Suffix of the columns of one subject in a merged file, e.g. "_por";
+        a requested column is read from its suffixed name when the file has
+        one, and returned under the requested name.
+    use_threads : bool, optional
+        If True (default), the file is parsed by several threads.
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns: `int64[pyarrow]` for integer columns and "category" for
+        categorical columns, whose categories are the labels in the file. With
+        the `pd.read_csv` fallback, the NumPy-backed dtypes of `pd.read_csv`.
+
+    Raises
+    ------
+    KeyError
+        If a requested column is not in the file.
+    """
+    header = _read_header(filepath, delimiter)
+    if columns is None:
+        columns = [column[:-len(suffix)] if suffix and column.endswith(suffix) else column for column in header]
+    sources = [f"{column}{suffix}" if suffix and f"{column}{suffix}" in header else column for column in columns]
+    missing = [source for source in sources if source not in header]
+    if missing:
+        raise KeyError(f"Columns not in '{filepath}': {missing}")
+
+    renames = dict(zip(sources, columns))
+    if pa_csv is not None:
+        try:
+            table = pa_csv.read_csv(
+                filepath,
+                read_options=pa_csv.ReadOptions(use_threads=use_threads),
+                parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+                convert_options=pa_csv.ConvertOptions(
+                    # Columns without a known domain are left to type inference
+                    column_types={source: _arrow_type(column) for source, column in renames.items()
+                                  if column in RAW_DOMAINS},
+                    include_columns=sources,
+                    # Empty fields are missing values, as with pd.read_csv
+                    strings_can_be_null=True,
+                ),
+            )
+            return table.rename_columns(columns).to_pandas(types_mapper=_pandas_dtype)
+        except pa.ArrowInvalid:
+            pass
+    return pd.read_csv(filepath, delimiter=delimiter, usecols=sources)[sources].rename(columns=renames)
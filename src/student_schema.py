@@ -0,0 +1,70 @@
+"""
+Column names and value domains of the UCI student performance data.
+
+The domains follow the attribute description shipped in `data/zip/student.txt`:
+categorical columns map to their list of allowed labels and integer columns map
+to their inclusive `(low, high)` bounds.
+"""
+
+# Features and target used by the analysis
+FEATURES = ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc"]
+TARGET = "G3"
+COLUMNS = FEATURES + [TARGET]
+
+# All attributes of student-mat.csv / student-por.csv, in file order
+RAW_DOMAINS = {
+    "school": ["GP", "MS"],
+    "sex": ["F", "M"],
+    "age": (15, 22),
+    "address": ["R", "U"],
+    "famsize": ["GT3", "LE3"],
+    "Pstatus": ["A", "T"],
+    "Medu": (0, 4),
+    "Fedu": (0, 4),
+    "Mjob": ["at_home", "health", "other", "services", "teacher"],
+    "Fjob": ["at_home", "health", "other", "services", "teacher"],
+    "reason": ["course", "home", "other", "reputation"],
+    "guardian": ["father", "mother", "other"],
+    "traveltime": (1, 4),
+    "studytime": (1, 4),
+    "failures": (0, 4),
+    "schoolsup": ["no", "yes"],
+    "famsup": ["no", "yes"],
+    "paid": ["no", "yes"],
+    "activities": ["no", "yes"],
+    "nursery": ["no", "yes"],
+    "higher": ["no", "yes"],
+    "internet": ["no", "yes"],
+    "romantic": ["no", "yes"],
+    "famrel": (1, 5),
+    "freetime": (1, 5),
+    "goout": (1, 5),
+    "Dalc": (1, 5),
+    "Walc": (1, 5),
+    "health": (1, 5),
+    "absences": (0, 93),
+    "G1": (0, 20),
+    "G2": (0, 20),
+    "G3": (0, 20),
+}
+RAW_COLUMNS = list(RAW_DOMAINS)
+
+# Integer columns that the raw files store as quoted strings (e.g. "5")
+QUOTED_NUMERIC = ["G1", "G2"]
+
+
+def is_categorical(column: str) -> bool:
+    """
+    Check whether a raw column holds categorical labels.
+
+    Parameters
+    ----------
+    column : str
+        Name of a column in `RAW_DOMAINS`.
+
+    Returns
+    -------
+    bool
+        True if the column domain is a list of labels, False if it is an integer range.
+    """
+    return isinstance(RAW_DOMAINS[column], list)
@@ -0,0 +1,336 @@
+"""
+Deterministic synthetic student data for scale-testing the pipeline.
+
+A profile holds the marginal distribution of every column and the correlation
+matrix of their normal scores (a Gaussian copula). Rows are drawn in fixed-size
+blocks, each seeded from its block number, so the output only depends on the
+seed and never on how the rows are chunked.
+"""
+
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+from src.packed_records import PackedLayout, create_packed
+from src.student_schema import RAW_COLUMNS, RAW_DOMAINS, QUOTED_NUMERIC, is_categorical
+
+# Rows drawn per random block; fixed so output is independent of `chunk_size`
+_BLOCK_ROWS = 65536
+# Upper bound on the number of joint token combinations per CSV encoding block
+_MAX_JOINT_TOKENS = 20000
+
+
+def _support(column: str) -> list:
+    domain = RAW_DOMAINS[column]
+    if is_categorical(column):
+        return list(domain)
+    return list(range(domain[0], domain[1] + 1))
+
+
+def fit_student_profile(data: pd.DataFrame) -> dict:
+    """
+    Learn marginal distributions and the correlation structure from real data.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Raw student data, e.g. `data/raw/student-mat.csv` read with `delimiter=";"`.
+        Every column must appear in `RAW_DOMAINS`.
+
+    Returns
+    -------
+    dict
+        Profile with keys "columns", "support", "probs" and "corr".
+
+    Raises
+    ------
+    ValueError
+        If the data is empty or contains unknown columns.
+    """
+    if data.empty:
+        raise ValueError("Cannot fit a profile on an empty DataFrame.")
+    unknown = [col for col in data.columns if col not in RAW_DOMAINS]
+    if unknown:
+        raise ValueError(f"Columns not in the student schema: {unknown}")
+
+    columns = list(data.columns)
+    support, probs = {}, {}
+    scores = np.empty((len(data), len(columns)))
+    for j, column in enumerate(columns):
+        counts = data[column].value_counts()
+        values = sorted(counts.index.tolist())
+        p = counts.loc[values].to_numpy(dtype=float) / len(data)
+        support[column] = values
+        probs[column] = p.tolist()
+        # Normal score of each observation at the midpoint of its CDF step
+        cum = np.cumsum(p)
+        mid = cum - p / 2
+        codes = pd.Categorical(data[column], categories=values).codes
+        scores[:, j] = ndtri(np.clip(mid[codes], 1e-12, 1 - 1e-12))
+
+    corr = np.atleast_2d(np.corrcoef(scores, rowvar=False))
+    corr = np.nan_to_num(corr)
+    np.fill_diagonal(corr, 1.0)
+    return {"columns": columns, "support": support, "probs": probs, "corr": corr.tolist()}
+
+
+def profile_from_schema(columns: list = None) -> dict:
+    """
+    Build a profile from the schema bounds alone.
+
+    Every value in a column domain is equally likely and columns are independent.
+
+    Parameters
+    ----------
+    columns : list, optional
+        Columns to include (default is all raw columns).
+
+    Returns
+    -------
+    dict
+        Profile with keys "columns", "support", "probs" and "corr".
+    """
+    columns = list(columns or RAW_COLUMNS)
+    support = {column: _support(column) for column in columns}
+    probs = {column: [1 / len(values)] * len(values) for column, values in support.items()}
+    return {
+        "columns": columns,
+        "support": support,
+        "probs": probs,
+        "corr": np.eye(len(columns)).tolist(),
+    }
+
+
+def _cholesky(corr: np.ndarray) -> np.ndarray:
+    # Clip the spectrum so that sample correlation matrices are positive definite
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    fixed = (eigvecs * np.clip(eigvals, 1e-6, None)) @ eigvecs.T
+    d = np.sqrt(np.diag(fixed))
+    return np.linalg.cholesky(fixed / np.outer(d, d))
+
+
+def _generate_codes(profile: dict, start: int, stop: int, seed: int) -> np.ndarray:
+    """Draw support indices for rows [start, stop) as an (n_columns, n_rows) array."""
+    columns = profile["columns"]
+    chol = _cholesky(np.asarray(profile["corr"], dtype=float))
+    # CDF steps mapped to normal quantiles, so latent draws are binned without ndtr
+    thresholds = [ndtri(np.cumsum(profile["probs"][column])[:-1]) for column in columns]
+    codes = np.empty((len(columns), stop - start), dtype=np.int16)
+
+    first_block, last_block = start // _BLOCK_ROWS, (stop - 1) // _BLOCK_ROWS
+    for block in range(first_block, last_block + 1):
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+        z = chol @ rng.standard_normal((len(columns), _BLOCK_ROWS))
+        lo = max(start, block * _BLOCK_ROWS)
+        hi = min(stop, (block + 1) * _BLOCK_ROWS)
+        z = z[:, lo - block * _BLOCK_ROWS:hi - block * _BLOCK_ROWS]
+        for j in range(len(columns)):
+            codes[j, lo - start:hi - start] = np.searchsorted(thresholds[j], z[j], side="right")
+    return codes
+
+
+def _codes_to_frame(profile: dict, codes: np.ndarray, offset: int = 0) -> pd.DataFrame:
+    data = {}
+    for j, column in enumerate(profile["columns"]):
+        values = profile["support"][column]
+        dtype = object if isinstance(values[0], str) else np.int64
+        data[column] = np.asarray(values, dtype=dtype)[codes[j]]
+    return pd.DataFrame(data, index=pd.RangeIndex(offset, offset + codes.shape[1]))
+
+
+def generate_student_chunks(profile: dict, n_rows: int, seed: int = 123, chunk_size: int = 1_000_000):
+    """
+    Generate synthetic student rows chunk by chunk.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile from `fit_student_profile` or `profile_from_schema`.
+    n_rows : int
+        Total number of rows to generate.
+    seed : int, optional
+        Random seed (default is 123).
+    chunk_size : int, optional
+        Maximum number of rows per chunk (default is 1,000,000).
+
+    Yields
+    ------
+    pd.DataFrame
+        Consecutive chunks with the same dtypes as `pd.read_csv` gives for the raw files.
+    """
+    if n_rows < 0 or chunk_size <= 0:
+        raise ValueError("n_rows must be non-negative and chunk_size positive.")
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        yield _codes_to_frame(profile, _generate_codes(profile, start, stop, seed), start)
+
+
+def generate_student_data(profile: dict, n_rows: int, seed: int = 123) -> pd.DataFrame:
+    """
+    Generate synthetic student rows in memory.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile from `fit_student_profile` or `profile_from_schema`.
+    n_rows : int
+        Number of rows to generate.
+    seed : int, optional
+        Random seed (default is 123).
+
+    Returns
+    -------
+    pd.DataFrame
+        Synthetic data with the profile columns.
+    """
+    return _codes_to_frame(profile, _generate_codes(profile, 0, n_rows, seed))
+
+
+def _token(column: str, value) -> bytes:
+    if isinstance(value, str) or column in QUOTED_NUMERIC:
+        return f'"{value}"'.encode()
+    return str(value).encode()
+
+
+def _encode_csv_rows(profile: dict, codes: np.ndarray) -> bytes:
+    """Encode coded rows as semicolon separated lines using joint token tables."""
+    columns = profile["columns"]
+    sizes = [len(profile["support"][column]) for column in columns]
+
+    # Group neighbouring columns so each group's joint tokens fit in a small table
+    groups, current, combos = [], [], 1
+    for j, size in enumerate(sizes):
+        if current and combos * size > _MAX_JOINT_TOKENS:
+            groups.append(current)
+            current, combos = [], 1
+        current.append(j)
+        combos *= size
+    groups.append(current)
+
+    lines = None
+    for group in groups:
+        key = np.zeros(codes.shape[1], dtype=np.int64)
+        for j in group:
+            key = key * sizes[j] + codes[j]
+        tokens = [
+            [_token(columns[j], value) for value in profile["support"][columns[j]]]
+            for j in group
+        ]
+        table = np.array([b";".join(combo) for combo in itertools.product(*tokens)])
+        part = table[key]
+        lines = part if lines is None else np.strings.add(np.strings.add(lines, b";"), part)
+    return b"\n".join(lines.tolist()) + b"\n"
+
+
+def _encode_chunk(profile: dict, start: int, stop: int, seed: int) -> bytes:
+    return _encode_csv_rows(profile, _generate_codes(profile, start, stop, seed))
+
+
+def write_student_csv(
+    profile: dict,
+    filepath: str,
+    n_rows: int,
+    seed: int = 123,
+    chunk_size: int = 1_000_000,
+    n_jobs: int = 1,
+) -> None:
+    """
+    Write synthetic rows in the raw semicolon separated, quoted CSV layout.
+
+    String columns and the grades in `QUOTED_NUMERIC` are quoted, as in
+    `data/raw/student-mat.csv`, so the file can be read back with
+    `pd.read_csv(filepath, delimiter=";")`.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile from `fit_student_profile` or `profile_from_schema`.
+    filepath : str
+        Destination CSV path.
+    n_rows : int
+        Total number of rows to write.
+    seed : int, optional
+        Random seed (default is 123).
+    chunk_size : int, optional
+        Number of rows generated and encoded at a time (default is 1,000,000).
+    n_jobs : int, optional
+        Number of worker processes encoding chunks (default is 1). Chunks are
+        written in order and at most `2 * n_jobs` are held in memory.
+    """
+    if n_rows < 0 or chunk_size <= 0:
+        raise ValueError("n_rows must be non-negative and chunk_size positive.")
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    bounds = [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+    with open(filepath, "wb") as f:
+        f.write(";".join(profile["columns"]).encode() + b"\n")
+        if n_jobs == 1:
+            for start, stop in bounds:
+                f.write(_encode_chunk(profile, start, stop, seed))
+            return
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque()
+            for start, stop in bounds:
+                pending.append(executor.submit(_encode_chunk, profile, start, stop, seed))
+                if len(pending) >= 2 * n_jobs:
+                    f.write(pending.popleft().result())
+            while pending:
+                f.write(pending.popleft().result())
+
+
+def write_student_packed(
+    profile: dict,
+    path: str,
+    n_rows: int,
+    seed: int = 123,
+    chunk_size: int = 1_000_000,
+    columns: list = None,
+) -> PackedLayout:
+    """
+    Write synthetic rows as a packed dataset (see `src.packed_records`).
+
+    The rows are those of `generate_student_data(profile, n_rows, seed)`,
+    restricted to `columns`; the support indices are packed directly, with
+    no DataFrame or text in between.
+
+    Parameters
+    ----------
+    profile : dict
+        Profile from `fit_student_profile` or `profile_from_schema`.
+    path : str
+        Directory of the packed dataset.
+    n_rows : int
+        Total number of rows to write.
+    seed : int, optional
+        Random seed (default is 123).
+    chunk_size : int, optional
+        Number of rows generated and packed at a time (default is 1,000,000).
+    columns : list, optional
+        Profile columns to pack (default is the features and target of the analysis).
+
+    Returns
+    -------
+    PackedLayout
+        The layout of the records.
+    """
+    if n_rows < 0 or chunk_size <= 0:
+        raise ValueError("n_rows must be non-negative and chunk_size positive.")
+    layout = PackedLayout(columns)
+    missing = [column for column in layout.columns if column not in profile["columns"]]
+    if missing:
+        raise ValueError(f"Columns not in the profile: {missing}")
+    rows = [profile["columns"].index(column) for column in layout.columns]
+    # Support index to domain position; a fitted support holds the observed values only
+    lookups = [np.asarray([_support(column).index(value) for value in profile["support"][column]], dtype=np.int16)
+               for column in layout.columns]
+    records = create_packed(path, layout, n_rows)
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        codes = _generate_codes(profile, start, stop, seed)
+        records[start:stop] = layout.encode_codes(np.stack([lookup[codes[j]] for j, lookup in zip(rows, lookups)]))
+    records.flush()
+    return layout
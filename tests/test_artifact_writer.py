@@ -0,0 +1,70 @@
+import os
+import pickle
+import sys
+import threading
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.artifact_writer import ArtifactWriter
+
+
+def test_artifact_writer_writes_in_place(tmp_path):
+    frame = pd.DataFrame({"age": [15, 16], "G3": [10, 12]})
+    with ArtifactWriter() as writer:
+        writer.to_csv(frame, str(tmp_path / "tables" / "frame.csv"), index=False)
+        writer.pickle({"alpha": 1}, str(tmp_path / "model.pkl"))
+        fig = plt.figure()
+        plt.plot([0, 1], [1, 0])
+        writer.savefig(fig, str(tmp_path / "plot.png"))
+        # The figure is handed over, pyplot no longer tracks it
+        assert not plt.get_fignums()
+
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "tables" / "frame.csv"), frame)
+    with open(tmp_path / "model.pkl", "rb") as f:
+        assert pickle.load(f) == {"alpha": 1}
+    with open(tmp_path / "plot.png", "rb") as f:
+        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == ["model.pkl", "plot.png", "tables"]
+
+
+def test_artifact_writer_raises_first_error(tmp_path):
+    path = tmp_path / "model.pkl"
+    path.write_bytes(b"old")
+
+    def fail(tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("disk full")
+
+    writer = ArtifactWriter()
+    writer.submit(str(path), fail)
+    writer.submit(str(tmp_path / "other.pkl"), lambda tmp_path: open(tmp_path, "wb").close())
+    with pytest.raises(RuntimeError, match="disk full"):
+        writer.close()
+    # The previous file is kept and the partial one removed
+    assert path.read_bytes() == b"old"
+    assert sorted(os.listdir(tmp_path)) == ["model.pkl", "other.pkl"]
+
+
+def test_artifact_writer_bounds_pending_writes(tmp_path):
+    release = threading.Event()
+    writer = ArtifactWriter(n_threads=1, max_pending=2)
+    for i in range(2):
+        writer.submit(str(tmp_path / f"{i}.bin"), lambda tmp_path: (release.wait(), open(tmp_path, "wb").close()))
+
+    submitted = threading.Event()
+    blocked = threading.Thread(target=lambda: (writer.submit(str(tmp_path / "2.bin"),
+                                                             lambda tmp_path: open(tmp_path, "wb").close()),
+                                               submitted.set()))
+    blocked.start()
+    # A third write waits for a free slot
+    assert not submitted.wait(0.2)
+    release.set()
+    assert submitted.wait(5)
+    blocked.join()
+    writer.close()
+    assert sorted(os.listdir(tmp_path)) == ["0.bin", "1.bin", "2.bin"]
@@ -0,0 +1,48 @@
+import os
+import sys
+import numpy as np
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.bootstrap import bootstrap_metrics
+
+
+@pytest.fixture
+def predictions():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 21, 500).astype(float)
+    return y_true, y_true + rng.normal(0, 3, 500)
+
+
+def test_bootstrap_metrics_matches_loop(predictions):
+    y_true, y_pred = predictions
+    intervals = bootstrap_metrics(y_true, y_pred, n_resamples=300)
+    samples = []
+    for resample in range(300):
+        rng = np.random.default_rng(np.random.SeedSequence(123, spawn_key=(resample,)))
+        errors = (y_true - y_pred)[rng.integers(0, 500, 500, dtype=np.intp)]
+        mse = np.mean(errors ** 2)
+        samples.append([mse, np.sqrt(mse), np.mean(np.abs(errors))])
+    expected = np.quantile(samples, [0.025, 0.975], axis=0).T
+    np.testing.assert_allclose(intervals[["lower", "upper"]].to_numpy(), expected, rtol=1e-12)
+
+
+def test_bootstrap_metrics_independent_of_chunks_and_workers(predictions):
+    y_true, y_pred = predictions
+    intervals = bootstrap_metrics(y_true, y_pred, n_resamples=50)
+    assert intervals.equals(bootstrap_metrics(y_true, y_pred, n_resamples=50, max_memory_mb=0.01))
+    assert intervals.equals(bootstrap_metrics(y_true, y_pred, n_resamples=50, n_jobs=2))
+
+
+def test_bootstrap_metrics_contains_point_estimate(predictions):
+    y_true, y_pred = predictions
+    intervals = bootstrap_metrics(y_true, y_pred, n_resamples=200)
+    mse = np.mean((y_true - y_pred) ** 2)
+    assert intervals.loc["MSE", "lower"] < mse < intervals.loc["MSE", "upper"]
+    assert (intervals["lower"] <= intervals["upper"]).all()
+
+
+def test_bootstrap_metrics_invalid_input():
+    with pytest.raises(ValueError):
+        bootstrap_metrics([1.0, 2.0], [1.0])
+    with pytest.raises(ValueError):
+        bootstrap_metrics([1.0, 2.0], [1.0, 2.0], confidence=1.5)
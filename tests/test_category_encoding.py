@@ -0,0 +1,85 @@
+import os
+import pickle
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse as sp
+from sklearn.preprocessing import OneHotEncoder
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.category_encoding import CategoryCodeEncoder
+from src.preprocessor import create_preprocessor
+
+
+@pytest.fixture
+def students():
+    rng = np.random.default_rng(0)
+    n = 200
+    return pd.DataFrame({
+        "sex": rng.choice(["F", "M"], n),
+        "Mjob": rng.choice(["at_home", "health", "other", "services", "teacher"], n),
+        "reason": rng.choice(["course", "home", "other", "reputation"], n),
+    })
+
+
+@pytest.mark.parametrize("drop", [None, "if_binary"])
+@pytest.mark.parametrize("sparse_output", [False, True])
+def test_matches_one_hot_encoder(students, drop, sparse_output):
+    expected_encoder = OneHotEncoder(drop=drop, sparse_output=sparse_output, dtype=np.float32).fit(students)
+    encoder = CategoryCodeEncoder(drop=drop, sparse_output=sparse_output, dtype=np.float32).fit(students)
+    expected = expected_encoder.transform(students)
+    for X in (students, students.astype("category")):
+        actual = encoder.transform(X)
+        assert sp.issparse(actual) == sparse_output
+        assert actual.dtype == np.float32
+        if sparse_output:
+            actual, expected_dense = actual.toarray(), expected.toarray()
+        else:
+            expected_dense = expected
+        np.testing.assert_array_equal(actual, expected_dense)
+    np.testing.assert_array_equal(encoder.get_feature_names_out(), expected_encoder.get_feature_names_out())
+
+
+def test_categorical_columns_are_recoded(students):
+    encoder = CategoryCodeEncoder().fit(students)
+    # Categories in another order, with an unused one, map onto the fitted vocabulary
+    mjob = pd.Categorical(students["Mjob"], categories=["teacher", "unused", "other", "health", "services", "at_home"])
+    X = students.assign(Mjob=mjob)
+    np.testing.assert_array_equal(encoder.transform_codes(X), encoder.transform_codes(students))
+    assert encoder.transform_codes(students)[:, 1].tolist() == pd.Categorical(students["Mjob"]).codes.tolist()
+
+
+def test_unknown_categories(students):
+    unseen = students.head(3).assign(Mjob=["pilot", "health", None])
+    with pytest.raises(ValueError, match="unknown categories"):
+        CategoryCodeEncoder().fit(students).transform(unseen)
+
+    encoder = CategoryCodeEncoder(handle_unknown="ignore", sparse_output=False).fit(students)
+    codes = encoder.transform_codes(unseen)
+    assert codes[:, 1].tolist() == [-1, 1, -1]
+    # Unknown values have no one-hot column, as with OneHotEncoder(handle_unknown="ignore")
+    expected = OneHotEncoder(handle_unknown="ignore", sparse_output=False).fit(students).transform(unseen)
+    np.testing.assert_array_equal(encoder.transform(unseen), expected)
+
+
+def test_fixed_vocabulary_is_persisted(students):
+    categories = [["F", "M"], ["at_home", "health", "other", "services", "teacher", "pilot"],
+                  ["course", "home", "other", "reputation"]]
+    encoder = CategoryCodeEncoder(categories=categories).fit(students.head(5))
+    restored = pickle.loads(pickle.dumps(encoder))
+    assert restored.get_feature_names_out()[2:8].tolist() == [
+        "Mjob_at_home", "Mjob_health", "Mjob_other", "Mjob_pilot", "Mjob_services", "Mjob_teacher"
+    ]
+    assert restored.transform(students).shape == (len(students), 12)
+    with pytest.raises(ValueError, match="unknown categories"):
+        CategoryCodeEncoder(categories=[["F"], categories[1], categories[2]]).fit(students)
+
+
+def test_create_preprocessor_encodings(students):
+    X = students.assign(age=np.arange(len(students)) % 8 + 15)
+    one_hot = create_preprocessor(X).fit(X)
+    codes = create_preprocessor(X, encoding="codes").fit(X)
+    np.testing.assert_array_equal(codes.transform(X), one_hot.transform(X))
+    np.testing.assert_array_equal(codes.get_feature_names_out(), one_hot.get_feature_names_out())
+    with pytest.raises(ValueError, match="Unknown encoding"):
+        create_preprocessor(X, encoding="ordinal")
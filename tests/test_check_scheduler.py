@@ -0,0 +1,79 @@
+import json
+import os
+import sys
+import time
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.check_scheduler import RENDER, CheckScheduler, write_report
+
+
+def slow_check(name, delay):
+    time.sleep(delay)
+    print(f"{name} done")
+    warnings.warn(f"{name} warning")
+    return delay
+
+
+def failing_check():
+    raise ValueError("bad data")
+
+
+def render_check(path):
+    print(f"pid {os.getpid()}")
+    return {"mean": np.float64(1.5), "table": pd.DataFrame({"a": [1, 2]}), "path": path}
+
+
+def test_results_in_declaration_order(capsys):
+    scheduler = CheckScheduler(n_jobs=3)
+    scheduler.add("first", slow_check, "first", 0.2)
+    scheduler.add("second", slow_check, "second", 0.0)
+    scheduler.add("third", slow_check, "third", 0.1, depends_on=["second"])
+    results = scheduler.run()
+    assert [result["name"] for result in results] == ["first", "second", "third"]
+    assert all(result["status"] == "passed" for result in results)
+    assert [result["warnings"] for result in results] == [["first warning"], ["second warning"], ["third warning"]]
+    assert results[0]["output"] == "first done\n"
+    out = capsys.readouterr().out
+    assert out.index("first done") < out.index("second done") < out.index("third done")
+
+
+def test_failed_dependency_skips_dependents():
+    scheduler = CheckScheduler(n_jobs=2)
+    scheduler.add("schema", failing_check)
+    scheduler.add("independent", slow_check, "independent", 0.0)
+    scheduler.add("dependent", slow_check, "dependent", 0.0, depends_on=["schema"])
+    scheduler.add("transitive", slow_check, "transitive", 0.0, depends_on=["dependent"])
+    results = {result["name"]: result for result in scheduler.run(echo=False)}
+    assert results["schema"]["status"] == "failed"
+    assert results["schema"]["error"] == "ValueError: bad data"
+    assert results["independent"]["status"] == "passed"
+    assert results["dependent"]["status"] == "skipped"
+    assert results["transitive"]["status"] == "skipped"
+
+
+def test_render_checks_run_in_processes(tmp_path):
+    scheduler = CheckScheduler(n_jobs=2)
+    scheduler.add("render", render_check, "plot.png", kind=RENDER)
+    results = scheduler.run(echo=False)
+    assert results[0]["status"] == "passed"
+    assert results[0]["output"] != f"pid {os.getpid()}\n"
+
+    write_report(results, str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json") as f:
+        report = json.load(f)
+    assert report["passed"]
+    assert report["checks"][0]["result"] == {"mean": 1.5, "table": [{"a": 1}, {"a": 2}], "path": "plot.png"}
+
+
+def test_add_rejects_invalid_checks():
+    scheduler = CheckScheduler()
+    scheduler.add("schema", failing_check)
+    with pytest.raises(ValueError):
+        scheduler.add("schema", failing_check)
+    with pytest.raises(ValueError):
+        scheduler.add("outliers", failing_check, depends_on=["missing"])
+    with pytest.raises(ValueError):
+        scheduler.add("plots", failing_check, kind="gpu")
@@ -0,0 +1,61 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import cross_val_predict
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.conformal import ConformalCalibration, IntervalCoverage, calibrate
+
+
+def test_half_width_is_finite_sample_quantile():
+    # Residuals 1..9; coverage 0.8 needs the ceil(10 * 0.8) = 8th smallest
+    calibration = ConformalCalibration(np.arange(1, 10), np.zeros(9))
+    np.testing.assert_array_equal(calibration.half_width([0.5, 0.8, 0.9]), [5.0, 8.0, 9.0])
+    assert calibration.half_width(0.95) == np.inf
+    with pytest.raises(ValueError, match="Coverage"):
+        calibration.half_width(1.0)
+
+    lower, upper = calibration.intervals(np.array([10.0, 12.0]), coverage=0.8)
+    np.testing.assert_array_equal(lower, [2.0, 4.0])
+    np.testing.assert_array_equal(upper, [18.0, 20.0])
+
+
+def test_subsampled_scores_are_conservative():
+    rng = np.random.default_rng(0)
+    residuals = rng.normal(size=50_001)
+    exact = ConformalCalibration(residuals, np.zeros_like(residuals), max_scores=len(residuals))
+    kept = ConformalCalibration(residuals, np.zeros_like(residuals), max_scores=1_000)
+    assert len(kept.scores) <= 1_000 and len(exact.scores) == 50_001
+    coverages = np.linspace(0.01, 0.99, 99)
+    assert (kept.half_width(coverages) >= exact.half_width(coverages)).all()
+    np.testing.assert_allclose(kept.half_width(coverages), exact.half_width(coverages), rtol=0.02)
+
+
+def test_calibrate_uses_out_of_fold_predictions():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({"x": rng.normal(size=200)})
+    y = 3 * X["x"] + rng.normal(size=200)
+    calibration = calibrate(Ridge(), X, y, cv=5)
+    expected = np.sort(np.abs(y - cross_val_predict(Ridge(), X, y, cv=5)))
+    np.testing.assert_array_equal(calibration.scores, expected)
+
+    frame = calibration.interval_frame(np.zeros(3), coverages=(0.9, 0.975))
+    assert frame.columns.tolist() == ["prediction", "lower_90", "upper_90", "lower_97.5", "upper_97.5"]
+
+
+def test_interval_coverage_on_exchangeable_data():
+    rng = np.random.default_rng(2)
+    calibration = ConformalCalibration(rng.normal(size=2_000), np.zeros(2_000))
+    y_true = rng.normal(size=20_000)
+    whole = IntervalCoverage(calibration, (0.5, 0.9)).update(y_true, np.zeros_like(y_true))
+    chunked = IntervalCoverage(calibration, (0.5, 0.9))
+    for part in np.array_split(y_true, 7):
+        chunked.update(part, np.zeros_like(part))
+    pd.testing.assert_frame_equal(chunked.to_frame(), whole.to_frame())
+
+    table = whole.to_frame()
+    assert table["count"].tolist() == [20_000, 20_000]
+    np.testing.assert_allclose(table["empirical"], [0.5, 0.9], atol=0.02)
+    np.testing.assert_allclose(table["width"], 2 * calibration.half_width([0.5, 0.9]))
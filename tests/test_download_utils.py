@@ -0,0 +1,121 @@
+import hashlib
+import io
+import os
+import sys
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.download_utils import download_bytes, download_file, read_nested_member
+
+
+def nested_archive():
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w") as zf:
+        zf.writestr("student-mat.csv", "school;G3\nGP;10\n")
+        zf.writestr("student-por.csv", "school;G3\nMS;12\n")
+    outer = io.BytesIO()
+    with zipfile.ZipFile(outer, "w") as zf:
+        zf.writestr("student.zip", inner.getvalue())
+        zf.writestr("student.txt", "attributes")
+        # Incompressible padding so the transfer spans several chunks
+        zf.writestr("padding.bin", os.urandom(300_000))
+    return outer.getvalue()
+
+
+class ArchiveServer:
+    """Serves one payload with HTTP range support, optionally dropping the first connection."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.drop_after = None
+        self.support_ranges = True
+        self.ranges = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/archive.zip":
+                    self.send_error(404)
+                    return
+                start = 0
+                header = self.headers.get("Range")
+                server.ranges.append(header)
+                if header and server.support_ranges:
+                    start = int(header.split("=")[1].split("-")[0])
+                    if start >= len(server.payload):
+                        self.send_error(416)
+                        return
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}")
+                else:
+                    self.send_response(200)
+                body = server.payload[start:]
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.drop_after is not None:
+                    # Promise the whole body, send part of it and hang up
+                    body, server.drop_after = body[:server.drop_after], None
+                    self.close_connection = True
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/archive.zip"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    server = ArchiveServer(nested_archive())
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
+
+
+def test_download_bytes_resumes_dropped_connection(server):
+    server.drop_after = 100_000
+    expected = hashlib.sha256(server.payload).hexdigest()
+    content, checksum = download_bytes(server.url, expected_sha256=expected)
+    assert content == server.payload
+    assert checksum == expected
+    assert server.ranges[0] is None and server.ranges[1].startswith("bytes=")
+
+
+def test_download_restarts_without_range_support(server):
+    server.drop_after = 100_000
+    server.support_ranges = False
+    content, _ = download_bytes(server.url)
+    assert content == server.payload
+
+
+def test_download_file_resumes_partial_file(server, tmp_path):
+    dest = tmp_path / "archive.zip"
+    (tmp_path / "archive.zip.part").write_bytes(server.payload[:123_456])
+    checksum = download_file(server.url, str(dest), expected_sha256=hashlib.sha256(server.payload).hexdigest())
+    assert dest.read_bytes() == server.payload
+    assert checksum == hashlib.sha256(server.payload).hexdigest()
+    assert server.ranges == ["bytes=123456-"]
+    assert not (tmp_path / "archive.zip.part").exists()
+
+
+def test_download_checksum_mismatch(server, tmp_path):
+    with pytest.raises(ValueError):
+        download_bytes(server.url, expected_sha256="0" * 64)
+    with pytest.raises(ValueError):
+        download_file(server.url, str(tmp_path / "archive.zip"), expected_sha256="0" * 64)
+    assert os.listdir(tmp_path) == []
+    with pytest.raises(requests.exceptions.HTTPError):
+        download_bytes(server.url.replace("archive", "missing"))
+
+
+def test_read_nested_member():
+    archive = nested_archive()
+    assert read_nested_member(archive, "student-por.csv") == b"school;G3\nMS;12\n"
+    assert read_nested_member(archive, "student.txt") == b"attributes"
+    with pytest.raises(KeyError):
+        read_nested_member(archive, "student-eng.csv")
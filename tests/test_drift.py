@@ -0,0 +1,75 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.drift import FeatureHistograms, drift_report
+
+
+@pytest.fixture
+def training():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "sex": rng.choice(["F", "M"], size=5_000),
+        "age": rng.integers(15, 20, size=5_000),
+        "failures": rng.choice(4, size=5_000, p=[0.7, 0.2, 0.07, 0.03]),
+    })
+
+
+def test_histograms_count_domain_values(tmp_path):
+    X = pd.DataFrame({"sex": ["F", "M", "F", "X", None], "age": [15, 22, 23, 15, 14]})
+    histograms = FeatureHistograms.for_columns(["sex", "age"]).update(X)
+    # Values outside the domain and missing values land in the last bin
+    np.testing.assert_array_equal(histograms.counts["sex"], [2, 1, 2])
+    np.testing.assert_array_equal(histograms.counts["age"], [2, 0, 0, 0, 0, 0, 0, 1, 2])
+
+    # Categorical and float columns give the same counts
+    same = FeatureHistograms.for_columns(["sex", "age"]).update(
+        X.astype({"sex": "category", "age": "float64"}))
+    for column in ("sex", "age"):
+        np.testing.assert_array_equal(same.counts[column], histograms.counts[column])
+
+    path = str(tmp_path / "histograms.json")
+    histograms.save(path)
+    loaded = FeatureHistograms.load(path)
+    assert loaded.domains == histograms.domains and loaded.n_rows == 5
+    np.testing.assert_array_equal(loaded.counts["age"], histograms.counts["age"])
+
+
+def test_histograms_merge_chunks(training):
+    whole = FeatureHistograms.for_columns(training.columns).update(training)
+    chunked = FeatureHistograms.for_columns(training.columns)
+    for start in range(0, len(training), 700):
+        chunked.merge(FeatureHistograms.for_columns(training.columns).update(training.iloc[start:start + 700]))
+    for column in training.columns:
+        np.testing.assert_array_equal(chunked.counts[column], whole.counts[column])
+    with pytest.raises(ValueError, match="failures"):
+        whole.update(training.drop(columns=["failures"]))
+
+
+def test_drift_report(training):
+    reference = FeatureHistograms.for_columns(training.columns).update(training)
+    rng = np.random.default_rng(1)
+    batch = training.sample(n=20_000, replace=True, random_state=1).reset_index(drop=True)
+    batch["age"] = np.minimum(batch["age"] + rng.integers(0, 3, size=len(batch)), 22)
+    current = FeatureHistograms.for_columns(training.columns).update(batch)
+    report = drift_report(reference, current).set_index("feature")
+
+    assert report.loc["age", "status"] == "drift"
+    assert report.loc["sex", "status"] == "stable" and report.loc["failures", "status"] == "stable"
+    assert report.loc["age", "ks_p_value"] < 1e-10 and report.loc["age", "chi2_p_value"] < 1e-10
+    assert np.isnan(report.loc["sex", "ks"])
+
+    # PSI and KS agree with their definitions on the age column
+    p = reference.counts["age"] / reference.n_rows
+    q = current.counts["age"] / current.n_rows
+    p_floor, q_floor = np.maximum(p, 1e-4), np.maximum(q, 1e-4)
+    assert report.loc["age", "psi"] == pytest.approx(np.sum((q_floor - p_floor) * np.log(q_floor / p_floor)))
+    assert report.loc["age", "ks"] == pytest.approx(np.abs(np.cumsum(p[:-1]) - np.cumsum(q[:-1])).max())
+
+
+def test_drift_report_needs_same_domains(training):
+    reference = FeatureHistograms.for_columns(["sex", "age"]).update(training)
+    with pytest.raises(ValueError, match="domains"):
+        drift_report(reference, FeatureHistograms.for_columns(["sex"]))
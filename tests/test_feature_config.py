@@ -0,0 +1,34 @@
+import json
+import os
+import sys
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.feature_config import feature_set_names, load_feature_set
+from src.student_schema import COLUMNS, RAW_COLUMNS
+
+
+def test_default_feature_set_matches_schema():
+    feature_set = load_feature_set("default")
+    assert feature_set["columns"] == COLUMNS
+    assert feature_set["interactions"] == []
+
+
+def test_wide_feature_set_uses_every_attribute():
+    feature_set = load_feature_set("wide")
+    assert feature_set["columns"] == RAW_COLUMNS
+    assert feature_set["interactions"] == feature_set["features"]
+    assert {"default", "wide"} <= set(feature_set_names())
+
+
+def test_invalid_feature_sets(tmp_path):
+    path = tmp_path / "features.json"
+    path.write_text(json.dumps({"target": "G3", "feature_sets": {
+        "unknown": {"features": ["sex", "height"]},
+        "outside": {"features": ["sex"], "interactions": ["age"]},
+    }}))
+    with pytest.raises(ValueError, match="unknown columns"):
+        load_feature_set("unknown", path=str(path))
+    with pytest.raises(ValueError, match="not features"):
+        load_feature_set("outside", path=str(path))
+    with pytest.raises(ValueError, match="Unknown feature set"):
+        load_feature_set("missing", path=str(path))
@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.file_cache import read_csv_cached, read_student_csv_cached, clear_csv_cache
+
+
+def test_read_csv_cached(tmp_path):
+    clear_csv_cache()
+    path = tmp_path / "raw.csv"
+    pd.DataFrame({"age": [15, 16], "G3": [10, 12]}).to_csv(path, sep=";", index=False)
+
+    first = read_csv_cached(str(path), delimiter=";")
+    first["extra"] = 1
+    second = read_csv_cached(str(path), delimiter=";")
+    # The parsed data is shared, but column changes don't leak into the cache
+    assert list(second.columns) == ["age", "G3"]
+    assert np.shares_memory(first["G3"].to_numpy(), second["G3"].to_numpy())
+
+    # A rewritten file is parsed again
+    pd.DataFrame({"age": [17, 18, 19], "G3": [1, 2, 3]}).to_csv(path, sep=";", index=False)
+    assert read_csv_cached(str(path), delimiter=";")["age"].tolist() == [17, 18, 19]
+
+
+def test_read_student_csv_cached(tmp_path):
+    clear_csv_cache()
+    path = tmp_path / "raw.csv"
+    pd.DataFrame({"sex": ["F", "M"], "age": [15, 16], "G3": [10, 12]}).to_csv(path, sep=";", index=False)
+
+    first = read_student_csv_cached(str(path), columns=["age", "G3"], delimiter=";")
+    first["extra"] = 1
+    second = read_student_csv_cached(str(path), columns=("age", "G3"), delimiter=";")
+    # The same columns in a list or a tuple share the parsed data
+    assert list(second.columns) == ["age", "G3"]
+    assert first["G3"].array is second["G3"].array
+    # Other columns are another entry
+    assert list(read_student_csv_cached(str(path), delimiter=";").columns) == ["sex", "age", "G3"]
@@ -0,0 +1,104 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.incremental_validation import update_validation_state
+
+COLUMNS = ["sex", "age", "G3"]
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        "school": "GP",
+        "sex": rng.choice(["F", "M"], 300),
+        "age": rng.integers(15, 23, 300),
+        "G3": rng.integers(0, 21, 300),
+    })
+    data.iloc[:200].to_csv(tmp_path / "raw.csv", sep=";", index=False)
+    return tmp_path / "raw.csv", data
+
+
+def append(path, rows):
+    with open(path, "a") as f:
+        rows.to_csv(f, sep=";", index=False, header=False)
+
+
+def check_state(state, data):
+    assert state.rows == len(data)
+    assert state.duplicate_rows == data[COLUMNS].duplicated().sum()
+    np.testing.assert_array_equal(state.null_counts, data[COLUMNS].isna().sum())
+    np.testing.assert_allclose(state.moments.mean, data[["age", "G3"]].mean())
+    np.testing.assert_allclose(state.comoments.correlation(), data[["age", "G3"]].corr())
+
+
+def test_incremental_run_validates_appended_rows(raw_file, tmp_path):
+    path, data = raw_file
+    state_path = str(tmp_path / "state.npz")
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS)
+    assert full and len(new_rows) == 200
+    check_state(state, data.iloc[:200])
+
+    append(path, data.iloc[200:])
+    checked = []
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS, check=checked.append)
+    assert not full and len(new_rows) == 100
+    assert checked[0].equals(new_rows)
+    check_state(state, data)
+    assert state.offset == os.path.getsize(path)
+
+
+def test_duplicates_detected_across_runs(raw_file, tmp_path):
+    path, data = raw_file
+    state_path = str(tmp_path / "state.npz")
+    update_validation_state(str(path), state_path, COLUMNS)
+    append(path, data.iloc[:10])
+    state, _, _ = update_validation_state(str(path), state_path, COLUMNS)
+    assert state.duplicate_rows == pd.concat([data.iloc[:200], data.iloc[:10]])[COLUMNS].duplicated().sum()
+
+
+def test_changed_prefix_triggers_full_run(raw_file, tmp_path):
+    path, data = raw_file
+    state_path = str(tmp_path / "state.npz")
+    update_validation_state(str(path), state_path, COLUMNS)
+    changed = data.iloc[:200].copy()
+    changed.loc[0, "G3"] = (changed.loc[0, "G3"] + 1) % 21
+    changed.to_csv(path, sep=";", index=False)
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS)
+    assert full and len(new_rows) == 200
+    check_state(state, changed)
+
+
+def test_unterminated_line_is_not_stored(raw_file, tmp_path):
+    path, data = raw_file
+    state_path = str(tmp_path / "state.npz")
+    update_validation_state(str(path), state_path, COLUMNS)
+    size = os.path.getsize(path)
+    with open(path, "a") as f:
+        f.write("GP;F;17;12")
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS)
+    assert not full and len(new_rows) == 1 and state.rows == 201
+    with open(path, "a") as f:
+        f.write("\n")
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS)
+    assert not full and len(new_rows) == 1 and state.rows == 201
+    assert state.offset == size + len("GP;F;17;12\n")
+
+
+def test_failed_check_keeps_state(raw_file, tmp_path):
+    path, data = raw_file
+    state_path = str(tmp_path / "state.npz")
+    update_validation_state(str(path), state_path, COLUMNS)
+    append(path, data.iloc[200:])
+
+    def reject(rows):
+        raise ValueError("invalid rows")
+
+    with pytest.raises(ValueError):
+        update_validation_state(str(path), state_path, COLUMNS, check=reject)
+    state, new_rows, full = update_validation_state(str(path), state_path, COLUMNS)
+    assert not full and len(new_rows) == 100
+    check_state(state, data)
@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import time
+import pstats
+import click
+from click.testing import CliRunner
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.instrumentation import Tracer, instrumentation_options
+
+
+def test_nested_spans_are_recorded():
+    tracer = Tracer()
+    with tracer.span("load") as span:
+        span.rows = 10
+        with tracer.span("parse"):
+            time.sleep(0.01)
+    tracer.record("fold 0", 0.5)
+
+    names = [span.name for span in tracer.spans]
+    assert names == ["load", "parse", "fold 0"]
+    load, parse, fold = tracer.spans
+    assert (load.depth, parse.depth, fold.depth) == (0, 1, 0)
+    assert load.rows == 10
+    assert load.wall >= parse.wall >= 0.01
+    assert load.peak_rss_mb > 0
+    assert fold.wall == 0.5
+
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer(enabled=False)
+    with tracer.span("load") as span:
+        span.rows = 3
+    tracer.record("fold 0", 0.1)
+    tracer.report(str(tmp_path / "trace.json"))
+    assert tracer.spans == []
+    assert not (tmp_path / "trace.json").exists()
+
+
+def test_chrome_trace_and_profile_output(tmp_path):
+    tracer = Tracer(profile=True)
+    with tracer.span("fast"):
+        pass
+    with tracer.span("slow", rows=5):
+        sum(i * i for i in range(200000))
+    out = tmp_path / "metrics" / "trace.json"
+    tracer.report(str(out))
+
+    trace = json.loads(out.read_text())
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [event["name"] for event in events] == ["fast", "slow"]
+    assert events[1]["args"]["rows"] == 5
+    assert events[1]["ts"] >= events[0]["ts"] + events[0]["dur"]
+
+    assert tracer.slowest_profiled_span().name == "slow"
+    stats = pstats.Stats(str(tmp_path / "metrics" / "trace.prof"))
+    assert stats.total_calls > 0
+
+
+def test_instrumentation_options():
+    @click.command()
+    @instrumentation_options
+    def command(profile, metrics_out):
+        click.echo(f"{profile} {metrics_out}")
+
+    result = CliRunner().invoke(command, ["--profile", "--metrics-out", "trace.json"])
+    assert result.output.strip() == "True trace.json"
+    result = CliRunner().invoke(command, [])
+    assert result.output.strip() == "False None"
@@ -0,0 +1,50 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, PolynomialFeatures
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.interactions import OneHotCrosses
+
+
+def students(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sex": rng.choice(["F", "M"], n),
+        "Mjob": rng.choice(["at_home", "health", "other", "services", "teacher"], n),
+        "age": rng.integers(15, 23, n),
+    })
+
+
+def test_matches_polynomial_features_without_same_column_pairs():
+    X = students(300)
+    expected_pipeline = make_pipeline(
+        OneHotEncoder(handle_unknown="infrequent_if_exist", sparse_output=True),
+        PolynomialFeatures(degree=2, interaction_only=True, include_bias=False),
+    ).fit(X)
+    expected = expected_pipeline.transform(X).tocsc()
+    expected_names = list(expected_pipeline.get_feature_names_out())
+
+    crosses = OneHotCrosses().fit(X)
+    transformed = crosses.transform(X)
+    names = list(crosses.get_feature_names_out())
+    # Only the pairs of values of one column are missing, and they were all zero
+    dropped = [name for name in expected_names if name not in names]
+    assert len(dropped) == 1 + 10 + 28
+    assert all(expected[:, expected_names.index(name)].nnz == 0 for name in dropped)
+    kept = [expected_names.index(name) for name in names]
+    np.testing.assert_array_equal(transformed.toarray(), expected[:, kept].toarray())
+
+
+def test_unknown_and_infrequent_values():
+    X = students(300)
+    # A rare age, grouped into the infrequent category of the column
+    X.loc[:4, "age"] = 30
+    crosses = OneHotCrosses(min_frequency=20, dtype=np.float32).fit(X)
+    new = pd.DataFrame({"sex": ["F", "X"], "Mjob": ["teacher", "health"], "age": [99, 15]})
+    transformed = crosses.transform(new)
+    assert transformed.dtype == np.float32
+    # The unknown sex has no value, so none of its crosses is set; the unknown age is infrequent
+    assert transformed[1].nnz == 2 + 1
+    assert transformed[0].nnz == 3 + 3
@@ -26,16 +26,6 @@ def sample_csv(tmp_path):
 def test_load_data_valid_csv(sample_csv):
     load_df = load_valid_data(sample_csv)
     expected_columns = ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc", "G3"]
-    expected_dtypes = {
-        "sex": "object",
-        "age": "int64",
-        "studytime": "int64",
-        "failures": "int64",
-        "goout": "int64",
-        "Dalc": "int64",
-        "Walc": "int64",
-        "G3": "int64"
-    }
     
     # Test column names
     assert list(load_df.columns) == expected_columns
@@ -52,6 +42,23 @@ def test_load_data_valid_csv(sample_csv):
     # Test unique values in sex column
     assert set(load_df["sex"]) == {"F", "M"}
 
+
+def test_load_data_arrow_dtypes(sample_csv):
+    # The dtypes of the pyarrow read path; without pyarrow the file is read by pd.read_csv
+    pa = pytest.importorskip("pyarrow")
+    load_df = load_valid_data(sample_csv)
+    integer = pd.ArrowDtype(pa.int64())
+    expected_dtypes = {
+        "sex": "category",
+        "age": integer,
+        "studytime": integer,
+        "failures": integer,
+        "goout": integer,
+        "Dalc": integer,
+        "Walc": integer,
+        "G3": integer
+    }
+
     # Test data types of each column
     for column, dtype in expected_dtypes.items():
         assert load_df[column].dtype == dtype
@@ -71,4 +78,19 @@ def test_load_data_not_csv(tmp_path):
     txt_file.touch()
     
     with pytest.raises(ValueError):
-        load_valid_data(str(txt_file))
\ No newline at end of file
+        load_valid_data(str(txt_file))
+
+def test_load_data_subject_from_merged(tmp_path):
+    merged_file = tmp_path / "student-merged.csv"
+    df = pd.DataFrame({
+        "sex": ["F", "M"],
+        "age": [15, 16],
+        **{f"{column}_{subject}": [1, 2] for subject in ["mat", "por"]
+           for column in ["studytime", "failures", "goout", "Dalc", "Walc", "G3"]},
+    })
+    df["G3_por"] = [12, 14]
+    df.to_csv(merged_file, sep=";", index=False)
+
+    load_df = load_valid_data(str(merged_file), subject="por")
+    assert list(load_df.columns) == ["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc", "G3"]
+    assert load_df["G3"].tolist() == [12, 14]
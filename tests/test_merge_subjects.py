@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import src.merge_subjects as merge_module
+from src.merge_subjects import MERGE_KEYS, merge_subjects, merge_subject_chunks, merge_subject_files
+
+ZIP_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'zip')
+
+
+@pytest.fixture
+def subjects():
+    mat = pd.DataFrame({
+        "school": ["GP", "GP", "MS", "GP", "MS"],
+        "age": [15, 16, 17, 15, 18],
+        "G3": [10, 12, 14, 11, 9],
+    })
+    por = pd.DataFrame({
+        "school": ["GP", "MS", "GP", "GP"],
+        "age": [15, 17, 15, 19],
+        "G3": [13, 15, 16, 8],
+    })
+    return mat, por
+
+
+def test_merge_subjects_matches_pandas(subjects):
+    mat, por = subjects
+    merged = merge_subjects(mat, por, keys=["school", "age"])
+    expected = mat.merge(por, on=["school", "age"], suffixes=("_mat", "_por"))
+    assert list(merged.columns) == ["school", "age", "G3_mat", "G3_por"]
+    # Duplicated keys on both sides give every pair
+    assert len(merged) == 5
+    # Rows follow the order of mat
+    assert merged["G3_mat"].tolist() == [10, 10, 14, 11, 11]
+    columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        merged.sort_values(columns, ignore_index=True), expected.sort_values(columns, ignore_index=True)
+    )
+
+
+def test_merge_subject_chunks(subjects):
+    mat, por = subjects
+    chunks = (mat[i:i + 2] for i in range(0, len(mat), 2))
+    merged = pd.concat(merge_subject_chunks(chunks, por, keys=["school", "age"]), ignore_index=True)
+    pd.testing.assert_frame_equal(merged, merge_subjects(mat, por, keys=["school", "age"]))
+
+
+def test_hash_collisions_are_dropped(subjects, monkeypatch):
+    mat, por = subjects
+    expected = merge_subjects(mat, por, keys=["school", "age"])
+    # Every row gets the same hash, so only the key check separates students
+    monkeypatch.setattr(merge_module, "hash_keys", lambda data, keys: np.zeros(len(data), dtype=np.uint64))
+    pd.testing.assert_frame_equal(merge_subjects(mat, por, keys=["school", "age"]), expected)
+
+
+@pytest.mark.skipif(not os.path.isfile(os.path.join(ZIP_DIR, "student-por.csv")), reason="UCI data not extracted")
+def test_merge_subject_files_matches_r_script():
+    merged = merge_subject_files(
+        os.path.join(ZIP_DIR, "student-mat.csv"), os.path.join(ZIP_DIR, "student-por.csv"), chunksize=100
+    )
+    # student-merge.R reports 382 students
+    assert merged.shape == (382, 53)
+    assert list(merged.columns[:len(MERGE_KEYS)]) == MERGE_KEYS
+    assert {"G3_mat", "G3_por"} <= set(merged.columns)
@@ -0,0 +1,110 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import KFold, cross_val_score
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.model_search import best_candidate, make_candidates, successive_halving_search
+from src.preprocessor import create_preprocessor
+
+
+@pytest.fixture
+def students():
+    rng = np.random.default_rng(0)
+    n = 270
+    X = pd.DataFrame({
+        "sex": rng.choice(["F", "M"], n),
+        "age": rng.integers(15, 23, n),
+        "studytime": rng.integers(1, 5, n),
+        "failures": rng.integers(0, 4, n),
+    })
+    y = pd.Series(2 * X["studytime"] - 1.5 * X["failures"] - (X["sex"] == "M") + rng.normal(0, 1, n), name="G3")
+    return X, y
+
+
+def test_single_round_matches_cross_validation(students):
+    X, y = students
+    candidates = make_candidates(create_preprocessor(X), ["ridge", "lasso"], random_state=0)
+    result = successive_halving_search(candidates, X, y, min_resources=len(X), random_state=1)
+    assert result.n_resources_ == [len(X)]
+    assert result.n_candidates_ == [len(candidates)]
+
+    order = np.random.default_rng(1).permutation(len(X))
+    for params, score in zip(result.cv_results_["params"], result.cv_results_["mean_test_score"]):
+        family, pipeline, _ = next(c for c in candidates if c[2] == params)
+        expected = cross_val_score(pipeline.set_params(**params), X.iloc[order], y.iloc[order], cv=KFold(5),
+                                   scoring="neg_mean_squared_error")
+        assert score == pytest.approx(expected.mean())
+    assert result.best_score_ == max(result.cv_results_["mean_test_score"])
+
+    # The folds of the search, on the original row positions
+    family, pipeline, params = next(c for c in candidates if c[2] == result.best_params_)
+    expected = cross_val_score(pipeline.set_params(**params), X, y, cv=result.folds_,
+                               scoring="neg_mean_squared_error")
+    assert result.best_score_ == pytest.approx(expected.mean())
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_successive_halving(students, n_jobs):
+    X, y = students
+    candidates = make_candidates(create_preprocessor(X), random_state=0)
+    result = successive_halving_search(candidates, X, y, factor=3, min_resources=30, random_state=1, n_jobs=n_jobs)
+    # 23 candidates need 3 rounds; the last one uses all rows
+    assert result.n_resources_ == [30, 90, 270]
+    assert result.n_candidates_ == [23, 8, 3]
+    assert not result.timed_out_
+
+    # The winner is the best of the last round, refitted on all rows
+    last = result.cv_results_["iter"] == 2
+    assert result.best_score_ == np.nanmax(result.cv_results_["mean_test_score"][last])
+    assert result.best_estimator_.steps[-1][0] == result.best_model_
+    assert result.best_estimator_.predict(X).shape == (len(X),)
+
+    leaderboard = result.leaderboard()
+    assert len(leaderboard) == len(candidates)
+    assert leaderboard.index[0] == 1
+    assert list(leaderboard["n_resources"][:3]) == [270] * 3
+    assert leaderboard.columns[0] == "mean_test_score"
+
+
+def test_best_candidate_of_saved_leaderboard(students, tmp_path):
+    X, y = students
+    candidates = make_candidates(create_preprocessor(X), ["ridge", "elasticnet"], random_state=0)
+    result = successive_halving_search(candidates, X, y, min_resources=len(X), random_state=1)
+    # Read back as notebooks/report.qmd reads grid_search_results.csv
+    path = tmp_path / "grid_search_results.csv"
+    result.leaderboard().to_csv(path)
+    family, params, score = best_candidate(pd.read_csv(path))
+    assert family == result.best_model_
+    assert {f"{family}__{name}": value for name, value in params.items()} == result.best_params_
+    assert score == pytest.approx(result.best_score_)
+
+
+def test_best_candidate_of_grid_search_results():
+    # Layout of the Ridge grid search results written by fit_model.py
+    results = pd.DataFrame({
+        "rank_test_score": [1, 2],
+        "mean_test_score": [-4.5, -4.9],
+        "param_ridge__alpha": [10.0, 1.0],
+        "mean_fit_time": [0.01, 0.01],
+    })
+    assert best_candidate(results) == ("ridge", {"alpha": 10.0}, -4.5)
+
+
+def test_failed_fits_rank_last(students):
+    X, y = students
+    candidates = make_candidates(create_preprocessor(X), ["kneighborsregressor"])
+    # Folds of 30 rows train on 24, fewer than 45 neighbors
+    with pytest.warns(UserWarning, match="scored as NaN"):
+        result = successive_halving_search(candidates, X.iloc[:30], y.iloc[:30], min_resources=30)
+    scores = result.cv_results_["mean_test_score"]
+    assert np.isnan(scores[-1])
+    assert result.cv_results_["rank_test_score"][-1] == len(candidates)
+
+
+def test_time_budget(students):
+    X, y = students
+    candidates = make_candidates(create_preprocessor(X), ["ridge"])
+    with pytest.raises(TimeoutError):
+        successive_halving_search(candidates, X, y, time_budget=0)
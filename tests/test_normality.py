@@ -0,0 +1,49 @@
+import os
+import sys
+import numpy as np
+import pytest
+from scipy.stats import kurtosis, normaltest, skew
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.normality import (anderson_darling, dagostino_k2, integer_histogram, normality_test,
+                           stratified_sample)
+
+
+@pytest.mark.parametrize("n", [20, 500, 100_000])
+def test_dagostino_k2_matches_scipy(n):
+    rng = np.random.default_rng(n)
+    for x in (rng.normal(size=n), rng.exponential(size=n)):
+        statistic, p = dagostino_k2(n, skew(x), kurtosis(x))
+        expected = normaltest(x)
+        np.testing.assert_allclose([statistic, p], [expected.statistic, expected.pvalue], rtol=1e-9, atol=1e-300)
+
+
+def test_dagostino_k2_needs_eight_observations():
+    with pytest.raises(ValueError):
+        dagostino_k2(7, 0.0, 0.0)
+
+
+def test_anderson_darling():
+    rng = np.random.default_rng(0)
+    _, p_normal = anderson_darling(rng.normal(size=2000))
+    _, p_exponential = anderson_darling(rng.exponential(size=2000))
+    assert p_normal > 0.05
+    assert p_exponential < 1e-6
+
+
+def test_stratified_sample_follows_histogram():
+    counts = integer_histogram([0, 0, 0, 1, 2, 2, 5], (0, 5))
+    np.testing.assert_array_equal(counts, [3, 1, 2, 0, 0, 1])
+    sample = stratified_sample(counts * 1000, np.arange(6), size=700)
+    np.testing.assert_array_equal(np.bincount(sample, minlength=6), [300, 100, 200, 0, 0, 100])
+    assert len(stratified_sample(counts, np.arange(6), size=4)) == 4
+
+
+def test_normality_test_switches_to_moments_on_large_data():
+    rng = np.random.default_rng(0)
+    grades = np.clip(np.round(rng.normal(10, 3, 20_000)), 0, 20)
+    small = normality_test(grades[:1000], domain=(0, 20))
+    large = normality_test(grades, domain=(0, 20))
+    assert small["test"] == "Shapiro-Wilk" and small["n_samples"] == 1000
+    assert large["test"] == "D'Agostino K²" and large["n_samples"] == 20_000
+    assert large["anderson_samples"] == 5000
+    assert large["counts"].sum() == 20_000 and len(large["edges"]) == 22
@@ -0,0 +1,89 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.drift import FeatureHistograms
+from src.packed_records import PackedLayout, iter_packed, read_packed, write_packed
+from src.student_schema import COLUMNS, FEATURES
+from src.synthetic_data import fit_student_profile, generate_student_data, write_student_packed
+
+RAW_DATA = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'student-mat.csv')
+
+
+@pytest.fixture(scope="module")
+def data():
+    profile = fit_student_profile(pd.read_csv(RAW_DATA, delimiter=";"))
+    return profile, generate_student_data(profile, 50_000, seed=5)[COLUMNS]
+
+
+def test_layout_fields():
+    layout = PackedLayout()
+    assert layout.bits == {"sex": 1, "age": 3, "studytime": 2, "failures": 3, "goout": 3, "Dalc": 3, "Walc": 3,
+                           "G3": 5}
+    assert layout.shifts["age"] == 1 and layout.shifts["G3"] == 18
+    assert layout.total_bits == 23 and layout.dtype == np.uint32
+    assert PackedLayout(["sex", "studytime"]).dtype == np.uint8
+    assert PackedLayout.from_dict(layout.to_dict()).to_dict() == layout.to_dict()
+    with pytest.raises(ValueError):
+        PackedLayout(["sex", "unknown"])
+
+
+def test_encode_decode_round_trip(data):
+    _, frame = data
+    layout = PackedLayout()
+    records = layout.encode(frame)
+    decoded = layout.decode(records)
+    pd.testing.assert_frame_equal(decoded.astype({"sex": object}), frame.reset_index(drop=True))
+    np.testing.assert_array_equal(layout.codes(records, "G3"), frame["G3"].to_numpy())
+    # Categorical input packs the same
+    np.testing.assert_array_equal(layout.encode(decoded), records)
+    pd.testing.assert_frame_equal(layout.decode(records, columns=["G3", "sex"]), decoded[["G3", "sex"]])
+
+
+def test_encode_rejects_values_outside_the_domain(data):
+    _, frame = data
+    layout = PackedLayout()
+    with pytest.raises(ValueError, match="age"):
+        layout.encode(frame.head().assign(age=23))
+    with pytest.raises(ValueError, match="sex"):
+        layout.encode(frame.head().assign(sex="X"))
+    with pytest.raises(ValueError, match="G3"):
+        layout.encode(frame.head().drop(columns="G3"))
+
+
+def test_write_read_packed(data, tmp_path):
+    _, frame = data
+    chunks = (frame.iloc[start:start + 12_000] for start in range(0, len(frame), 12_000))
+    layout = write_packed(str(tmp_path / "chunks"), chunks, n_rows=len(frame))
+    records, read_layout = read_packed(str(tmp_path / "chunks"))
+    assert isinstance(records, np.memmap) and read_layout.to_dict() == layout.to_dict()
+    np.testing.assert_array_equal(records, layout.encode(frame))
+
+    decoded = pd.concat(iter_packed(str(tmp_path / "chunks"), 7_000, columns=FEATURES))
+    pd.testing.assert_frame_equal(decoded.astype({"sex": object}), frame[FEATURES].reset_index(drop=True))
+
+    with pytest.raises(ValueError):
+        write_packed(str(tmp_path / "short"), iter([frame]), n_rows=len(frame) + 1)
+    with pytest.raises(FileNotFoundError):
+        read_packed(str(tmp_path / "missing"))
+
+
+def test_write_student_packed_matches_generated_rows(data, tmp_path):
+    profile, frame = data
+    layout = write_student_packed(profile, str(tmp_path / "synthetic"), len(frame), seed=5, chunk_size=20_000)
+    records, _ = read_packed(str(tmp_path / "synthetic"))
+    np.testing.assert_array_equal(records, layout.encode(frame))
+
+
+def test_histograms_of_packed_records(data):
+    _, frame = data
+    layout = PackedLayout()
+    records = layout.encode(frame)
+    packed = FeatureHistograms.for_columns(FEATURES).update_packed(records, layout)
+    expected = FeatureHistograms.for_columns(FEATURES).update(frame)
+    for column in FEATURES:
+        np.testing.assert_array_equal(packed.counts[column], expected.counts[column])
+    with pytest.raises(ValueError):
+        FeatureHistograms.for_columns(["absences"]).update_packed(records, layout)
@@ -0,0 +1,81 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import make_column_transformer
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, PolynomialFeatures, StandardScaler
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import src.permutation_importance as permutation_module
+from src.permutation_importance import permutation_importance
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 2000
+    X = pd.DataFrame({
+        "studytime": rng.integers(1, 5, n),
+        "failures": rng.integers(0, 4, n),
+        "sex": rng.choice(["F", "M"], n),
+        "unused": rng.normal(size=n),
+    })
+    y = 2 * X["studytime"] - 3 * X["failures"] + (X["sex"] == "M") + rng.normal(0, 0.5, n)
+    return X, y
+
+
+def fit_pipeline(X, y, numeric_transformer):
+    preprocessor = make_column_transformer(
+        (numeric_transformer, ["studytime", "failures"]),
+        (OneHotEncoder(drop="if_binary", sparse_output=False), ["sex"]),
+    )
+    return make_pipeline(preprocessor, Ridge()).fit(X, y)
+
+
+def raw_importance(monkeypatch, pipeline, X, y, **kwargs):
+    # Score every column through the whole pipeline
+    monkeypatch.setattr(permutation_module, "_encoded_outputs",
+                        lambda transform, X, encoded, seed: {p: None for p in range(X.shape[1])})
+    return permutation_importance(pipeline, X, y, **kwargs)
+
+
+def test_permutation_importance_ranks_columns(data):
+    X, y = data
+    importance = permutation_importance(fit_pipeline(X, y, StandardScaler()), X, y, n_repeats=3)
+    assert importance["feature"].tolist()[:3] == ["failures", "studytime", "sex"]
+    assert importance.set_index("feature").loc["unused", "importance_mean"] == 0
+
+
+def test_encoded_path_matches_raw_path(data, monkeypatch):
+    X, y = data
+    pipeline = fit_pipeline(X, y, StandardScaler())
+    encoded = permutation_importance(pipeline, X, y, n_repeats=2)
+    raw = raw_importance(monkeypatch, pipeline, X, y, n_repeats=2)
+    pd.testing.assert_frame_equal(encoded, raw, rtol=1e-9)
+
+
+def test_interaction_columns_use_raw_path(data, monkeypatch):
+    X, y = data
+    pipeline = fit_pipeline(X, y, PolynomialFeatures(degree=2))
+    encoded = pipeline[:-1].transform(X)
+    outputs = permutation_module._encoded_outputs(pipeline[:-1], X, encoded, 0)
+    assert outputs[0] is None and outputs[1] is None
+    assert len(outputs[2]) == 1 and len(outputs[3]) == 0
+    pd.testing.assert_frame_equal(permutation_importance(pipeline, X, y, n_repeats=2),
+                                  raw_importance(monkeypatch, pipeline, X, y, n_repeats=2), rtol=1e-9)
+
+
+def test_permutation_importance_independent_of_chunks_and_workers(data):
+    X, y = data
+    pipeline = fit_pipeline(X, y, StandardScaler())
+    importance = permutation_importance(pipeline, X, y, n_repeats=2)
+    assert importance.equals(permutation_importance(pipeline, X, y, n_repeats=2, max_memory_mb=0.01))
+    assert importance.equals(permutation_importance(pipeline, X, y, n_repeats=2, n_jobs=2))
+
+
+def test_permutation_importance_length_mismatch(data):
+    X, y = data
+    with pytest.raises(ValueError):
+        permutation_importance(fit_pipeline(X, y, StandardScaler()), X, y[:-1])
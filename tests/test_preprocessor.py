@@ -1,9 +1,11 @@
 # test_preprocessor.py
+import numpy as np
 import pandas as pd
 import os
 import sys
+from scipy import sparse as sp
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.preprocessor import create_preprocessor, transform_to_dataframe
+from src.preprocessor import create_preprocessor, create_wide_preprocessor, transform_to_dataframe, feature_names
 
 def test_create_preprocessor():
     """
@@ -96,6 +98,79 @@ def test_duplicate_columns():
     assert transformed_df.shape[0] == X_train.shape[0]
     print("Test passed: Duplicate columns processed successfully.")
 
+def test_float32_output():
+    """
+    Test that the float32 option keeps the same values at half the precision.
+    """
+    X_train = pd.DataFrame({
+        "sex": ["M", "F", "M", "F"],
+        "age": [15, 16, 15, 17],
+        "Mjob": ["at_home", "health", "other", "health"],
+    })
+    default = create_preprocessor(X_train).fit_transform(X_train)
+    preprocessor = create_preprocessor(X_train, dtype=np.float32)
+    transformed = preprocessor.fit_transform(X_train)
+    assert transformed.dtype == np.float32
+    np.testing.assert_allclose(transformed, default, rtol=1e-6)
+    assert list(feature_names(preprocessor)) == list(create_preprocessor(X_train).fit(X_train).get_feature_names_out())
+
+def test_sparse_output():
+    """
+    Test that the sparse option returns a CSR matrix and a sparse-backed DataFrame.
+    """
+    X_train = pd.DataFrame({
+        "age": [15, 16, 15, 17],
+        "Fjob": ["teacher", "other", "other", "services"],
+    })
+    preprocessor = create_preprocessor(X_train, sparse=True)
+    transformed = preprocessor.fit_transform(X_train)
+    assert sp.issparse(transformed)
+    transformed_df = transform_to_dataframe(preprocessor, X_train, transformed)
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in transformed_df.dtypes)
+    np.testing.assert_allclose(transformed_df.sparse.to_dense().to_numpy(), transformed.toarray())
+
+def test_transform_to_dataframe_without_copy():
+    """
+    Test that dense output is wrapped without copying and feature names are cached per fit.
+    """
+    X_train = pd.DataFrame({"age": [15, 16, 17], "city": ["A", "B", "A"]})
+    preprocessor = create_preprocessor(X_train)
+    transformed = preprocessor.fit_transform(X_train)
+    transformed_df = transform_to_dataframe(preprocessor, X_train, transformed)
+    assert np.shares_memory(transformed_df.to_numpy(), transformed)
+    assert feature_names(preprocessor) is feature_names(preprocessor)
+
+    # Refitting on different columns invalidates the cached names
+    X_other = pd.DataFrame({"age": [15, 16, 17], "city": ["A", "B", "C"]})
+    preprocessor.fit(X_other)
+    assert len(feature_names(preprocessor)) == 4
+
+def test_create_wide_preprocessor():
+    """
+    Interactions of the one-hot encoded values come out sparse, one nonzero per pair of columns.
+    """
+    X_train = pd.DataFrame({
+        "sex": ["M", "F", "M", "F", "M"],
+        "Mjob": ["health", "other", "other", "at_home", "health"],
+        "age": [15, 16, 15, 17, 16],
+        "studytime": [2, 3, 2, 4, 1],
+    })
+    preprocessor = create_wide_preprocessor(X_train, ["sex", "Mjob", "age"],
+                                            verbose_feature_names_out=False)
+    transformed = preprocessor.fit_transform(X_train)
+    assert sp.issparse(transformed)
+
+    names = list(preprocessor.get_feature_names_out())
+    # 2 + 3 + 3 one-hot columns and the products of values of different columns, after the scaled numeric columns
+    assert len(names) == 2 + 8 + (2 * 3 + 2 * 3 + 3 * 3)
+    assert "sex_F sex_M" not in names
+    assert names[:2] == ["age", "studytime"]
+    assert "sex_M Mjob_health" in names
+    column = names.index("sex_M Mjob_health")
+    np.testing.assert_array_equal(transformed[:, column].toarray().ravel(), [1, 0, 0, 0, 1])
+    # Scaled columns, 3 one-hot values and 3 pairs among them per row
+    assert transformed[0].nnz == 2 + 3 + 3
+
 if __name__ == "__main__":
     test_create_preprocessor()
     test_mixed_data_types()
@@ -103,6 +178,7 @@ if __name__ == "__main__":
     test_no_numeric_data()
     test_no_categorical_data()
     test_duplicate_columns()
-
-
-
+    test_float32_output()
+    test_sparse_output()
+    test_transform_to_dataframe_without_copy()
+    test_create_wide_preprocessor()
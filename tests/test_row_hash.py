@@ -0,0 +1,22 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.row_hash import hash_keys
+
+
+def test_hash_keys():
+    data = pd.DataFrame({
+        "school": ["GP", "GP", "MS", "GP", "MS"],
+        "age": [15, 16, 17, 15, 18],
+        "G3": [10, 12, 14, 11, 9],
+    })
+    hashes = hash_keys(data, keys=["school", "age"])
+    assert hashes.dtype == np.uint64
+    assert hashes[0] == hashes[3] and len(set(hashes)) == 4
+    # Hashes only depend on the row values
+    assert (hash_keys(data[3:], keys=["school", "age"]) == hashes[3:]).all()
+    with pytest.raises(ValueError):
+        hash_keys(data, keys=["missing"])
@@ -0,0 +1,54 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.pipeline import make_pipeline
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.preprocessor import create_preprocessor
+from src.seed_stability import ridge_seed_stability, seed_groups, summarize_stability
+from src.shared_cv import encode_once
+from src.synthetic_data import generate_student_data, profile_from_schema
+
+
+@pytest.fixture(scope="module")
+def student_data():
+    data = generate_student_data(profile_from_schema(), 400, seed=0)
+    return data[["sex", "age", "studytime", "failures", "goout", "Dalc", "Walc"]], data["G3"]
+
+
+def test_seed_groups_match_fit_model_splits():
+    groups = seed_groups(103, seeds=[3, 4], test_size=0.2, cv=5)
+    assert groups.shape == (2, 103)
+    _, test_pos = train_test_split(np.arange(103), test_size=0.2, random_state=4)
+    np.testing.assert_array_equal(np.flatnonzero(groups[1] == 5), np.sort(test_pos))
+    # Folds split the training rows evenly
+    assert sorted(np.bincount(groups[0])[:5]) == [16, 16, 16, 17, 17]
+
+
+def test_ridge_seed_stability_matches_grid_search(student_data):
+    X, y = student_data
+    alphas = [0.1, 1, 10, 100]
+    preprocessor = create_preprocessor(X)
+    matrix, _, n_numeric = encode_once(preprocessor, X)
+    results = ridge_seed_stability(matrix, y, n_numeric, alphas, seeds=[5, 6, 7])
+
+    for row in results.itertuples():
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=row.seed)
+        search = GridSearchCV(make_pipeline(create_preprocessor(X_train), Ridge()), {"ridge__alpha": alphas},
+                              cv=5, scoring="neg_mean_squared_error").fit(X_train, y_train)
+        assert row.alpha == search.best_params_["ridge__alpha"]
+        assert row.cv_mse == pytest.approx(-search.best_score_, rel=1e-10)
+        assert row.test_mse == pytest.approx(mean_squared_error(y_test, search.predict(X_test)), rel=1e-10)
+
+
+def test_summarize_stability():
+    results = pd.DataFrame({"seed": [1, 2, 3, 4], "alpha": [1.0, 10.0, 10.0, 10.0],
+                            "cv_mse": [1.0, 2.0, 3.0, 4.0], "test_mse": [4.0, 4.0, 6.0, 6.0]})
+    results["test_rmse"] = np.sqrt(results["test_mse"])
+    summary = summarize_stability(results)
+    assert summary.loc["test_mse", "mean"] == 5.0 and summary.loc["test_mse", "median"] == 5.0
+    assert summary.loc["alpha=1", "share"] == 0.25 and summary.loc["alpha=10", "share"] == 0.75
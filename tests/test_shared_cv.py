@@ -0,0 +1,77 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.dummy import DummyRegressor
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV, cross_validate
+from sklearn.pipeline import make_pipeline
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.preprocessor import create_preprocessor
+from src.shared_cv import encode_once, SharedFoldData
+
+
+@pytest.fixture
+def students():
+    rng = np.random.default_rng(0)
+    n = 120
+    X = pd.DataFrame({
+        "sex": rng.choice(["F", "M"], n),
+        "Mjob": rng.choice(["at_home", "health", "other"], n),
+        "age": rng.integers(15, 23, n),
+        "studytime": rng.integers(1, 5, n),
+    })
+    y = pd.Series(2 * X["studytime"] - (X["sex"] == "M") + rng.normal(0, 1, n), name="G3")
+    return X, y
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_grid_search_matches_gridsearchcv(students, n_jobs):
+    X, y = students
+    preprocessor = create_preprocessor(X)
+    param_grid = {"ridge__alpha": [0.1, 10]}
+    expected = GridSearchCV(make_pipeline(preprocessor, Ridge()), param_grid, cv=5,
+                            scoring="neg_mean_squared_error", return_train_score=True).fit(X, y)
+
+    matrix, fold_preprocessor, _ = encode_once(preprocessor, X)
+    with SharedFoldData(matrix, y, cv=5) as fold_data:
+        result = fold_data.grid_search(make_pipeline(fold_preprocessor, Ridge()), param_grid,
+                                       scoring="neg_mean_squared_error", return_train_score=True,
+                                       n_jobs=n_jobs)
+        path = fold_data.path
+    assert not os.path.exists(path)
+
+    assert set(result.cv_results_) == set(expected.cv_results_)
+    for key, values in expected.cv_results_.items():
+        if key == "params":
+            assert result.cv_results_[key] == values
+        elif "time" not in key:
+            np.testing.assert_allclose(np.asarray(result.cv_results_[key], float), np.asarray(values, float))
+    assert result.best_params_ == expected.best_params_
+
+    result.refit(make_pipeline(preprocessor, Ridge()), X, y)
+    np.testing.assert_allclose(result.best_estimator_.predict(X), expected.best_estimator_.predict(X))
+
+
+def test_cross_validate_matches_sklearn(students):
+    X, y = students
+    matrix, _, _ = encode_once(create_preprocessor(X), X)
+    with SharedFoldData(matrix, y, cv=5) as fold_data:
+        scores = fold_data.cross_validate(DummyRegressor(), return_train_score=True)
+    expected = cross_validate(DummyRegressor(), X, y, cv=5, return_train_score=True)
+    np.testing.assert_allclose(scores["test_score"], expected["test_score"])
+    np.testing.assert_allclose(scores["train_score"], expected["train_score"])
+    assert len(scores["fit_time"]) == 5
+
+
+def test_encode_once(students):
+    X, _ = students
+    matrix, _, n_numeric = encode_once(create_preprocessor(X, dtype=np.float32), X)
+    # 2 numeric columns, then sex (binary, one column) and 3 Mjob columns
+    assert matrix.shape == (len(X), 6)
+    assert n_numeric == 2
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix[:, 0], X["age"])
+    with pytest.raises(ValueError):
+        encode_once(create_preprocessor(X, sparse=True), X)
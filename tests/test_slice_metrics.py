@@ -0,0 +1,71 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src import slice_metrics as slices_module
+from src.slice_metrics import grouping_sets, slice_metrics
+
+
+@pytest.fixture
+def evaluated():
+    rng = np.random.default_rng(0)
+    n = 3_000
+    X = pd.DataFrame({
+        "sex": rng.choice(["F", "M"], size=n),
+        "age": rng.integers(15, 23, size=n),
+        "failures": rng.integers(0, 4, size=n),
+        "studytime": pd.Categorical(rng.integers(1, 5, size=n)),
+    })
+    y_true = rng.integers(0, 21, size=n).astype(float)
+    noise = np.where((X["sex"] == "M") & (X["failures"] == 3), 8.0, 2.0)
+    y_pred = y_true + rng.normal(0, noise)
+    return X, y_true, y_pred
+
+
+def test_grouping_sets():
+    assert grouping_sets(["a", "b", "c"], max_order=2) == [("a",), ("b",), ("c",), ("a", "b"), ("a", "c"), ("b", "c")]
+    assert len(grouping_sets(["a", "b", "c", "d"])) == 15
+
+
+def test_slice_metrics_match_groupby(evaluated):
+    X, y_true, y_pred = evaluated
+    result = slice_metrics(X, y_true, y_pred, sets=[("sex",), ("age", "failures")])
+    assert result.iloc[0]["slice"] == "(all)"
+    assert result.iloc[0]["mse"] == pytest.approx(np.mean((y_pred - y_true) ** 2))
+
+    errors = X.assign(squared=(y_pred - y_true) ** 2, absolute=np.abs(y_pred - y_true), bias=y_pred - y_true)
+    expected = errors.groupby(["age", "failures"]).agg(count=("bias", "size"), mse=("squared", "mean"),
+                                                      mae=("absolute", "mean"), bias=("bias", "mean"))
+    actual = result[result["grouping"] == "age, failures"]
+    assert actual["slice"].tolist() == [f"age={age}, failures={failures}" for age, failures in expected.index]
+    np.testing.assert_array_equal(actual["count"], expected["count"])
+    for column in ("mse", "mae", "bias"):
+        np.testing.assert_allclose(actual[column], expected[column], rtol=1e-12)
+    assert result[result["grouping"] == "sex"]["slice"].tolist() == ["sex=F", "sex=M"]
+
+
+def test_slice_metrics_flags_worse_slices(evaluated):
+    X, y_true, y_pred = evaluated
+    result = slice_metrics(X, y_true, y_pred, min_count=30)
+    flagged = result[result["worse"]]
+    assert "sex=M, failures=3" in flagged["slice"].tolist()
+    # Only slices overlapping the noisy subgroup are worse
+    assert not flagged["slice"].str.contains("sex=F|failures=[012]").any()
+    # Small slices are reported but not tested
+    small = result["count"] < 30
+    assert small.any() and result.loc[small, "p_value"].isna().all() and not result.loc[small, "worse"].any()
+
+
+def test_slice_metrics_compressed_keys(evaluated, monkeypatch):
+    X, y_true, y_pred = evaluated
+    expected = slice_metrics(X, y_true, y_pred)
+    monkeypatch.setattr(slices_module, "MAX_DENSE_CELLS", 4)
+    pd.testing.assert_frame_equal(slice_metrics(X, y_true, y_pred), expected)
+
+
+def test_slice_metrics_unknown_column(evaluated):
+    X, y_true, y_pred = evaluated
+    with pytest.raises(ValueError, match="Walc"):
+        slice_metrics(X, y_true, y_pred, sets=[("sex", "Walc")])
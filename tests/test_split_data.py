@@ -1,9 +1,16 @@
+import numpy as np
 import pandas as pd
 import pytest
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.split_data import split_train_test
+from src.split_data import (
+    split_train_test,
+    split_indices,
+    take_rows,
+    save_split_indices,
+    load_split_indices,
+)
 
 # Fixture for generating test data
 @pytest.fixture
@@ -48,4 +55,59 @@ def test_split_train_test_invalid_test_size(sample_data):
         split_train_test(sample_data, "target", test_size=-0.5)
 
 
+@pytest.fixture
+def grades():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "school": rng.choice(["GP", "MS"], size=1000, p=[0.85, 0.15]),
+        "G3": rng.integers(0, 21, size=1000),
+    })
+
+
+def test_split_indices_partition(grades):
+    train_idx, test_idx = split_indices(grades, test_size=0.2, random_state=1)
+    assert train_idx.dtype == np.int32 and test_idx.dtype == np.int32
+    assert len(test_idx) == 200
+    assert np.array_equal(np.sort(np.concatenate([train_idx, test_idx])), np.arange(1000))
+    # Deterministic for a fixed seed
+    again = split_indices(grades, test_size=0.2, random_state=1)
+    assert np.array_equal(test_idx, again[1])
+
+
+def test_split_indices_stratified(grades):
+    _, test_idx = split_indices(grades, test_size=0.25, stratify_column="G3", n_bins=4)
+    edges = np.quantile(grades["G3"], [0.25, 0.5, 0.75])
+    bins = pd.Series(np.searchsorted(edges, grades["G3"], side="right"))
+    expected = bins.value_counts(normalize=True).sort_index()
+    observed = bins.iloc[test_idx].value_counts(normalize=True).sort_index()
+    assert len(test_idx) == 250
+    assert np.allclose(observed, expected, atol=0.01)
+
+
+def test_split_indices_grouped(grades):
+    train_idx, test_idx = split_indices(grades, test_size=0.2, group_column="school")
+    train_schools = set(grades["school"].iloc[train_idx])
+    test_schools = set(grades["school"].iloc[test_idx])
+    assert train_schools.isdisjoint(test_schools)
+    assert test_schools == {"MS"}
+
+
+def test_split_indices_invalid(grades):
+    with pytest.raises(ValueError):
+        split_indices(grades, test_size=1.5)
+    with pytest.raises(ValueError):
+        split_indices(grades, stratify_column="missing")
+    with pytest.raises(ValueError):
+        split_indices(grades, stratify_column="G3", group_column="school")
+
+
+def test_take_rows_and_persist(sample_data, tmp_path):
+    train_idx, test_idx = split_indices(sample_data, test_size=0.4, random_state=42)
+    X_test = take_rows(sample_data, test_idx, columns=["A", "B"])
+    assert list(X_test.columns) == ["A", "B"] and len(X_test) == 2
+    assert take_rows(sample_data, test_idx, columns="target").tolist() == sample_data["target"].iloc[test_idx].tolist()
 
+    path = tmp_path / "split" / "split_indices.npz"
+    save_split_indices(str(path), train_idx, test_idx)
+    loaded_train, loaded_test = load_split_indices(str(path))
+    assert np.array_equal(loaded_train, train_idx) and np.array_equal(loaded_test, test_idx)
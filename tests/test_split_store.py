@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.split_data import split_indices
+from src.split_store import write_split_store, read_split_store, read_store_meta, read_xy
+
+
+@pytest.fixture
+def grades():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "school": rng.choice(["GP", "MS"], 50),
+        "absences": rng.integers(0, 75, 50),
+        "G3": rng.integers(0, 21, 50),
+    })
+
+
+@pytest.fixture
+def store(grades, tmp_path):
+    train_idx, test_idx = split_indices(grades, test_size=0.2, random_state=1)
+    path = str(tmp_path / "store")
+    write_split_store(path, grades, train_idx, test_idx)
+    return path, train_idx, test_idx
+
+
+def test_split_store_round_trip(grades, store):
+    path, train_idx, test_idx = store
+    meta = read_store_meta(path)
+    assert (meta["n_train"], meta["n_test"]) == (40, 10)
+
+    for split, idx in [("train", train_idx), ("test", test_idx)]:
+        frame = read_split_store(path, split, restore_dtypes=True)
+        expected = grades.iloc[idx]
+        assert frame.index.tolist() == expected.index.tolist()
+        assert frame["school"].tolist() == expected["school"].tolist()
+        pd.testing.assert_series_equal(frame["G3"], expected["G3"], check_index_type=False)
+    assert len(read_split_store(path)) == 50
+
+
+def test_split_store_is_compact_and_zero_copy(store):
+    path, _, _ = store
+    frame = read_split_store(path, "test", columns=["school", "absences"])
+    assert isinstance(frame["school"].dtype, pd.CategoricalDtype)
+    assert frame["absences"].dtype == np.int8
+
+    # Columns are views of the memory-mapped files
+    base = frame["absences"].to_numpy()
+    while not isinstance(base, np.memmap) and base is not None:
+        base = base.base
+    assert isinstance(base, np.memmap)
+
+
+def test_read_xy(store):
+    path, train_idx, _ = store
+    X, y = read_xy(path, "train")
+    assert list(X.columns) == ["school", "absences"]
+    assert y.name == "G3"
+    assert len(X) == len(y) == len(train_idx)
+
+
+def test_split_store_invalid(grades, store, tmp_path):
+    path, train_idx, test_idx = store
+    with pytest.raises(ValueError):
+        read_split_store(path, "validation")
+    with pytest.raises(ValueError):
+        read_split_store(path, columns=["missing"])
+    with pytest.raises(FileNotFoundError):
+        read_split_store(str(tmp_path))
+    with pytest.raises(ValueError):
+        write_split_store(str(tmp_path / "other"), grades, train_idx, test_idx, target_column="missing")
@@ -0,0 +1,75 @@
+import math
+import os
+import sys
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.streaming_metrics import ExactSum, RegressionMetrics
+
+
+def test_exact_sum_matches_fsum_in_any_batches():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=5_000) * 10.0 ** rng.integers(-300, 300, size=5_000)
+    values = np.concatenate([values, [0.0, 5e-324, -5e-324, 1e308, -1e308]])
+    whole = ExactSum()
+    whole.add(values)
+    assert whole.value() == math.fsum(values)
+
+    shuffled = rng.permutation(values)
+    batches = [ExactSum() for _ in range(3)]
+    for batch, part in zip(batches, np.array_split(shuffled, 3)):
+        batch.add(part)
+    merged = batches[0].merge(batches[1]).merge(batches[2])
+    assert merged.total == whole.total
+    assert ExactSum().value() == 0.0
+
+
+def test_exact_sum_rejects_non_finite_values():
+    with pytest.raises(ValueError, match="finite"):
+        ExactSum().add([1.0, np.nan])
+
+
+def test_regression_metrics_same_bits_in_chunks():
+    rng = np.random.default_rng(1)
+    y_true = rng.integers(0, 21, size=10_007).astype(float)
+    y_pred = y_true + rng.normal(0, 3, size=y_true.size)
+
+    whole = RegressionMetrics(histogram_bins=8).update(y_true, y_pred)
+    chunked = RegressionMetrics(histogram_bins=8)
+    for start in range(0, y_true.size, 999):
+        chunked.update(y_true[start:start + 999], y_pred[start:start + 999])
+    assert (chunked.mse, chunked.rmse, chunked.mae) == (whole.mse, whole.rmse, whole.mae)
+    np.testing.assert_array_equal(chunked.histogram, whole.histogram)
+
+    # Correctly rounded, so within rounding of sklearn's pairwise sums
+    assert whole.mse == pytest.approx(mean_squared_error(y_true, y_pred), rel=1e-14)
+    assert whole.mae == pytest.approx(mean_absolute_error(y_true, y_pred), rel=1e-14)
+    assert whole.mse == math.fsum((y_true - y_pred) ** 2) / y_true.size
+
+
+def test_regression_metrics_residual_statistics():
+    y_true = np.array([10.0, 12.0, 8.0, 30.0, 15.0])
+    y_pred = np.array([11.0, 12.0, 5.0, 5.0, 15.0])
+    metrics = RegressionMetrics(histogram_bins=4, histogram_range=(-4, 4))
+    metrics.update(y_true[:2], y_pred[:2]).merge(RegressionMetrics(histogram_bins=4, histogram_range=(-4, 4))
+                                                 .update(y_true[2:], y_pred[2:]))
+
+    residuals = y_true - y_pred
+    summary = metrics.residual_summary().set_index("Statistic")["Value"]
+    assert summary["count"] == 5
+    assert summary["mean"] == pytest.approx(residuals.mean())
+    assert summary["std"] == pytest.approx(residuals.std(ddof=1))
+    assert (summary["min"], summary["max"]) == (-1.0, 25.0)
+
+    histogram = metrics.residual_histogram()
+    # Residuals -1, 0, 3, 25, 0 over [-4, -2, 0, 2, 4], with open outer bins
+    assert histogram["count"].tolist() == [0, 0, 1, 2, 1, 1]
+    assert histogram["lower"].iloc[0] == -np.inf and histogram["upper"].iloc[-1] == np.inf
+
+
+def test_regression_metrics_empty():
+    metrics = RegressionMetrics().update([], [])
+    assert metrics.count == 0 and np.isnan(metrics.mse)
+    with pytest.raises(ValueError, match="histogram"):
+        metrics.residual_histogram()
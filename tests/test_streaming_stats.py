@@ -0,0 +1,47 @@
+import os
+import sys
+import numpy as np
+import pytest
+from scipy.stats import kurtosis, skew
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.streaming_stats import CoMoments, Moments
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.normal(5, 2, 1000), rng.exponential(3, 1000), rng.integers(0, 20, 1000)])
+
+
+def test_merged_moments_match_full_data(values):
+    merged = Moments(3)
+    for chunk in np.array_split(values, [1, 100, 101, 700]):
+        merged.merge(Moments.of(chunk))
+    np.testing.assert_allclose(merged.count, 1000)
+    np.testing.assert_allclose(merged.mean, values.mean(axis=0))
+    np.testing.assert_allclose(merged.variance, values.var(axis=0, ddof=1))
+    np.testing.assert_allclose(merged.skewness, skew(values, axis=0))
+    np.testing.assert_allclose(merged.kurtosis, kurtosis(values, axis=0))
+
+
+def test_moments_skip_missing_values(values):
+    values[::10, 0] = np.nan
+    moments = Moments.of(values[:500]).merge(Moments.of(values[500:]))
+    assert moments.count[0] == 900
+    np.testing.assert_allclose(moments.mean[0], np.nanmean(values[:, 0]))
+    np.testing.assert_allclose(moments.variance[0], np.nanvar(values[:, 0], ddof=1))
+
+
+def test_merged_comoments_match_full_data(values):
+    merged = CoMoments(3)
+    for chunk in np.array_split(values, 7):
+        merged.merge(CoMoments.of(chunk))
+    np.testing.assert_allclose(merged.correlation(), np.corrcoef(values, rowvar=False))
+
+
+def test_moments_round_trip(values):
+    moments = Moments.of(values)
+    restored = Moments.from_dict(moments.to_dict())
+    np.testing.assert_array_equal(restored.m4, moments.m4)
+    comoments = CoMoments.of(values)
+    np.testing.assert_array_equal(CoMoments.from_dict(comoments.to_dict()).comoment, comoments.comoment)
@@ -0,0 +1,56 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.student_csv import read_student_csv
+from src.student_schema import COLUMNS
+from src.synthetic_data import fit_student_profile, write_student_csv
+
+RAW_DATA = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'student-mat.csv')
+
+
+def test_read_matches_pandas():
+    pa = pytest.importorskip("pyarrow")
+    columns = ["school", "sex", "age", "G1", "G2", "G3"]
+    data = read_student_csv(RAW_DATA, columns=columns)
+    expected = pd.read_csv(RAW_DATA, delimiter=";")[columns]
+    assert list(data.columns) == columns
+    # The quoted grades are integers, like G3
+    for column in ["age", "G1", "G2", "G3"]:
+        assert data[column].dtype == pd.ArrowDtype(pa.int64())
+        np.testing.assert_array_equal(data[column].to_numpy(dtype=np.int64), expected[column].to_numpy())
+    for column in ["school", "sex"]:
+        assert isinstance(data[column].dtype, pd.CategoricalDtype)
+        assert data[column].astype(object).tolist() == expected[column].tolist()
+
+
+def test_read_synthetic_file(tmp_path):
+    profile = fit_student_profile(pd.read_csv(RAW_DATA, delimiter=";"))
+    path = str(tmp_path / "synthetic.csv")
+    write_student_csv(profile, path, 20_000, seed=3, chunk_size=7_000)
+    data = read_student_csv(path, columns=COLUMNS)
+    expected = pd.read_csv(path, delimiter=";")[COLUMNS]
+    pd.testing.assert_frame_equal(data.astype(object), expected.astype(object))
+    pd.testing.assert_frame_equal(read_student_csv(path, columns=COLUMNS, use_threads=False), data)
+
+
+def test_read_subject_columns(tmp_path):
+    path = tmp_path / "merged.csv"
+    pd.DataFrame({"sex": ["F", "M"], "G3_mat": [3, 4], "G3_por": [12, 14]}).to_csv(path, sep=";", index=False)
+    data = read_student_csv(str(path), columns=["sex", "G3"], suffix="_por")
+    assert list(data.columns) == ["sex", "G3"]
+    assert data["G3"].tolist() == [12, 14]
+    with pytest.raises(KeyError):
+        read_student_csv(str(path), columns=["sex", "age"])
+
+
+def test_values_outside_the_schema_fall_back_to_pandas(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text('sex;age;G3\n"F";15;10\n"M";abc;\n')
+    data = read_student_csv(str(path))
+    # pd.read_csv types, so that validation reports the bad values
+    assert data["age"].dtype == object and data["sex"].dtype == object
+    assert data["age"].tolist() == ["15", "abc"]
+    assert data["G3"].isna().tolist() == [False, True]
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+from src.student_schema import COLUMNS, RAW_COLUMNS
+from src.synthetic_data import (
+    fit_student_profile,
+    profile_from_schema,
+    generate_student_chunks,
+    generate_student_data,
+    write_student_csv,
+)
+from validate import validate_student_data
+
+RAW_DATA = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'student-mat.csv')
+
+
+@pytest.fixture(scope="module")
+def profile():
+    return fit_student_profile(pd.read_csv(RAW_DATA, delimiter=";"))
+
+
+def test_generate_is_deterministic_and_chunk_independent(profile):
+    full = generate_student_data(profile, 150_000, seed=7)
+    chunked = pd.concat(generate_student_chunks(profile, 150_000, seed=7, chunk_size=40_000))
+    pd.testing.assert_frame_equal(full, chunked)
+    assert not full.equals(generate_student_data(profile, 150_000, seed=8))
+
+
+def test_generated_data_passes_schema(profile):
+    synthetic = generate_student_data(profile, 20_000)
+    assert list(synthetic.columns) == RAW_COLUMNS
+    validate_student_data(synthetic[COLUMNS])
+    validate_student_data(generate_student_data(profile_from_schema(), 20_000)[COLUMNS])
+
+
+def test_generated_data_keeps_correlations(profile):
+    synthetic = generate_student_data(profile, 50_000)
+    corr = synthetic[["G1", "G2", "G3", "Dalc", "Walc"]].corr()
+    assert corr.loc["G2", "G3"] > 0.7
+    assert corr.loc["Dalc", "Walc"] > 0.4
+
+
+def test_write_student_csv_round_trip(profile, tmp_path):
+    out = tmp_path / "synthetic.csv"
+    write_student_csv(profile, str(out), 5_000, seed=3, chunk_size=1_234)
+    with open(out) as f:
+        header = f.readline()
+        first = f.readline().rstrip("\n").split(";")
+    assert header.rstrip("\n").split(";") == RAW_COLUMNS
+    assert first[0].startswith('"') and first[RAW_COLUMNS.index("G1")].startswith('"')
+    assert not first[RAW_COLUMNS.index("G3")].startswith('"')
+    read_back = pd.read_csv(out, delimiter=";")
+    pd.testing.assert_frame_equal(read_back, generate_student_data(profile, 5_000, seed=3))
+
+
+def test_fit_profile_invalid_input():
+    with pytest.raises(ValueError):
+        fit_student_profile(pd.DataFrame())
+    with pytest.raises(ValueError):
+        fit_student_profile(pd.DataFrame({"unknown": [1, 2]}))
+
+
+def test_write_student_csv_parallel_matches_serial(profile, tmp_path):
+    serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+    write_student_csv(profile, str(serial), 3_000, chunk_size=500)
+    write_student_csv(profile, str(parallel), 3_000, chunk_size=700, n_jobs=2)
+    assert serial.read_bytes() == parallel.read_bytes()